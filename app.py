@@ -1,12 +1,9 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, send_file
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, send_file, Response, stream_with_context
 from functools import wraps
 import os
 import time
 import io
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import StrOutputParser
 import json
 import re
 import hashlib
@@ -18,11 +15,17 @@ import httpx
 
 # Import enhancement modules
 from email_service import email_service
-from resume_parser import resume_parser
+from resume_parser import resume_parser, read_upload, detect_file_type, ResumeUploadError, MAX_RESUME_BYTES
 from code_executor import code_executor
 from analytics import AdvancedAnalytics
 from proctoring import proctoring_service
+from plagiarism import answer_index
+from llm_metrics import llm_metrics
+import llm_json
+import llm_router
+import prompt_budget
 import feedback_db
+import exporter
 
 # Load environment variables
 load_dotenv()
@@ -36,15 +39,17 @@ DEEPSEEK_BASE_URL = os.environ.get("DEEPSEEK_BASE_URL", "https://api.deepseek.co
 DEEPSEEK_MODEL = os.environ.get("DEEPSEEK_MODEL", "deepseek-reasoner")
 ADMIN_USERNAME = os.environ.get("ADMIN_USERNAME", "admin")
 ADMIN_PASSWORD = os.environ.get("ADMIN_PASSWORD", "Admin@123")
+# Bearer token required by /metrics when set (leave unset to scrape without auth)
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
 
-# Initialize LLM
+# Apply pending schema migrations before serving; data backfills continue in the background
+db_utils.init_database(backfill=True)
+
+# Initialize LLM access; endpoint clients are built off the startup path (LLMRouter.warm_up)
 client = httpx.Client(verify=False)
-llm = ChatOpenAI(
-    base_url=DEEPSEEK_BASE_URL,
-    model=DEEPSEEK_MODEL,
-    api_key=DEEPSEEK_API_KEY,
-    http_client=client,
-)
+# Per-prompt-type model selection with failover (see llm_router.DEFAULT_ROUTES)
+router = llm_router.LLMRouter.from_env(http_client=client)
+router.warm_up()
 
 # Role skills mapping
 ROLE_SKILLS = {
@@ -120,8 +125,8 @@ def register():
             if resume_data.get('email') and not email:
                 user_data['email'] = resume_data.get('email')
         
-        users[username] = user_data
-        db_utils.save_users(users)
+        # Insert just this user; rewriting the whole table loses concurrent registrations
+        db_utils.add_user(username, user_data)
         
         # Send welcome email
         if user_data['email']:
@@ -334,6 +339,12 @@ def evaluate_answer():
     question = data.get('question')
     answer = data.get('answer')
     question_type = data.get('type')
+    prompt_type = 'evaluate_coding' if question_type == 'coding' else 'evaluate_answer'
+    
+    # Keep long answers (and pasted code) within the prompt budget
+    compact = prompt_budget.compact_answer(answer, question_type == 'coding')
+    prompt_budget.log_savings(prompt_type, answer, compact)
+    answer = compact
     
     # Evaluate answer using LLM
     prompt = f"""Evaluate this answer for a {question_type} question.
@@ -349,9 +360,12 @@ def evaluate_answer():
     """
     
     try:
-        response = llm.invoke(prompt)
-        result = json.loads(response.content)
-        return jsonify({'success': True, 'result': result})
+        evaluation = llm_json.invoke_json(router, prompt, llm_json.EVALUATION_SCHEMA, prompt_type)
+        if not evaluation['success']:
+            return jsonify({'success': False, 'message': f"Could not read the evaluation: {evaluation['error']}"})
+        data = evaluation['data']
+        feedback = f"{data['reason']} {data['suggestions']}".strip()
+        return jsonify({'success': True, 'result': {'score': data['score'], 'feedback': feedback}})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
 
@@ -371,7 +385,8 @@ def save_evaluation():
         'qa_history': data.get('qa_history', [])
     }
     
-    db_utils.save_evaluation_result(username, eval_data)
+    evaluation_id = db_utils.save_evaluation_result(username, eval_data)
+    answer_index.index_evaluation(evaluation_id, username, eval_data['qa_history'])
     return jsonify({'success': True})
 
 @app.route('/admin/login', methods=['GET', 'POST'])
@@ -393,14 +408,107 @@ def admin_login():
 @app.route('/admin/dashboard')
 @admin_required
 def admin_dashboard():
-    users = db_utils.load_users()
-    history = db_utils.load_eval_history()
-    feedback = db_utils.load_feedback()
+    # Only counts are rendered server-side; tables page through the JSON APIs below
+    counts = db_utils.admin_get_counts()
+    
+    return render_template('admin_dashboard.html', counts=counts)
+
+@app.route('/api/admin/users')
+@admin_required
+def admin_list_users_api():
+    """Page through users (admin only)"""
+    result = db_utils.admin_list_users(
+        limit=request.args.get('limit', 50, type=int),
+        cursor=request.args.get('cursor'),
+        sort=request.args.get('sort', 'created_at'),
+        order=request.args.get('order', 'desc'),
+        search=request.args.get('q')
+    )
+    return jsonify(result), (200 if result['success'] else 400)
+
+@app.route('/api/admin/evaluations')
+@admin_required
+def admin_list_evaluations_api():
+    """Page through evaluation summaries (admin only)"""
+    result = db_utils.admin_list_evaluations(
+        limit=request.args.get('limit', 50, type=int),
+        cursor=request.args.get('cursor'),
+        sort=request.args.get('sort', 'date'),
+        order=request.args.get('order', 'desc'),
+        username=request.args.get('username'),
+        role=request.args.get('role'),
+        since=request.args.get('since'),
+        until=request.args.get('until'),
+        min_percentage=request.args.get('min_percentage', type=float),
+        max_percentage=request.args.get('max_percentage', type=float)
+    )
+    return jsonify(result), (200 if result['success'] else 400)
+
+@app.route('/api/admin/search')
+@admin_required
+def admin_search_api():
+    """Full-text search over questions, answers and feedback (admin only)"""
+    result = db_utils.admin_search(
+        request.args.get('q', ''),
+        kind=request.args.get('kind'),
+        username=request.args.get('username'),
+        limit=request.args.get('limit', 20, type=int),
+        cursor=request.args.get('cursor')
+    )
+    return jsonify(result), (200 if result['success'] else 400)
+
+@app.route('/api/admin/similar-answers')
+@admin_required
+def similar_answers_api():
+    """Recently flagged near-duplicate answers across candidates (admin only)"""
+    evaluation_id = request.args.get('evaluation_id', type=int)
+    if evaluation_id is not None:
+        return jsonify({'success': True, 'matches': answer_index.get_matches_for_evaluation(evaluation_id)})
+    result = answer_index.get_recent_matches(
+        limit=request.args.get('limit', 50, type=int),
+        cursor=request.args.get('cursor')
+    )
+    return jsonify(result), (200 if result['success'] else 400)
+
+@app.route('/api/admin/llm-latency')
+@admin_required
+def llm_latency_api():
+    """LLM latency percentiles per prompt type (admin only)"""
+    result = llm_metrics.latency_summary(hours=request.args.get('hours', type=int))
+    # Rolling endpoint health as seen by this process's router
+    result['endpoints'] = router.stats()
+    return jsonify(result)
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint for LLM call metrics"""
+    if METRICS_TOKEN and request.headers.get('Authorization') != f'Bearer {METRICS_TOKEN}':
+        return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    return Response(llm_metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/admin/export/evaluations')
+@admin_required
+def export_evaluations_api():
+    """Stream evaluation history as CSV, JSONL or Parquet (admin only)"""
+    fmt = request.args.get('format', 'csv').lower()
+    filters = {
+        'username': request.args.get('username'),
+        'role': request.args.get('role'),
+        'since': request.args.get('since'),
+        'until': request.args.get('until')
+    }
+    try:
+        chunks, mimetype, extension = exporter.export_evaluations(fmt, **filters)
+    except (ValueError, RuntimeError) as e:
+        # Unknown format, or Parquet asked for without pyarrow installed
+        return jsonify({'success': False, 'error': str(e)}), 400
     
-    return render_template('admin_dashboard.html', 
-                         users=users, 
-                         history=history, 
-                         feedback=feedback)
+    filename = f"evaluations_{filters['username'] or 'all'}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    return Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
 
 # ============================================
 # ENHANCEMENT ROUTES
@@ -437,14 +545,82 @@ def send_email():
 @app.route('/api/email-logs')
 @admin_required
 def get_email_logs():
-    """Get email logs (admin only)"""
-    logs = email_service.get_sent_emails(limit=50)
-    return jsonify({'success': True, 'emails': logs})
+    """Get a page of email logs, newest first (admin only)"""
+    page = email_service.query_emails(
+        limit=min(request.args.get('limit', 50, type=int), 500),
+        cursor=request.args.get('cursor', type=int),
+        recipient=request.args.get('recipient'),
+        template=request.args.get('template'),
+        since=request.args.get('since'),
+        until=request.args.get('until'),
+        status=request.args.get('status')
+    )
+    return jsonify({'success': True, **page})
+
+@app.route('/api/email-logs/<int:email_id>')
+@admin_required
+def get_email_log(email_id):
+    """Get a single email log entry (admin only)"""
+    email = email_service.get_email_by_id(email_id)
+    if email:
+        return jsonify({'success': True, 'email': email})
+    return jsonify({'success': False, 'message': 'Email not found'}), 404
+
+# Email Campaign Routes
+CAMPAIGN_TEMPLATES = ('reminder', 'evaluation_invite')
+
+@app.route('/api/admin/campaigns', methods=['GET', 'POST'])
+@admin_required
+def email_campaigns():
+    """List campaigns, or start a bulk reminder/invite campaign (admin only)"""
+    if request.method == 'GET':
+        limit = request.args.get('limit', 20, type=int)
+        return jsonify({'success': True, 'campaigns': email_service.list_campaigns(limit)})
+    
+    data = request.get_json() or {}
+    template = data.get('template', 'reminder')
+    if template not in CAMPAIGN_TEMPLATES:
+        return jsonify({'success': False, 'message': f'Campaign template must be one of {", ".join(CAMPAIGN_TEMPLATES)}'}), 400
+    
+    segment = data.get('segment', 'inactive')
+    days = int(data.get('days', 30))
+    role = data.get('role', 'your selected role')
+    template_vars = {'role': role}
+    if template == 'evaluation_invite':
+        template_vars.update({
+            'duration': data.get('duration', 50),
+            'question_count': data.get('question_count', 5),
+            'skills': ', '.join(data.get('skills') or ROLE_SKILLS.get(role, []))
+        })
+    
+    try:
+        recipients = db_utils.iter_campaign_targets(segment, days)
+        result = email_service.start_campaign(
+            name=data.get('name') or f"{template} / {segment} ({days}d)",
+            template_name=template,
+            recipients=recipients,
+            template_vars=template_vars,
+            rate_per_minute=int(data.get('rate_per_minute', 60)),
+            dedup_days=int(data.get('dedup_days', 7))
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return jsonify(result)
+
+@app.route('/api/admin/campaigns/<int:campaign_id>')
+@admin_required
+def email_campaign_status(campaign_id):
+    """Get campaign progress (admin only)"""
+    return jsonify(email_service.get_campaign_status(campaign_id))
 
 # Resume Parsing Routes
 @app.route('/api/parse-resume', methods=['POST'])
 def parse_resume():
     """Parse uploaded resume - No login required for registration"""
+    # Refuse oversized bodies before request.files buffers them (resume limit + multipart overhead).
+    # Only this route: a global MAX_CONTENT_LENGTH would also cap JSON saves and admin imports
+    if request.content_length is not None and request.content_length > MAX_RESUME_BYTES + 64 * 1024:
+        return resume_too_large()
     if 'resume' not in request.files:
         return jsonify({'success': False, 'message': 'No file uploaded'})
     
@@ -453,16 +629,25 @@ def parse_resume():
         return jsonify({'success': False, 'message': 'No file selected'})
     
     try:
-        file_bytes = file.read()
+        file_bytes = read_upload(file.stream)
+        if detect_file_type(file_bytes, file.filename) == 'unknown':
+            return jsonify({'success': False, 'message': 'Unsupported file type. Upload a PDF, DOCX or TXT resume.'}), 415
         parsed_data = resume_parser.parse_file(file_bytes, file.filename)
         
         return jsonify({
             'success': True,
             'data': parsed_data
         })
+    except ResumeUploadError as e:
+        return jsonify({'success': False, 'message': str(e)}), 413
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
 
+def resume_too_large():
+    """JSON 413 for a resume upload over MAX_RESUME_BYTES"""
+    limit_mb = MAX_RESUME_BYTES // (1024 * 1024)
+    return jsonify({'success': False, 'message': f'Upload exceeds the {limit_mb} MB limit'}), 413
+
 # Code Execution Routes
 @app.route('/api/execute-code', methods=['POST'])
 @login_required
@@ -608,17 +793,16 @@ def register_enhanced():
     if username in users:
         return jsonify({'success': False, 'message': 'Username already exists'})
     
-    users[username] = {
+    db_utils.add_user(username, {
         'password': hash_password(password),
         'email': email,
         'created_at': datetime.now().isoformat()
-    }
-    db_utils.save_users(users)
+    })
     
     # Send welcome email
     email_service.send_welcome_email(email, username)
     
-    return jsonify({'success': True, 'message': 'Registration successful! Welcome email sent.'})
+    return jsonify({'success': True, 'message': 'Registration successful! Welcome email queued.'})
 
 # Enhanced Save Evaluation with Email
 @app.route('/api/save-evaluation-enhanced', methods=['POST'])
@@ -638,7 +822,8 @@ def save_evaluation_enhanced():
         'qa_history': data.get('qa_history', [])
     }
     
-    db_utils.save_evaluation_result(username, eval_data)
+    evaluation_id = db_utils.save_evaluation_result(username, eval_data)
+    answer_index.index_evaluation(evaluation_id, username, eval_data['qa_history'])
     
     # Send completion email
     users = db_utils.load_users()
@@ -684,7 +869,9 @@ def submit_feedback():
         'ai_score': data.get('ai_score'),
         'ai_feedback': data.get('ai_feedback'),
         'user_feedback': data.get('user_feedback'),
-        'user_expected_score': data.get('user_expected_score')
+        'user_expected_score': data.get('user_expected_score'),
+        'evaluation_id': data.get('evaluation_id'),
+        'question_index': data.get('question_index')
     }
     
     result = feedback_db.save_feedback(feedback_data)
@@ -693,18 +880,28 @@ def submit_feedback():
 @app.route('/api/get-feedback')
 @login_required
 def get_user_feedback_api():
-    """Get feedback submitted by current user"""
+    """Get a page of the current user's feedback, newest first (pass next_cursor back as cursor)"""
     username = session.get('username')
-    result = feedback_db.get_user_feedback(username)
-    return jsonify(result)
+    result = feedback_db.get_user_feedback(
+        username,
+        limit=min(request.args.get('limit', 100, type=int), 500),
+        cursor=request.args.get('cursor')
+    )
+    return jsonify(result), (200 if result['success'] else 400)
 
 @app.route('/api/admin/feedback')
 @admin_required
 def get_all_feedback_api():
-    """Get all feedback (admin only)"""
-    limit = request.args.get('limit', 100, type=int)
-    result = feedback_db.get_all_feedback(limit)
-    return jsonify(result)
+    """Get a page of feedback for triage, newest first (admin only)"""
+    result = feedback_db.get_all_feedback(
+        limit=min(request.args.get('limit', 100, type=int), 500),
+        cursor=request.args.get('cursor'),
+        status=request.args.get('status'),
+        username=request.args.get('username'),
+        since=request.args.get('since'),
+        until=request.args.get('until')
+    )
+    return jsonify(result), (200 if result['success'] else 400)
 
 @app.route('/api/admin/feedback/stats')
 @admin_required
@@ -799,10 +996,20 @@ def get_users_summary_api():
 def adjust_score_from_feedback_api(feedback_id):
     """Adjust score based on feedback review"""
     data = request.get_json()
-    eval_id = data.get('eval_id')
-    question_index = data.get('question_index')
     new_score = data.get('new_score')
     
+    # Feedback rows link to the evaluation they dispute; fall back to the
+    # request body for entries submitted before that link existed
+    target = feedback_db.get_feedback_target(feedback_id)
+    if not target['success']:
+        return jsonify(target), 404
+    eval_id = target['evaluation_id'] or data.get('eval_id')
+    question_index = target['question_index']
+    if question_index is None:
+        question_index = data.get('question_index')
+    if eval_id is None or question_index is None:
+        return jsonify({'success': False, 'error': 'Feedback is not linked to an evaluation question'}), 400
+    
     # Update question score
     result = db_utils.admin_update_question_score(eval_id, question_index, new_score)
     
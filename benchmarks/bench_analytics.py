@@ -0,0 +1,20 @@
+"""AdvancedAnalytics.generate_report over in-memory history"""
+
+import pytest
+
+import synthetic
+from analytics import AdvancedAnalytics
+
+
+@pytest.fixture(scope="module", params=[1000, 20000], ids=["1k_evals", "20k_evals"])
+def analytics_input(request):
+    evaluations = request.param
+    users = synthetic.generate_users(max(100, evaluations // 10))
+    history = synthetic.generate_history(evaluations, users=len(users))
+    return history, users
+
+
+def bench_generate_report(benchmark, analytics_input):
+    history, users = analytics_input
+    report = benchmark(lambda: AdvancedAnalytics(history, users).generate_report())
+    assert report['overview']['total_evaluations'] == sum(len(evals) for evals in history.values())
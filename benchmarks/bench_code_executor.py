@@ -0,0 +1,30 @@
+"""CodeExecutor.execute_with_tests on typical submissions"""
+
+import pytest
+
+from code_executor import CodeExecutor
+
+SUBMISSIONS = {
+    'sum_even': (
+        "def sum_even(numbers):\n"
+        "    return sum(n for n in numbers if n % 2 == 0)\n"
+        "print(sum_even(list(range(1000))))\n",
+        [{'input': '', 'expected': '249500'}] * 5,
+    ),
+    'reverse_string': (
+        "def reverse(s):\n"
+        "    out = ''\n"
+        "    for ch in s:\n"
+        "        out = ch + out\n"
+        "    return out\n"
+        "print(reverse('benchmark' * 50))\n",
+        [{'input': '', 'expected': ('benchmark' * 50)[::-1]}] * 5,
+    ),
+}
+
+
+@pytest.mark.parametrize("name", sorted(SUBMISSIONS))
+def bench_execute_with_tests(benchmark, name):
+    code, test_cases = SUBMISSIONS[name]
+    result = benchmark(CodeExecutor().execute_with_tests, code, test_cases)
+    assert result['passed_tests'] == len(test_cases)
@@ -0,0 +1,8 @@
+"""Evaluation history reads at 1k / 100k (/ 1M with --bench-rows) rows"""
+
+import db_utils
+
+
+def bench_load_eval_history(benchmark, eval_db, eval_rows, db_rounds):
+    history = benchmark.pedantic(db_utils.load_eval_history, rounds=db_rounds, iterations=1, warmup_rounds=0)
+    assert sum(len(evals) for evals in history.values()) == eval_rows
@@ -0,0 +1,42 @@
+"""VideoProctoring.generate_proctoring_report for sessions with many events"""
+
+import pytest
+
+import db_utils
+import synthetic
+from plagiarism import AnswerSimilarityIndex
+from proctoring import VideoProctoring
+
+VIOLATION_TYPES = ['tab_switch', 'window_blur', 'copy_paste', 'face_not_detected', 'multiple_faces']
+
+
+@pytest.fixture(scope="module")
+def proctoring_db(tmp_path_factory):
+    """Small evaluation database with its answer-similarity index built"""
+    path = str(tmp_path_factory.mktemp("proctoring") / "evaluation_system.db")
+    synthetic.build_evaluation_db(path, 500, users=50)
+    previous = db_utils.DB_FILE
+    db_utils.DB_FILE = path
+    try:
+        AnswerSimilarityIndex().rebuild()
+    finally:
+        db_utils.DB_FILE = previous
+    return path
+
+
+@pytest.fixture(params=[10, 1000], ids=["10_events", "1000_events"])
+def proctored_session(request, proctoring_db, monkeypatch):
+    monkeypatch.setattr(db_utils, "DB_FILE", proctoring_db)
+    proctoring = VideoProctoring()
+    # A numeric evaluation id makes the report look up that evaluation's similarity matches
+    session_id = proctoring.start_session("user_1", 1)['session_id']
+    for n in range(request.param):
+        proctoring.log_violation(session_id, VIOLATION_TYPES[n % len(VIOLATION_TYPES)], f"event {n}")
+    proctoring.end_session(session_id)
+    return proctoring, session_id
+
+
+def bench_generate_proctoring_report(benchmark, proctored_session):
+    proctoring, session_id = proctored_session
+    result = benchmark(proctoring.generate_proctoring_report, session_id)
+    assert result['success']
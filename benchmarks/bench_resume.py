@@ -0,0 +1,39 @@
+"""Resume parsing (PDF / DOCX, cold and cached) and PII masking"""
+
+import pytest
+
+import synthetic
+from resume_cache import resume_cache
+from resume_parser import EnhancedResumeParser, mask_pii
+
+
+@pytest.fixture(scope="module", params=[0, 20], ids=["1page", "long"])
+def resume(request):
+    return synthetic.resume_text(extra_sections=request.param)
+
+
+@pytest.mark.parametrize("kind", ["pdf", "docx"])
+def bench_parse_file_cold(benchmark, resume, kind):
+    data = synthetic.make_pdf(resume) if kind == "pdf" else synthetic.make_docx(resume)
+    parser = EnhancedResumeParser()
+
+    def setup():
+        resume_cache.clear()
+
+    parsed = benchmark.pedantic(parser.parse_file, args=(data, f"resume.{kind}"), setup=setup, rounds=20)
+    assert parsed['email'].endswith("@example.com")
+
+
+def bench_parse_file_cached(benchmark, resume):
+    data = synthetic.make_pdf(resume)
+    parser = EnhancedResumeParser()
+    parser.parse_file(data, "resume.pdf")
+    parsed = benchmark(parser.parse_file, data, "resume.pdf")
+    assert parsed['email'].endswith("@example.com")
+
+
+@pytest.mark.parametrize("size", [10_000, 1_000_000], ids=["10KB", "1MB"])
+def bench_mask_pii(benchmark, size):
+    text = synthetic.pii_text(size)
+    masked = benchmark(mask_pii, text)
+    assert "@example.org" not in masked
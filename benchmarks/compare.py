@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Regression report for two pytest-benchmark JSON files.
+
+Compares one statistic (median by default) per benchmark and flags any
+benchmark that got slower by more than the threshold. Exits with 1 when a
+regression is found, so it can gate CI.
+
+Example:
+    pytest benchmarks --benchmark-json before.json
+    git checkout my-branch
+    pytest benchmarks --benchmark-json after.json
+    python benchmarks/compare.py before.json after.json --threshold 10 --threshold-for "*load_eval_history*=20"
+"""
+import argparse
+import fnmatch
+import json
+import sys
+
+STATS = ("min", "median", "mean", "max")
+
+
+def load(path):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    benchmarks = {b["fullname"]: b["stats"] for b in data.get("benchmarks", [])}
+    commit = data.get("commit_info", {})
+    label = (commit.get("id") or "unknown")[:10] + (" (dirty)" if commit.get("dirty") else "")
+    return benchmarks, label
+
+
+def parse_overrides(values):
+    overrides = []
+    for value in values or []:
+        pattern, _, pct = value.rpartition("=")
+        overrides.append((pattern, float(pct)))
+    return overrides
+
+
+def threshold_for(name, default, overrides):
+    """Last matching --threshold-for pattern wins"""
+    for pattern, pct in reversed(overrides):
+        if fnmatch.fnmatch(name, pattern):
+            return pct
+    return default
+
+
+def compare(baseline, current, metric="median", threshold=10.0, overrides=(), min_change=0.0):
+    """
+    One row per benchmark: (name, base, current, change, status)
+
+    change is the relative difference; a benchmark regresses when it is
+    slower by more than its threshold (percent) and by at least min_change
+    seconds, which keeps microsecond noise out of the report.
+    """
+    rows = []
+    for name in sorted(set(baseline) | set(current)):
+        if name not in current:
+            rows.append((name, baseline[name][metric], None, None, "missing"))
+            continue
+        if name not in baseline:
+            rows.append((name, None, current[name][metric], None, "new"))
+            continue
+        base, now = baseline[name][metric], current[name][metric]
+        change = (now - base) / base if base else 0.0
+        limit = threshold_for(name, threshold, overrides) / 100
+        if change > limit and now - base >= min_change:
+            status = "REGRESSION"
+        elif change < -limit and base - now >= min_change:
+            status = "improved"
+        else:
+            status = "ok"
+        rows.append((name, base, now, change, status))
+    return rows
+
+
+def _format_seconds(value):
+    if value is None:
+        return "-"
+    if value >= 1:
+        return f"{value:.3f}s"
+    if value >= 1e-3:
+        return f"{value * 1e3:.2f}ms"
+    return f"{value * 1e6:.1f}us"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline", help="pytest-benchmark JSON of the reference run")
+    parser.add_argument("current", help="pytest-benchmark JSON of the run to check")
+    parser.add_argument("--metric", choices=STATS, default="median")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed slowdown in percent (default 10)")
+    parser.add_argument("--threshold-for", action="append", metavar="PATTERN=PCT",
+                        help="per-benchmark threshold for names matching a glob (repeatable)")
+    parser.add_argument("--min-change-ms", type=float, default=0.0,
+                        help="ignore changes smaller than this many milliseconds")
+    args = parser.parse_args()
+
+    baseline, base_label = load(args.baseline)
+    current, current_label = load(args.current)
+    rows = compare(baseline, current, args.metric, args.threshold, parse_overrides(args.threshold_for),
+                   args.min_change_ms / 1000)
+
+    width = max([len(row[0]) for row in rows] + [9])
+    print(f"{args.metric} per benchmark: {base_label} -> {current_label} (threshold {args.threshold:g}%)\n")
+    print(f"{'benchmark':<{width}} {'baseline':>10} {'current':>10} {'change':>8}  status")
+    for name, base, now, change, status in rows:
+        change_text = f"{change:+.1%}" if change is not None else "-"
+        print(f"{name:<{width}} {_format_seconds(base):>10} {_format_seconds(now):>10} {change_text:>8}  {status}")
+
+    regressions = [row for row in rows if row[4] == "REGRESSION"]
+    improved = sum(1 for row in rows if row[4] == "improved")
+    print(f"\n{len(regressions)} regression(s), {improved} improvement(s), {len(rows)} benchmark(s)")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
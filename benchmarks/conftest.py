@@ -0,0 +1,84 @@
+"""
+Benchmark Fixtures
+Synthetic databases and inputs for the pytest-benchmark suite
+
+    pip install -r requirements_dev.txt                 # pytest-benchmark and pyarrow
+    pytest benchmarks                                   # 1k and 100k row tiers
+    pytest benchmarks --bench-rows 1000,100000,1000000  # add the 1M tier (builds a ~1.5 GB db once)
+    pytest benchmarks --benchmark-json before.json
+    python benchmarks/compare.py before.json after.json --threshold 10
+
+Generated databases are cached under .pytest_cache, keyed by row count,
+seed and generator version, so only the first run pays for building them.
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import synthetic  # noqa: E402
+
+# db_utils and plagiarism create their tables in the working directory on import;
+# import them from a scratch directory so the repo's evaluation_system.db is left alone
+_cwd = os.getcwd()
+os.chdir(tempfile.mkdtemp(prefix="benchmarks_"))
+try:
+    import db_utils  # noqa: E402,F401
+    import plagiarism  # noqa: E402,F401
+finally:
+    os.chdir(_cwd)
+
+DEFAULT_ROW_TIERS = "1000,100000"
+
+
+def pytest_addoption(parser):
+    parser.addoption("--bench-rows", default=DEFAULT_ROW_TIERS,
+                     help=f"comma-separated evaluation row counts for database benchmarks (default {DEFAULT_ROW_TIERS})")
+    parser.addoption("--bench-seed", type=int, default=synthetic.DEFAULT_SEED, help="seed for synthetic data")
+
+
+def pytest_generate_tests(metafunc):
+    if "eval_rows" in metafunc.fixturenames:
+        tiers = [int(n) for n in metafunc.config.getoption("--bench-rows").split(",") if n.strip()]
+        metafunc.parametrize("eval_rows", tiers, ids=[f"{n}rows" for n in tiers], scope="session")
+
+
+@pytest.fixture(scope="session")
+def bench_seed(request):
+    return request.config.getoption("--bench-seed")
+
+
+@pytest.fixture(scope="session")
+def eval_db_path(request, eval_rows, bench_seed, tmp_path_factory):
+    """Path of a cached synthetic evaluation_system.db with eval_rows evaluations"""
+    cache = getattr(request.config, "cache", None)  # None with -p no:cacheprovider
+    data_dir = str(cache.mkdir("synthetic-data") if cache else tmp_path_factory.mktemp("synthetic-data"))
+    path = os.path.join(data_dir, f"evaluations_{eval_rows}_s{bench_seed}_v{synthetic.GENERATOR_VERSION}.db")
+    if not os.path.exists(path):
+        partial = path + ".partial"
+        if os.path.exists(partial):
+            os.remove(partial)
+        synthetic.build_evaluation_db(partial, eval_rows, users=max(100, eval_rows // 10), seed=bench_seed)
+        os.replace(partial, path)
+    return path
+
+
+@pytest.fixture
+def eval_db(eval_db_path, monkeypatch):
+    """db_utils pointed at the synthetic database for the duration of a benchmark"""
+    import db_utils
+    monkeypatch.setattr(db_utils, "DB_FILE", eval_db_path)
+    return eval_db_path
+
+
+@pytest.fixture
+def db_rounds(eval_rows):
+    """Fewer rounds for the large tiers so a full run stays in minutes"""
+    if eval_rows >= 1000000:
+        return 1
+    if eval_rows >= 100000:
+        return 3
+    return 10
@@ -0,0 +1,272 @@
+"""
+Synthetic Data
+Deterministic generators for users, evaluation history, resumes and PII-heavy text at any scale
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import zlib
+from datetime import datetime, timedelta
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+# Bump when the generated data changes shape, so cached benchmark databases are rebuilt
+GENERATOR_VERSION = 1
+DEFAULT_SEED = 42
+INSERT_BATCH_SIZE = 10000
+
+ROLES = ['Python Developer', 'Java Developer', 'Frontend Developer', 'DevOps Engineer',
+         'Data Engineer', 'Database Administrator']
+SKILLS = ['Python', 'Java', 'JavaScript', 'React', 'SQL', 'Docker', 'Kubernetes', 'AWS',
+          'Flask', 'Django', 'Spark', 'Linux', 'Git', 'PostgreSQL', 'Terraform']
+EXPERIENCE = ['Fresher', '1 years', '2 years', '3 years', '5 years', '8 years', '12 years']
+FIRST_NAMES = ['Aarav', 'Maria', 'Chen', 'Fatima', 'John', 'Priya', 'Lucas', 'Amina', 'Kenji', 'Sara']
+LAST_NAMES = ['Sharma', 'Garcia', 'Wang', 'Khan', 'Smith', 'Patel', 'Silva', 'Okafor', 'Tanaka', 'Berg']
+QUESTION_STEMS = [
+    "Explain the difference between {a} and {b}. When would you use each?",
+    "How would you debug a slow {a} service in production?",
+    "Write a function that {a} without using built-in helpers.",
+    "What are the trade-offs of {a} compared to {b}?",
+]
+TOPICS = ['lists', 'tuples', 'threads', 'processes', 'indexes', 'caching', 'REST', 'gRPC',
+          'containers', 'virtual machines', 'joins', 'denormalisation', 'reverses a string']
+FILLER = ("the candidate explains the idea clearly and gives an example from a previous project "
+          "covering edge cases error handling and performance considerations").split()
+
+
+def _words(rng, count):
+    return " ".join(rng.choice(FILLER) for _ in range(count))
+
+
+def generate_users(count, seed=DEFAULT_SEED, start=0):
+    """users.json-shaped dict of count users named user_<n> (n from start)"""
+    rng = random.Random(seed + start)
+    epoch = datetime(2024, 1, 1)
+    users = {}
+    for n in range(start, start + count):
+        role = rng.choice(ROLES)
+        users[f"user_{n}"] = {
+            'name': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            'email': f"user_{n}@example.com",
+            'experience': rng.choice(EXPERIENCE),
+            'password': f"{zlib.crc32(str(n).encode()):064x}",
+            'created_at': (epoch + timedelta(minutes=rng.randrange(600 * 24 * 60))).strftime("%Y-%m-%d %H:%M:%S"),
+            'eval_chances': {role: rng.randint(0, 10)},
+            'eval_taken_counts': {role: rng.randint(0, 3)},
+            'skills': rng.sample(SKILLS, rng.randint(2, 6)),
+        }
+    return users
+
+
+def generate_qa_history(rng, questions=10, answer_words=40):
+    """qa_history in the Streamlit (q/a) format"""
+    history = []
+    for _ in range(questions):
+        score = rng.choice([0, 5, 8, 10, 12, 14, 15, 16, 18, 20])
+        history.append({
+            'q': rng.choice(QUESTION_STEMS).format(a=rng.choice(TOPICS), b=rng.choice(TOPICS)),
+            'a': _words(rng, answer_words) if score else "[Skipped - Don't know]",
+            'score': score,
+            'feedback': _words(rng, answer_words // 2),
+        })
+    return history
+
+
+def generate_evaluation(rng, when, questions=10, answer_words=40):
+    """One evaluation_history.json entry"""
+    qa_history = generate_qa_history(rng, questions, answer_words)
+    score = sum(qa['score'] for qa in qa_history)
+    max_score = 20 * questions
+    return {
+        'date': when.strftime("%Y-%m-%d %H:%M:%S"),
+        'role': rng.choice(ROLES),
+        'score': score,
+        'max_score': max_score,
+        'percentage': round(score / max_score * 100, 2) if max_score else 0.0,
+        'time_taken': round(rng.uniform(300, 3600), 3),
+        'qa_history': qa_history,
+    }
+
+
+def iter_evaluations(count, users=1000, seed=DEFAULT_SEED, questions=10, answer_words=40):
+    """Yield (username, evaluation) pairs spread over users and the last two years"""
+    rng = random.Random(seed)
+    epoch = datetime(2024, 1, 1)
+    span_minutes = 730 * 24 * 60
+    for _ in range(count):
+        when = epoch + timedelta(minutes=rng.randrange(span_minutes))
+        yield f"user_{rng.randrange(users)}", generate_evaluation(rng, when, questions, answer_words)
+
+
+def generate_history(evaluations, users=1000, seed=DEFAULT_SEED, questions=10, answer_words=40):
+    """evaluation_history.json-shaped dict: username -> list of evaluations"""
+    history = {}
+    for username, evaluation in iter_evaluations(evaluations, users, seed, questions, answer_words):
+        history.setdefault(username, []).append(evaluation)
+    return history
+
+
+def build_evaluation_db(path, evaluations, users=1000, seed=DEFAULT_SEED, questions=5, answer_words=12,
+                        search_index=False):
+    """
+    Create an evaluation_system.db-compatible database at path
+
+    Uses db_utils' own schema and bulk inserts in batches. The full-text
+    search index is left out unless asked for (it triples build time and
+    size); db_utils.reset_search_index() on the file queues it for a backfill.
+    """
+    import db_utils
+
+    previous = db_utils.DB_FILE
+    db_utils.DB_FILE = path
+    try:
+        db_utils.init_database()
+    finally:
+        db_utils.DB_FILE = previous
+
+    conn = sqlite3.connect(path)
+    try:
+        if not search_index:
+            triggers = conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' "
+                                    "AND name LIKE 'trg_search_%'").fetchall()
+            for (name,) in triggers:
+                conn.execute(f"DROP TRIGGER {name}")
+            conn.execute("DROP TABLE IF EXISTS search_index")
+        conn.executemany(
+            "INSERT INTO users (username, name, email, experience, password, created_at, "
+            "eval_chances, eval_taken_counts, skills) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(name, u['name'], u['email'], u['experience'], u['password'], u['created_at'],
+              json.dumps(u['eval_chances']), json.dumps(u['eval_taken_counts']), json.dumps(u['skills']))
+             for name, u in generate_users(users, seed).items()]
+        )
+        batch = []
+        for username, e in iter_evaluations(evaluations, users, seed, questions, answer_words):
+            batch.append((username, e['date'], e['role'], e['score'], e['max_score'], e['percentage'],
+                          e['time_taken'], json.dumps(e['qa_history'])))
+            if len(batch) >= INSERT_BATCH_SIZE:
+                _insert_evaluations(conn, batch)
+                batch = []
+        _insert_evaluations(conn, batch)
+        conn.commit()
+    finally:
+        conn.close()
+    return path
+
+
+def _insert_evaluations(conn, rows):
+    conn.executemany(
+        "INSERT INTO evaluations (username, date, role, score, max_score, percentage, time_taken, qa_history) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+    )
+
+
+def resume_text(seed=DEFAULT_SEED, extra_sections=0):
+    """Plain-text resume with contact details, experience and skills; extra_sections pads it out"""
+    rng = random.Random(seed)
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    lines = [
+        name,
+        f"{name.split()[0].lower()}@example.com | +1 555 {rng.randint(100, 999)} {rng.randint(1000, 9999)}",
+        "",
+        "SUMMARY",
+        f"Software engineer with {rng.randint(1, 15)} years of experience in {rng.choice(ROLES).lower()} work.",
+        "",
+        "SKILLS",
+        ", ".join(rng.sample(SKILLS, 8)),
+        "",
+        "EXPERIENCE",
+    ]
+    for n in range(2 + extra_sections):
+        lines += [f"Senior Engineer, Company {n} ({2010 + n} - {2012 + n})",
+                  f"- {_words(rng, 18)}", f"- {_words(rng, 14)}", ""]
+    lines += ["EDUCATION", "B.Sc. Computer Science, State University (2009)"]
+    return "\n".join(lines)
+
+
+def make_pdf(text):
+    """Minimal single-font PDF (one page per 50 lines) that PyPDF2 can extract text from"""
+    lines = text.splitlines() or [""]
+    pages = [lines[i:i + 50] for i in range(0, len(lines), 50)]
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for page_lines in pages:
+        escaped = [ln.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") for ln in page_lines]
+        stream = "BT /F1 10 Tf 14 TL 50 790 Td " + " ".join(f"({ln}) '" for ln in escaped) + " ET"
+        data = stream.encode("latin-1", errors="replace")
+        objects.append(f"<< /Length {len(data)} >>\nstream\n{data.decode('latin-1')}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        page_ids.append(len(objects))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {len(page_ids)} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    return bytes(out)
+
+
+def make_docx(text):
+    """DOCX bytes with one paragraph per line (needs python-docx)"""
+    import io
+    import docx
+    document = docx.Document()
+    for line in text.splitlines():
+        document.add_paragraph(line)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def pii_text(size, seed=DEFAULT_SEED):
+    """About size characters of prose sprinkled with emails, phone numbers, years and small numbers"""
+    rng = random.Random(seed)
+    parts = []
+    length = 0
+    while length < size:
+        kind = rng.random()
+        if kind < 0.05:
+            part = f"{rng.choice(FIRST_NAMES).lower()}.{rng.randint(1, 99)}@mail-{rng.randint(1, 9)}.example.org"
+        elif kind < 0.10:
+            part = f"+{rng.randint(1, 99)} ({rng.randint(100, 999)}) {rng.randint(100, 999)}-{rng.randint(1000, 9999)}"
+        elif kind < 0.20:
+            part = str(rng.choice([rng.randint(1990, 2025), rng.randint(1, 500)]))
+        else:
+            part = _words(rng, rng.randint(3, 12))
+        parts.append(part)
+        length += len(part) + 1
+    return " ".join(parts)[:size]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write scaled evaluation_history.json / users.json style files")
+    parser.add_argument("--evaluations", type=int, default=10000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--questions", type=int, default=10, help="qa_history entries per evaluation")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--history-out", default="evaluation_history.synthetic.json")
+    parser.add_argument("--users-out", default="users.synthetic.json")
+    args = parser.parse_args()
+
+    with open(args.users_out, "w", encoding="utf-8") as f:
+        json.dump(generate_users(args.users, args.seed), f)
+    with open(args.history_out, "w", encoding="utf-8") as f:
+        json.dump(generate_history(args.evaluations, args.users, args.seed, args.questions), f)
+    print(f"Wrote {args.users} users to {args.users_out} and {args.evaluations} evaluations to {args.history_out}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -7,18 +7,57 @@ import sys
 import io
 import time
 import traceback
-from contextlib import redirect_stdout, redirect_stderr
-import signal
 
 # resource module is Unix-only, removed for Windows compatibility
 
+SAFE_BUILTINS = {
+    'len': len,
+    'range': range,
+    'str': str,
+    'int': int,
+    'float': float,
+    'list': list,
+    'dict': dict,
+    'set': set,
+    'tuple': tuple,
+    'bool': bool,
+    'sum': sum,
+    'max': max,
+    'min': min,
+    'abs': abs,
+    'sorted': sorted,
+    'enumerate': enumerate,
+    'zip': zip,
+    'map': map,
+    'filter': filter,
+    'all': all,
+    'any': any,
+    'isinstance': isinstance,
+    'type': type,
+}
+
 class TimeoutException(Exception):
     """Exception raised when code execution times out"""
     pass
 
-def timeout_handler(signum, frame):
-    """Handler for timeout signal"""
-    raise TimeoutException("Code execution timed out")
+def deadline_tracer(deadline):
+    """
+    Trace function that raises TimeoutException once the deadline has passed.
+    Unlike SIGALRM it works in any thread, so the Flask worker threads can use it.
+    """
+    def tracer(frame, event, arg):
+        if time.monotonic() > deadline:
+            raise TimeoutException("Code execution timed out")
+        return tracer
+    return tracer
+
+def safe_globals(stdout):
+    """Restricted globals whose print writes to the given buffer instead of sys.stdout"""
+    def captured_print(*args, **kwargs):
+        kwargs.setdefault('file', stdout)
+        print(*args, **kwargs)
+
+    return {'__builtins__': {**SAFE_BUILTINS, 'print': captured_print}}
 
 class CodeExecutor:
     """
@@ -53,91 +92,41 @@ class CodeExecutor:
         
         start_time = time.time()
         
+        # Each run gets its own output buffer and deadline: requests are served on
+        # several threads, so neither sys.stdout nor SIGALRM can be shared
+        stdout_capture = io.StringIO()
+        previous_trace = sys.gettrace()
+        sys.settrace(deadline_tracer(time.monotonic() + self.max_execution_time))
+        
         try:
-            # Create restricted globals
-            safe_globals = {
-                '__builtins__': {
-                    'print': print,
-                    'len': len,
-                    'range': range,
-                    'str': str,
-                    'int': int,
-                    'float': float,
-                    'list': list,
-                    'dict': dict,
-                    'set': set,
-                    'tuple': tuple,
-                    'bool': bool,
-                    'sum': sum,
-                    'max': max,
-                    'min': min,
-                    'abs': abs,
-                    'sorted': sorted,
-                    'enumerate': enumerate,
-                    'zip': zip,
-                    'map': map,
-                    'filter': filter,
-                    'all': all,
-                    'any': any,
-                    'isinstance': isinstance,
-                    'type': type,
-                }
-            }
-            
-            # Capture stdout and stderr
-            stdout_capture = io.StringIO()
-            stderr_capture = io.StringIO()
+            # Execute the code
+            exec(code, safe_globals(stdout_capture))
             
-            # Set timeout (only works on Unix-like systems)
-            if hasattr(signal, 'SIGALRM'):
-                signal.signal(signal.SIGALRM, timeout_handler)
-                signal.alarm(self.max_execution_time)
-            
-            try:
-                with redirect_stdout(stdout_capture), redirect_stderr(stderr_capture):
-                    # Execute the code
-                    exec(code, safe_globals)
-                    
-                    # If test cases provided, run them
-                    if test_cases:
-                        result['total_tests'] = len(test_cases)
-                        
-                        for i, test_case in enumerate(test_cases):
-                            test_result = self._run_test_case(
-                                code, 
-                                test_case, 
-                                safe_globals.copy()
-                            )
-                            result['test_results'].append(test_result)
-                            if test_result['passed']:
-                                result['passed_tests'] += 1
+            # If test cases provided, run them
+            if test_cases:
+                result['total_tests'] = len(test_cases)
                 
-                # Cancel timeout
-                if hasattr(signal, 'SIGALRM'):
-                    signal.alarm(0)
-                
-                result['success'] = True
-                result['output'] = stdout_capture.getvalue()
+                for i, test_case in enumerate(test_cases):
+                    test_result = self._run_test_case(code, test_case)
+                    result['test_results'].append(test_result)
+                    if test_result['passed']:
+                        result['passed_tests'] += 1
+            
+            result['success'] = True
+            result['output'] = stdout_capture.getvalue()
                 
-                if stderr_capture.getvalue():
-                    result['error'] = stderr_capture.getvalue()
-                    
-            except TimeoutException:
-                result['error'] = f"Execution timed out (>{self.max_execution_time}s)"
-            except Exception as e:
-                result['error'] = f"{type(e).__name__}: {str(e)}\n{traceback.format_exc()}"
-            finally:
-                if hasattr(signal, 'SIGALRM'):
-                    signal.alarm(0)
-        
+        except TimeoutException:
+            result['error'] = f"Execution timed out (>{self.max_execution_time}s)"
         except Exception as e:
-            result['error'] = f"Setup error: {str(e)}"
+            result['error'] = f"{type(e).__name__}: {str(e)}\n{traceback.format_exc()}"
+        finally:
+            sys.settrace(previous_trace)
         
         result['execution_time'] = time.time() - start_time
         
         return result
     
-    def _run_test_case(self, code, test_case, safe_globals):
+    def _run_test_case(self, code, test_case):
         """Run a single test case"""
         test_result = {
             'input': test_case.get('input', ''),
@@ -154,19 +143,20 @@ class CodeExecutor:
             # Capture output for this test
             test_stdout = io.StringIO()
             
-            with redirect_stdout(test_stdout):
-                # Execute code with test input
-                exec(code, safe_globals)
-                
-                # Get the output
-                test_result['actual'] = test_stdout.getvalue().strip()
-                
-                # Check if output matches expected
-                expected = str(test_case.get('expected', '')).strip()
-                actual = test_result['actual']
-                
-                test_result['passed'] = (actual == expected)
+            # Execute code with test input
+            exec(code, safe_globals(test_stdout))
+            
+            # Get the output
+            test_result['actual'] = test_stdout.getvalue().strip()
+            
+            # Check if output matches expected
+            expected = str(test_case.get('expected', '')).strip()
+            actual = test_result['actual']
+            
+            test_result['passed'] = (actual == expected)
                 
+        except TimeoutException:
+            raise
         except Exception as e:
             test_result['error'] = str(e)
             test_result['passed'] = False
@@ -280,7 +270,7 @@ class CodeExecutor:
         
         # Calculate score
         if test_cases:
-            pass_rate = (execution_result['passed_tests'] / execution_result['total_tests']) * 100
+            pass_rate = (execution_result['passed_tests'] / len(test_cases)) * 100
             execution_result['pass_rate'] = pass_rate
             execution_result['score'] = self._calculate_score(execution_result)
         
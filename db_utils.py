@@ -6,97 +6,264 @@ Replaces JSON file storage with database operations
 import sqlite3
 import json
 import os
-from datetime import datetime
+import base64
+import binascii
+import codecs
+import time
+import html
+from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 import logging
 
+from schema_migrations import MigrationRunner, add_column
+
 # Database file path
 DB_FILE = "evaluation_system.db"
 
 def get_connection():
-    """Get a connection to the SQLite database"""
+    """Get a connection to the SQLite database, upgrading its schema on first use"""
+    SCHEMA.ensure(DB_FILE)
     conn = sqlite3.connect(DB_FILE)
     conn.row_factory = sqlite3.Row  # Enable column access by name
     return conn
 
-def init_database():
-    """Initialize database tables if they don't exist"""
-    conn = get_connection()
-    cursor = conn.cursor()
+def init_database(backfill: bool = False):
+    """
+    Bring the database schema up to date
+
+    Applies the pending SCHEMA migrations once per process (get_connection
+    does the same on first use). Call it at startup with backfill=True to
+    continue queued data backfills on a background thread.
+    """
+    SCHEMA.ensure(DB_FILE)
+    if backfill:
+        SCHEMA.start_backfills(DB_FILE)
+
+# -------------------------
+# Schema Migrations
+# -------------------------
+
+# Append new migrations with the next version number and never edit one that
+# has shipped; PRAGMA user_version records the last one applied.
+SCHEMA = MigrationRunner('evaluation_system')
+
+@SCHEMA.migration(1, "users, evaluations and feedback tables")
+def _migration_base_tables(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            username TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            email TEXT,
+            experience TEXT NOT NULL,
+            password TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            eval_chances TEXT,
+            eval_taken_counts TEXT,
+            skills TEXT
+        )
+    """)
+    # Databases from before skills were stored
+    add_column(conn, 'users', 'skills', 'TEXT')
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS evaluations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL,
+            date TEXT NOT NULL,
+            role TEXT NOT NULL,
+            score INTEGER NOT NULL,
+            max_score INTEGER NOT NULL,
+            percentage REAL NOT NULL,
+            time_taken REAL NOT NULL,
+            qa_history TEXT NOT NULL,
+            FOREIGN KEY (username) REFERENCES users(username)
+        )
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_evaluations_username
+        ON evaluations(username)
+    """)
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS feedback (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL,
+            date TEXT NOT NULL,
+            role TEXT,
+            skills TEXT,
+            message TEXT NOT NULL,
+            resolved INTEGER DEFAULT 0,
+            admin_comment TEXT,
+            FOREIGN KEY (username) REFERENCES users(username)
+        )
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_feedback_username
+        ON feedback(username)
+    """)
+
+@SCHEMA.migration(2, "campaign targeting and admin pagination indexes")
+def _migration_listing_indexes(conn):
+    # Covers "latest evaluation per user" lookups (campaign targeting)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_evaluations_username_date
+        ON evaluations(username, date)
+    """)
+    # Keyset pagination for the admin dashboard (newest / best first)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_evaluations_date
+        ON evaluations(date, id)
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_evaluations_percentage
+        ON evaluations(percentage, id)
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_users_created_at
+        ON users(created_at, username)
+    """)
+
+@SCHEMA.migration(3, "unified feedback columns")
+def _migration_feedback_columns(conn):
+    _ensure_feedback_columns(conn)
+
+@SCHEMA.migration(4, "full-text search index")
+def _migration_search_index(conn):
+    # An index that predates versioning is already complete; a new one is filled in the background
+    if _create_search_index(conn):
+        SCHEMA.queue_backfill(conn, 'search_index_evaluations')
+        SCHEMA.queue_backfill(conn, 'search_index_feedback')
+
+@SCHEMA.migration(5, "LLM call metrics")
+def _migration_llm_metrics(conn):
+    # IF NOT EXISTS: llm_metrics created these itself before they were versioned
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS llm_metric_counters (
+            metric TEXT NOT NULL,
+            prompt_type TEXT NOT NULL,
+            label TEXT NOT NULL DEFAULT '',
+            value REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (metric, prompt_type, label)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS llm_call_samples (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            prompt_type TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            duration_ms REAL NOT NULL,
+            status TEXT NOT NULL,
+            prompt_tokens INTEGER NOT NULL DEFAULT 0,
+            completion_tokens INTEGER NOT NULL DEFAULT 0,
+            retries INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_llm_call_samples_type
+        ON llm_call_samples(prompt_type, id)
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS llm_metric_gauges (
+            metric TEXT NOT NULL,
+            label TEXT NOT NULL,
+            source TEXT NOT NULL,
+            value REAL NOT NULL,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (metric, label, source)
+        ) WITHOUT ROWID
+    """)
+
+@SCHEMA.migration(6, "answer similarity index")
+def _migration_answer_similarity(conn):
+    # IF NOT EXISTS: plagiarism created these itself before they were versioned
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS answer_signatures (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            evaluation_id INTEGER NOT NULL REFERENCES evaluations(id),
+            question_index INTEGER NOT NULL,
+            username TEXT NOT NULL,
+            signature BLOB NOT NULL,
+            created_at TEXT NOT NULL,
+            UNIQUE (evaluation_id, question_index)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS answer_lsh (
+            band INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            answer_id INTEGER NOT NULL,
+            PRIMARY KEY (band, bucket, answer_id)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS answer_matches (
+            answer_id INTEGER NOT NULL,
+            matched_answer_id INTEGER NOT NULL,
+            similarity REAL NOT NULL,
+            created_at TEXT NOT NULL,
+            PRIMARY KEY (answer_id, matched_answer_id)
+        )
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_answer_matches_created
+        ON answer_matches(created_at, answer_id, matched_answer_id)
+    """)
+    # Deleted evaluations drop out of lookups; their LSH rows are skipped by the join
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_answer_signatures_evaluation_delete
+        AFTER DELETE ON evaluations BEGIN
+            DELETE FROM answer_matches WHERE answer_id IN
+                (SELECT id FROM answer_signatures WHERE evaluation_id = OLD.id);
+            DELETE FROM answer_signatures WHERE evaluation_id = OLD.id;
+        END
+    """)
+
+# Columns added when evaluation_feedback.db was folded into the feedback table.
+# General comments (Streamlit) leave the evaluation fields NULL; per-question
+# disputes (Flask results page) link back to evaluations(id).
+FEEDBACK_COLUMNS = [
+    ("status", "TEXT DEFAULT 'pending'"),
+    ("user_id", "TEXT"),
+    ("evaluation_id", "INTEGER REFERENCES evaluations(id)"),
+    ("question_index", "INTEGER"),
+    ("question_id", "TEXT"),
+    ("question_text", "TEXT"),
+    ("user_answer", "TEXT"),
+    ("ai_score", "INTEGER"),
+    ("ai_feedback", "TEXT"),
+    ("user_expected_score", "INTEGER"),
+    ("legacy_id", "INTEGER"),
+]
+
+def _ensure_feedback_columns(conn):
+    """Add unified feedback columns and indexes to an existing feedback table"""
+    for name, decl in FEEDBACK_COLUMNS:
+        if add_column(conn, 'feedback', name, decl):
+            if name == 'status':
+                # Carry over the old boolean flag for rows that predate status
+                conn.execute("UPDATE feedback SET status = 'resolved' WHERE resolved = 1")
     
-    try:
-        # Users table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                username TEXT PRIMARY KEY,
-                name TEXT NOT NULL,
-                email TEXT,
-                experience TEXT NOT NULL,
-                password TEXT NOT NULL,
-                created_at TEXT NOT NULL,
-                eval_chances TEXT,
-                eval_taken_counts TEXT,
-                skills TEXT
-            )
-        """)
-        
-        # Evaluations table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS evaluations (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT NOT NULL,
-                date TEXT NOT NULL,
-                role TEXT NOT NULL,
-                score INTEGER NOT NULL,
-                max_score INTEGER NOT NULL,
-                percentage REAL NOT NULL,
-                time_taken REAL NOT NULL,
-                qa_history TEXT NOT NULL,
-                FOREIGN KEY (username) REFERENCES users(username)
-            )
-        """)
-        
-        # Create index for faster queries
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_evaluations_username 
-            ON evaluations(username)
-        """)
-        
-        # Feedback table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS feedback (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT NOT NULL,
-                date TEXT NOT NULL,
-                role TEXT,
-                skills TEXT,
-                message TEXT NOT NULL,
-                resolved INTEGER DEFAULT 0,
-                admin_comment TEXT,
-                FOREIGN KEY (username) REFERENCES users(username)
-            )
-        """)
-        
-        # Create index for faster feedback queries
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_feedback_username 
-            ON feedback(username)
-        """)
-        
-        conn.commit()
-        logging.info("Database initialized successfully")
-    except Exception as e:
-        logging.error(f"Error initializing database: {e}")
-        conn.rollback()
-    finally:
-        # Ensure 'skills' column exists in existing DBs
-        try:
-            conn.execute("ALTER TABLE users ADD COLUMN skills TEXT;")
-            conn.commit()
-        except Exception:
-            # Column already exists or cannot be added; ignore
-            pass
-        conn.close()
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_feedback_date 
+        ON feedback(date, id)
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_feedback_status_date 
+        ON feedback(status, date, id)
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_feedback_username_date 
+        ON feedback(username, date, id)
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_feedback_evaluation 
+        ON feedback(evaluation_id)
+    """)
+    # One row per migrated evaluation_feedback.db entry, so the import is idempotent
+    conn.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_feedback_legacy 
+        ON feedback(legacy_id) WHERE legacy_id IS NOT NULL
+    """)
 
 # -------------------------
 # User Management Functions
@@ -279,6 +446,7 @@ def load_eval_history() -> Dict:
                 history[username] = []
             
             history[username].append({
+                'id': row['id'],
                 'date': row['date'],
                 'role': row['role'],
                 'score': row['score'],
@@ -331,8 +499,8 @@ def save_eval_history(history: Dict):
     finally:
         conn.close()
 
-def save_evaluation_result(username: str, eval_data: Dict):
-    """Save a single evaluation result to database"""
+def save_evaluation_result(username: str, eval_data: Dict) -> Optional[int]:
+    """Save a single evaluation result to database and return its id (None on failure)"""
     conn = get_connection()
     cursor = conn.cursor()
     
@@ -352,11 +520,14 @@ def save_evaluation_result(username: str, eval_data: Dict):
             json.dumps(eval_data.get('qa_history', []))
         ))
         
+        evaluation_id = cursor.lastrowid
         conn.commit()
         logging.info(f"Saved evaluation for user: {username}")
+        return evaluation_id
     except Exception as e:
         logging.error(f"Error saving evaluation result: {e}")
         conn.rollback()
+        return None
     finally:
         conn.close()
 
@@ -365,33 +536,82 @@ def get_user_evaluations(username: str) -> List[Dict]:
     history = load_eval_history()
     return history.get(username, [])
 
+def iter_campaign_targets(segment: str = 'inactive', days: int = 30, batch_size: int = 500):
+    """
+    Stream users selected for an email campaign
+    
+    Segments:
+        inactive: users with no evaluation in the last `days` days (including never)
+        never_evaluated: users who have never taken an evaluation
+    
+    Yields dicts with username, name, email and last_evaluation.
+    """
+    if segment == 'never_evaluated':
+        having = "HAVING last_evaluation IS NULL"
+        params = ()
+    elif segment == 'inactive':
+        cutoff = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+        having = "HAVING last_evaluation IS NULL OR last_evaluation < ?"
+        params = (cutoff,)
+    else:
+        raise ValueError(f"Unknown campaign segment: {segment}")
+    
+    conn = get_connection()
+    try:
+        cursor = conn.execute(f"""
+            SELECT u.username, u.name, u.email, MAX(e.date) AS last_evaluation
+            FROM users u
+            LEFT JOIN evaluations e ON e.username = u.username
+            WHERE u.email IS NOT NULL AND u.email != ''
+            GROUP BY u.username
+            {having}
+            ORDER BY u.username
+        """, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield {
+                    'username': row['username'],
+                    'name': row['name'] or row['username'],
+                    'email': row['email'],
+                    'last_evaluation': row['last_evaluation']
+                }
+    finally:
+        conn.close()
+
 # -------------------------
 # Feedback Functions
 # -------------------------
 
+def _row_to_feedback_entry(row) -> Dict:
+    """Convert a feedback row to the per-user entry format used by load_feedback"""
+    return {
+        'id': row['id'],
+        'date': row['date'],
+        'role': row['role'],
+        'skills': json.loads(row['skills']) if row['skills'] else [],
+        'message': row['message'],
+        'resolved': bool(row['resolved']),
+        'admin_comment': row['admin_comment'],
+        'status': row['status'] or ('resolved' if row['resolved'] else 'pending'),
+        'evaluation_id': row['evaluation_id'],
+        'question_index': row['question_index']
+    }
+
 def load_feedback() -> Dict:
     """Load all feedback from database and return as dictionary (compatible with JSON format)"""
     conn = get_connection()
     cursor = conn.cursor()
     
     try:
-        cursor.execute("SELECT * FROM feedback ORDER BY date")
+        cursor.execute("SELECT * FROM feedback ORDER BY date, id")
         rows = cursor.fetchall()
         
         feedback = {}
         for row in rows:
-            username = row['username']
-            if username not in feedback:
-                feedback[username] = []
-            
-            feedback[username].append({
-                'date': row['date'],
-                'role': row['role'],
-                'skills': json.loads(row['skills']) if row['skills'] else [],
-                'message': row['message'],
-                'resolved': bool(row['resolved']),
-                'admin_comment': row['admin_comment']
-            })
+            feedback.setdefault(row['username'], []).append(_row_to_feedback_entry(row))
         
         return feedback
     except Exception as e:
@@ -401,21 +621,38 @@ def load_feedback() -> Dict:
         conn.close()
 
 def save_feedback(feedback: Dict):
-    """Save all feedback to database (replaces entire feedback table)"""
+    """
+    Persist feedback entries without rewriting the table
+    
+    Entries that carry an 'id' update the resolution fields of that row;
+    entries without one are appended as new rows.
+    """
     conn = get_connection()
     cursor = conn.cursor()
     
     try:
-        # Clear existing feedback
-        cursor.execute("DELETE FROM feedback")
-        
-        # Insert all feedback entries
+        inserted = updated = 0
         for username, entries in feedback.items():
             for entry in entries:
+                if entry.get('id') is not None:
+                    resolved = bool(entry.get('resolved', False))
+                    cursor.execute("""
+                        UPDATE feedback 
+                        SET resolved = ?, admin_comment = ?, status = ?
+                        WHERE id = ?
+                    """, (
+                        1 if resolved else 0,
+                        entry.get('admin_comment'),
+                        entry.get('status') or ('resolved' if resolved else 'pending'),
+                        entry['id']
+                    ))
+                    updated += cursor.rowcount
+                    continue
+                
                 cursor.execute("""
                     INSERT INTO feedback 
-                    (username, date, role, skills, message, resolved, admin_comment)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    (username, date, role, skills, message, resolved, admin_comment, status)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                 """, (
                     username,
                     entry.get('date', datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
@@ -423,12 +660,13 @@ def save_feedback(feedback: Dict):
                     json.dumps(entry.get('skills', [])),
                     entry.get('message', ''),
                     1 if entry.get('resolved', False) else 0,
-                    entry.get('admin_comment')
+                    entry.get('admin_comment'),
+                    'resolved' if entry.get('resolved', False) else 'pending'
                 ))
+                inserted += 1
         
         conn.commit()
-        total_feedback = sum(len(entries) for entries in feedback.values())
-        logging.info(f"Saved {total_feedback} feedback entries to database")
+        logging.info(f"Saved feedback: {inserted} added, {updated} updated")
     except Exception as e:
         logging.error(f"Error saving feedback: {e}")
         conn.rollback()
@@ -444,8 +682,8 @@ def add_feedback_entry(username: str, message: str, role: str = None,
     try:
         cursor.execute("""
             INSERT INTO feedback 
-            (username, date, role, skills, message, resolved, admin_comment)
-            VALUES (?, ?, ?, ?, ?, 0, NULL)
+            (username, date, role, skills, message, resolved, admin_comment, status)
+            VALUES (?, ?, ?, ?, ?, 0, NULL, 'pending')
         """, (
             username,
             datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
@@ -462,59 +700,420 @@ def add_feedback_entry(username: str, message: str, role: str = None,
     finally:
         conn.close()
 
+def resolve_feedback(feedback_id: int, admin_comment: str = None):
+    """Mark a single feedback entry resolved, optionally with an admin note"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("""
+            UPDATE feedback 
+            SET resolved = 1, status = 'resolved', admin_comment = COALESCE(?, admin_comment)
+            WHERE id = ?
+        """, (admin_comment, feedback_id))
+        
+        conn.commit()
+        return cursor.rowcount > 0
+    except Exception as e:
+        logging.error(f"Error resolving feedback: {e}")
+        conn.rollback()
+        return False
+    finally:
+        conn.close()
+
 def get_user_feedback(username: str) -> List[Dict]:
     """Get all feedback for a specific user"""
-    feedback = load_feedback()
-    return feedback.get(username, [])
+    conn = get_connection()
+    
+    try:
+        rows = conn.execute("""
+            SELECT * FROM feedback WHERE username = ? ORDER BY date, id
+        """, (username,)).fetchall()
+        return [_row_to_feedback_entry(row) for row in rows]
+    except Exception as e:
+        logging.error(f"Error loading feedback for {username}: {e}")
+        return []
+    finally:
+        conn.close()
 
 # -------------------------
 # Migration Functions
 # -------------------------
 
-def migrate_from_json():
+# ---------------------------------
+# Streaming JSON import
+# ---------------------------------
+
+MIGRATION_BATCH_SIZE = 5000
+JSON_READ_CHUNK = 1024 * 1024
+_JSON_WHITESPACE = ' \t\r\n\ufeff'
+
+def iter_json_object(path: str, start_offset: int = 0, chunk_size: int = JSON_READ_CHUNK):
     """
-    Migrate existing JSON data to SQLite database
-    Reads users.json, evaluation_history.json, and feedback.json
+    Stream the members of a top-level JSON object without loading the whole file
+    
+    Yields (key, value, end_offset), holding one member in memory at a time.
+    end_offset is the byte offset just after the value; passing it back as
+    start_offset resumes with the next member.
     """
-    import os
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    state = {'buffer': '', 'pos': 0, 'mark': 0, 'base': start_offset, 'eof': False}
     
-    migrated_items = {'users': 0, 'evaluations': 0, 'feedback': 0}
+    def byte_offset():
+        # Encode each consumed character once to keep a byte position for checkpoints
+        state['base'] += len(state['buffer'][state['mark']:state['pos']].encode('utf-8'))
+        state['mark'] = state['pos']
+        return state['base']
     
-    # Migrate users
-    if os.path.exists('users.json'):
-        try:
-            with open('users.json', 'r') as f:
-                users_data = json.load(f)
-            save_users(users_data)
-            migrated_items['users'] = len(users_data)
-            logging.info(f"Migrated {len(users_data)} users from users.json")
-        except Exception as e:
-            logging.error(f"Error migrating users: {e}")
-    
-    # Migrate evaluation history
-    if os.path.exists('evaluation_history.json'):
-        try:
-            with open('evaluation_history.json', 'r') as f:
-                history_data = json.load(f)
-            save_eval_history(history_data)
-            total_evals = sum(len(evals) for evals in history_data.values())
-            migrated_items['evaluations'] = total_evals
-            logging.info(f"Migrated {total_evals} evaluations from evaluation_history.json")
-        except Exception as e:
-            logging.error(f"Error migrating evaluation history: {e}")
-    
-    # Migrate feedback
-    if os.path.exists('feedback.json'):
-        try:
-            with open('feedback.json', 'r') as f:
-                feedback_data = json.load(f)
-            save_feedback(feedback_data)
-            total_feedback = sum(len(entries) for entries in feedback_data.values())
-            migrated_items['feedback'] = total_feedback
-            logging.info(f"Migrated {total_feedback} feedback entries from feedback.json")
-        except Exception as e:
-            logging.error(f"Error migrating feedback: {e}")
+    def fill(f):
+        byte_offset()
+        # Read at least as much as is buffered, so retrying a large value stays linear
+        data = f.read(max(chunk_size, len(state['buffer']) - state['pos']))
+        state['buffer'] = state['buffer'][state['pos']:] + utf8.decode(data, final=not data)
+        state['pos'] = state['mark'] = 0
+        state['eof'] = not data
+    
+    def peek(f):
+        while True:
+            buffer, pos = state['buffer'], state['pos']
+            while pos < len(buffer) and buffer[pos] in _JSON_WHITESPACE:
+                pos += 1
+            state['pos'] = pos
+            if pos < len(buffer):
+                return buffer[pos]
+            if state['eof']:
+                raise ValueError(f"{path}: unexpected end of JSON")
+            fill(f)
+    
+    def decode(f):
+        while True:
+            try:
+                value, end = decoder.raw_decode(state['buffer'], state['pos'])
+                # A number cut off at the end of the buffer would decode short
+                if end < len(state['buffer']) or state['eof']:
+                    state['pos'] = end
+                    return value
+            except json.JSONDecodeError:
+                if state['eof']:
+                    raise
+            fill(f)
+    
+    with open(path, 'rb') as f:
+        f.seek(start_offset)
+        if start_offset == 0:
+            if peek(f) != '{':
+                raise ValueError(f"{path}: expected a JSON object")
+            state['pos'] += 1
+        expect_separator = start_offset > 0
+        
+        while True:
+            ch = peek(f)
+            if ch == '}':
+                return
+            if expect_separator:
+                if ch != ',':
+                    raise ValueError(f"{path}: expected ',' or '}}' near byte {byte_offset()}")
+                state['pos'] += 1
+                peek(f)
+            key = decode(f)
+            if peek(f) != ':':
+                raise ValueError(f"{path}: expected ':' after key {key!r}")
+            state['pos'] += 1
+            peek(f)
+            value = decode(f)
+            expect_separator = True
+            yield key, value, byte_offset()
+
+def _user_rows(username, user_data):
+    return [(
+        username,
+        user_data.get('name', ''),
+        user_data.get('email', ''),
+        user_data.get('experience', ''),
+        user_data.get('password', ''),
+        user_data.get('created_at', datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+        json.dumps(user_data.get('eval_chances', {})),
+        json.dumps(user_data.get('eval_taken_counts', {})),
+        json.dumps(user_data.get('skills', []))
+    )]
+
+def _evaluation_rows(username, evaluations):
+    return [(
+        username,
+        eval_data.get('date', datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+        eval_data.get('role', ''),
+        eval_data.get('score', 0),
+        eval_data.get('max_score', 0),
+        eval_data.get('percentage', 0.0),
+        eval_data.get('time_taken', 0.0),
+        json.dumps(eval_data.get('qa_history', []))
+    ) for eval_data in evaluations]
+
+def _feedback_rows(username, entries):
+    return [(
+        username,
+        entry.get('date', datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+        entry.get('role'),
+        json.dumps(entry.get('skills', [])),
+        entry.get('message', ''),
+        1 if entry.get('resolved', False) else 0,
+        entry.get('admin_comment'),
+        entry.get('status') or ('resolved' if entry.get('resolved', False) else 'pending')
+    ) for entry in entries]
+
+# (JSON file, table, row builder, INSERT statement, replaces the table on a fresh start)
+JSON_MIGRATION_SOURCES = [
+    ('users.json', 'users', _user_rows, """
+        INSERT OR REPLACE INTO users (username, name, email, experience, password,
+                                      created_at, eval_chances, eval_taken_counts, skills)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, True),
+    ('evaluation_history.json', 'evaluations', _evaluation_rows, """
+        INSERT INTO evaluations (username, date, role, score, max_score, percentage, time_taken, qa_history)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, True),
+    ('feedback.json', 'feedback', _feedback_rows, """
+        INSERT INTO feedback (username, date, role, skills, message, resolved, admin_comment, status)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, False),
+]
+
+# Tables derived from a replaced table. Their delete triggers are deferred during the
+# import, so they are emptied together with it; migrate_to_db.py re-indexes afterwards.
+REPLACE_CLEARS = {
+    'evaluations': ['answer_matches', 'answer_lsh', 'answer_signatures'],
+}
+
+def _ensure_migration_checkpoints(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS migration_checkpoints (
+            source TEXT PRIMARY KEY,
+            fingerprint TEXT NOT NULL,
+            byte_offset INTEGER NOT NULL,
+            rows INTEGER NOT NULL,
+            base_rowid INTEGER NOT NULL,
+            last_rowid INTEGER NOT NULL,
+            completed INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT NOT NULL
+        )
+    """)
+
+# Checkpoint row that is not a JSON file: search index rebuild still to do
+SEARCH_REBUILD_CHECKPOINT = 'search_index'
+
+def _set_checkpoint_flag(conn, source, completed):
+    conn.execute("""
+        INSERT OR REPLACE INTO migration_checkpoints
+        (source, fingerprint, byte_offset, rows, base_rowid, last_rowid, completed, updated_at)
+        VALUES (?, '', 0, 0, 0, 0, ?, ?)
+    """, (source, int(completed), datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+
+def _file_fingerprint(path):
+    stat = os.stat(path)
+    return f"{stat.st_size}:{int(stat.st_mtime)}"
+
+def _defer_indexes(conn, tables):
+    """
+    Drop secondary indexes and triggers on tables until _restore_indexes
+    
+    Their SQL is saved in migration_deferred_schema first, so a run that is
+    killed before restoring them gets them back on the next attempt.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS migration_deferred_schema (
+            name TEXT PRIMARY KEY,
+            type TEXT NOT NULL,
+            sql TEXT NOT NULL
+        )
+    """)
+    placeholders = ", ".join("?" for _ in tables)
+    deferred = conn.execute(f"""
+        SELECT name, type, sql FROM sqlite_master
+        WHERE type IN ('index', 'trigger') AND tbl_name IN ({placeholders}) AND sql IS NOT NULL
+    """, tables).fetchall()
+    conn.execute("BEGIN")
+    conn.executemany("INSERT OR REPLACE INTO migration_deferred_schema (name, type, sql) VALUES (?, ?, ?)",
+                     [tuple(row) for row in deferred])
+    for name, kind, _ in deferred:
+        conn.execute(f'DROP {kind.upper()} IF EXISTS "{name}"')
+    conn.execute("COMMIT")
+
+def _restore_indexes(conn):
+    """Recreate the indexes and triggers saved by _defer_indexes"""
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'migration_deferred_schema'").fetchone():
+        return
+    for name, kind, sql in conn.execute("SELECT name, type, sql FROM migration_deferred_schema ORDER BY rowid").fetchall():
+        conn.execute("BEGIN")
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = ? AND name = ?", (kind, name)).fetchone():
+            conn.execute(sql)
+        conn.execute("DELETE FROM migration_deferred_schema WHERE name = ?", (name,))
+        conn.execute("COMMIT")
+
+def _migrate_json_source(conn, path, table, build_rows, insert_sql, replace, batch_size):
+    """
+    Stream one JSON file into its table in executemany batches
+    
+    Each batch commits together with a checkpoint (byte offset and last
+    rowid). A rerun after an interruption deletes anything written past the
+    last checkpoint and continues from its offset; a completed file whose
+    size and mtime are unchanged is skipped.
+    
+    Returns:
+        tuple: (rows migrated in total, rows present in the table for this import,
+                whether this call wrote anything)
+    """
+    fingerprint = _file_fingerprint(path)
+    checkpoint = conn.execute("SELECT * FROM migration_checkpoints WHERE source = ?", (path,)).fetchone()
+    if checkpoint and checkpoint['fingerprint'] != fingerprint:
+        logging.warning(f"{path} changed since the last migration attempt; starting it over")
+        checkpoint = None
+    
+    written = not (checkpoint and checkpoint['completed'])
+    if not written:
+        logging.info(f"{path} already migrated ({checkpoint['rows']} rows); skipping")
+    else:
+        if checkpoint:
+            offset, rows, base_rowid = checkpoint['byte_offset'], checkpoint['rows'], checkpoint['base_rowid']
+            conn.execute("BEGIN")
+            conn.execute(f"DELETE FROM {table} WHERE rowid > ?", (checkpoint['last_rowid'],))
+            conn.execute("COMMIT")
+            logging.info(f"Resuming {path} at byte {offset} ({rows} rows already migrated)")
+        else:
+            offset = rows = 0
+            conn.execute("BEGIN")
+            if replace:
+                conn.execute(f"DELETE FROM {table}")
+                for derived in REPLACE_CLEARS.get(table, []):
+                    conn.execute(f"DELETE FROM {derived}")
+            base_rowid = conn.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {table}").fetchone()[0]
+            conn.execute("COMMIT")
+        
+        def commit_batch(batch, end_offset, completed):
+            conn.execute("BEGIN")
+            if batch:
+                conn.executemany(insert_sql, batch)
+            last_rowid = conn.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {table}").fetchone()[0]
+            conn.execute("""
+                INSERT OR REPLACE INTO migration_checkpoints
+                (source, fingerprint, byte_offset, rows, base_rowid, last_rowid, completed, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (path, fingerprint, end_offset, rows, base_rowid, last_rowid, int(completed),
+                  datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+            conn.execute("COMMIT")
+        
+        batch = []
+        for key, value, end_offset in iter_json_object(path, offset):
+            member_rows = build_rows(key, value)
+            batch.extend(member_rows)
+            rows += len(member_rows)
+            offset = end_offset
+            if len(batch) >= batch_size:
+                commit_batch(batch, offset, False)
+                batch = []
+        commit_batch(batch, offset, True)
+        checkpoint = conn.execute("SELECT * FROM migration_checkpoints WHERE source = ?", (path,)).fetchone()
     
+    present = conn.execute(f"SELECT COUNT(*) FROM {table} WHERE rowid > ?",
+                           (checkpoint['base_rowid'],)).fetchone()[0]
+    return checkpoint['rows'], present, written
+
+def _backup_database(conn) -> str:
+    """Copy the database to a timestamped file next to it; returns the copy's path"""
+    backup_path = f"{DB_FILE}.{datetime.now().strftime('%Y%m%d_%H%M%S')}.bak"
+    target = sqlite3.connect(backup_path)
+    try:
+        conn.backup(target)
+    finally:
+        target.close()
+    return backup_path
+
+def migrate_from_json(batch_size: int = MIGRATION_BATCH_SIZE, fast: bool = False) -> Dict:
+    """
+    Migrate existing JSON data to SQLite database
+    Streams users.json, evaluation_history.json, and feedback.json in bulk batches
+    
+    Secondary indexes and triggers are dropped for the import and recreated
+    afterwards, and the search index is rebuilt once at the end. A failed
+    batch is rolled back and a rerun resumes from the last checkpoint.
+    
+    fast switches the rollback journal and fsync off for the import. The
+    database is copied first, because a failure then cannot be rolled back:
+    the import stops with a RuntimeError and the copy has to be restored
+    before running it again.
+    
+    Returns:
+        dict: Rows migrated per table, plus 'verified' (table counts match the
+              JSON files), 'seconds' and 'backup' (the copy taken in fast mode)
+    """
+    started = time.perf_counter()
+    migrated_items = {'users': 0, 'evaluations': 0, 'feedback': 0, 'verified': True, 'backup': None}
+    sources = [source for source in JSON_MIGRATION_SOURCES if os.path.exists(source[0])]
+    if not sources:
+        migrated_items['seconds'] = 0.0
+        return migrated_items
+    
+    conn = get_connection()
+    conn.isolation_level = None  # batches manage their own transactions
+    journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    synchronous = conn.execute("PRAGMA synchronous").fetchone()[0]
+    _ensure_migration_checkpoints(conn)
+    # Left over if an earlier run was killed before restoring them
+    _restore_indexes(conn)
+    if fast:
+        migrated_items['backup'] = _backup_database(conn)
+    _defer_indexes(conn, [source[1] for source in sources])
+    unjournaled_failure = False
+    try:
+        if fast:
+            conn.execute("PRAGMA journal_mode = OFF")
+            conn.execute("PRAGMA synchronous = OFF")
+        for path, table, build_rows, insert_sql, replace in sources:
+            try:
+                rows, present, written = _migrate_json_source(conn, path, table, build_rows, insert_sql,
+                                                              replace, batch_size)
+                migrated_items[table] = rows
+                if written and table in ('evaluations', 'feedback'):
+                    # Recorded in the database, so a run killed before the rebuild still does it on rerun
+                    _set_checkpoint_flag(conn, SEARCH_REBUILD_CHECKPOINT, False)
+                if rows != present:
+                    migrated_items['verified'] = False
+                    logging.error(f"Verification failed for {path}: {rows} rows in JSON, {present} in {table}")
+                elif written:
+                    logging.info(f"Migrated {rows} {table} rows from {path}")
+            except Exception as e:
+                if fast:
+                    # With the journal off ROLLBACK cannot undo the batch; the file may be half written
+                    unjournaled_failure = True
+                    raise RuntimeError(f"Error migrating {path} with the journal off: {e}. The database "
+                                       f"may be damaged; restore {migrated_items['backup']} before "
+                                       f"running the migration again") from e
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                migrated_items['verified'] = False
+                logging.error(f"Error migrating {path} (rerun to resume): {e}")
+        _restore_indexes(conn)
+        # The rebuild runs journaled in one transaction, so a crash rolls it back instead of
+        # leaving broken FTS tables behind
+        conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+        conn.execute(f"PRAGMA synchronous = {synchronous}")
+        pending = conn.execute("SELECT completed FROM migration_checkpoints WHERE source = ?",
+                               (SEARCH_REBUILD_CHECKPOINT,)).fetchone()
+        if pending and not pending['completed']:
+            # One bulk rebuild instead of the per-row triggers
+            conn.execute("BEGIN")
+            conn.execute("DROP TABLE IF EXISTS search_index")
+            _set_checkpoint_flag(conn, SEARCH_REBUILD_CHECKPOINT, True)
+            _ensure_search_index(conn)
+    finally:
+        # After an unjournaled failure the file is left as it is for the restore
+        if not unjournaled_failure:
+            _restore_indexes(conn)
+            conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+            conn.execute(f"PRAGMA synchronous = {synchronous}")
+        conn.close()
+    
+    migrated_items['seconds'] = round(time.perf_counter() - started, 2)
     return migrated_items
 
 def backup_json_files():
@@ -795,5 +1394,426 @@ def admin_get_all_users_summary():
         conn.close()
 
 
-# Initialize database on module import
-init_database()
+# Full-text index over evaluation Q&A and feedback (qa_history uses q/a keys from
+# the Streamlit app and question/answer keys from the Flask app). Rowids are derived from the
+# source row so triggers can replace a row's entries with a rowid range delete:
+#   evaluation question  -> evaluations.id * SEARCH_ROWID_STRIDE + question_index
+#   feedback entry       -> -feedback.id
+SEARCH_ROWID_STRIDE = 1000
+
+def _qa_json(column):
+    """SQL expression that yields an empty list for missing or malformed qa_history"""
+    return f"CASE WHEN json_valid({column}) THEN {column} ELSE '[]' END"
+
+_SEARCH_COLUMNS = "(rowid, question, answer, ai_feedback, user_feedback, kind, ref_id, question_index, username)"
+
+def _search_evaluation_rows(src, source=''):
+    """SELECT yielding one search row per question of the evaluations row(s) src"""
+    return f"""
+        SELECT {src}.id * {SEARCH_ROWID_STRIDE} + CAST(q.key AS INTEGER),
+               COALESCE(json_extract(q.value, '$.q'), json_extract(q.value, '$.question')),
+               COALESCE(json_extract(q.value, '$.a'), json_extract(q.value, '$.answer')),
+               json_extract(q.value, '$.feedback'), NULL,
+               'evaluation', {src}.id, CAST(q.key AS INTEGER), {src}.username
+        FROM {source}json_each({_qa_json(f'{src}.qa_history')}) q
+        WHERE CAST(q.key AS INTEGER) < {SEARCH_ROWID_STRIDE}
+    """
+
+def _search_feedback_row(src):
+    return f"""
+        SELECT -{src}.id, {src}.question_text, {src}.user_answer, {src}.ai_feedback, {src}.message,
+               'feedback', {src}.id, {src}.question_index, {src}.username
+    """
+
+def _create_search_index(conn):
+    """
+    Create the FTS5 search index and its sync triggers without filling it
+
+    Uses single statements rather than executescript so it can run inside a
+    schema migration's transaction.
+
+    Returns:
+        bool: True if the index table did not exist before
+    """
+    exists = conn.execute("""
+        SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_index'
+    """).fetchone()
+    if not exists:
+        conn.execute("""
+            CREATE VIRTUAL TABLE search_index USING fts5(
+                question, answer, ai_feedback, user_feedback,
+                kind UNINDEXED, ref_id UNINDEXED, question_index UNINDEXED, username UNINDEXED,
+                tokenize = 'unicode61 remove_diacritics 2'
+            )
+        """)
+
+    evaluation_range = f"rowid BETWEEN OLD.id * {SEARCH_ROWID_STRIDE} AND OLD.id * {SEARCH_ROWID_STRIDE} + {SEARCH_ROWID_STRIDE - 1}"
+    triggers = [
+        f"""CREATE TRIGGER IF NOT EXISTS trg_search_evaluations_insert AFTER INSERT ON evaluations BEGIN
+            INSERT INTO search_index {_SEARCH_COLUMNS} {_search_evaluation_rows('NEW')};
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_search_evaluations_update AFTER UPDATE OF qa_history, username ON evaluations BEGIN
+            DELETE FROM search_index WHERE {evaluation_range};
+            INSERT INTO search_index {_SEARCH_COLUMNS} {_search_evaluation_rows('NEW')};
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_search_evaluations_delete AFTER DELETE ON evaluations BEGIN
+            DELETE FROM search_index WHERE {evaluation_range};
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_search_feedback_insert AFTER INSERT ON feedback BEGIN
+            INSERT INTO search_index {_SEARCH_COLUMNS} {_search_feedback_row('NEW')};
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_search_feedback_update
+        AFTER UPDATE OF message, question_text, user_answer, ai_feedback, question_index ON feedback BEGIN
+            DELETE FROM search_index WHERE rowid = -OLD.id;
+            INSERT INTO search_index {_SEARCH_COLUMNS} {_search_feedback_row('NEW')};
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_search_feedback_delete AFTER DELETE ON feedback BEGIN
+            DELETE FROM search_index WHERE rowid = -OLD.id;
+        END""",
+    ]
+    for trigger in triggers:
+        conn.execute(trigger)
+    return not exists
+
+def _ensure_search_index(conn):
+    """Create the FTS5 search index and its sync triggers, filling it in one pass on first run"""
+    if _create_search_index(conn):
+        conn.execute(f"INSERT INTO search_index {_SEARCH_COLUMNS} {_search_evaluation_rows('evaluations', 'evaluations, ')}")
+        conn.execute(f"INSERT INTO search_index {_SEARCH_COLUMNS} {_search_feedback_row('feedback')} FROM feedback")
+    conn.commit()
+
+# Online fill of a search index created by the schema migration. The sync
+# triggers are live by then and may have indexed rows in the range already,
+# so each batch deletes before inserting.
+@SCHEMA.backfill('search_index_evaluations', 'evaluations')
+def _backfill_search_evaluations(conn, low, high):
+    conn.execute("DELETE FROM search_index WHERE rowid BETWEEN ? AND ?",
+                 (low * SEARCH_ROWID_STRIDE, high * SEARCH_ROWID_STRIDE + SEARCH_ROWID_STRIDE - 1))
+    conn.execute(f"""
+        INSERT INTO search_index {_SEARCH_COLUMNS}
+        {_search_evaluation_rows('evaluations', 'evaluations, ')} AND evaluations.id BETWEEN ? AND ?
+    """, (low, high))
+
+@SCHEMA.backfill('search_index_feedback', 'feedback')
+def _backfill_search_feedback(conn, low, high):
+    conn.execute("DELETE FROM search_index WHERE rowid BETWEEN ? AND ?", (-high, -low))
+    conn.execute(f"""
+        INSERT INTO search_index {_SEARCH_COLUMNS}
+        {_search_feedback_row('feedback')} FROM feedback WHERE feedback.id BETWEEN ? AND ?
+    """, (low, high))
+
+def rebuild_search_index():
+    """Drop and rebuild the full-text search index from evaluations and feedback"""
+    conn = get_connection()
+    try:
+        conn.execute("DROP TABLE IF EXISTS search_index")
+        conn.commit()
+        _ensure_search_index(conn)
+        return conn.execute("SELECT COUNT(*) FROM search_index").fetchone()[0]
+    finally:
+        conn.close()
+
+def reset_search_index():
+    """
+    Recreate the search index if it was dropped and queue a full backfill
+    
+    For bulk loaders that drop the index and its triggers while inserting:
+    the app fills it in the background on its next start instead of the
+    loader paying for a rebuild.
+    """
+    conn = get_connection()
+    conn.isolation_level = None
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        _create_search_index(conn)
+        SCHEMA.queue_backfill(conn, 'search_index_evaluations')
+        SCHEMA.queue_backfill(conn, 'search_index_feedback')
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+SEARCH_FIELDS = ['question', 'answer', 'ai_feedback', 'user_feedback']
+SEARCH_KINDS = ('evaluation', 'feedback')
+
+def _fts_phrase_query(text: str) -> str:
+    """Quote every term so punctuation in pasted snippets is matched literally"""
+    terms = text.split()
+    return " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+def _highlight_html(fragment: Optional[str]) -> Optional[str]:
+    """Escape a snippet and turn the snippet() match markers into <mark> tags"""
+    if fragment is None or '\x02' not in fragment:
+        return None
+    escaped = html.escape(fragment)
+    return escaped.replace('\x02', '<mark>').replace('\x03', '</mark>')
+
+def admin_search(query: str, kind: str = None, username: str = None,
+                 limit: int = 20, cursor: str = None) -> Dict:
+    """
+    Ranked full-text search over questions, answers, AI feedback and user feedback
+    
+    Args:
+        query: FTS5 query; if it is not valid FTS5 syntax it is searched as plain terms
+        kind: 'evaluation' or 'feedback' to restrict the source
+        username: Restrict to one user
+        cursor: next_cursor from the previous page
+    
+    Returns:
+        dict: success, results (best match first, with HTML-highlighted snippets) and next_cursor
+    """
+    query = (query or '').strip()
+    if not query:
+        return {'success': False, 'error': 'Search query is required'}
+    if kind and kind not in SEARCH_KINDS:
+        return {'success': False, 'error': f'Unsupported kind: {kind}'}
+    limit = max(1, min(int(limit or 20), ADMIN_PAGE_MAX))
+    if cursor and not cursor.isdigit():
+        return {'success': False, 'error': 'Invalid cursor'}
+    offset = int(cursor) if cursor else 0
+    
+    clauses, params = ["search_index MATCH ?"], []
+    if kind:
+        clauses.append("kind = ?")
+        params.append(kind)
+    if username:
+        clauses.append("username = ?")
+        params.append(username)
+    snippets = ", ".join(
+        f"snippet(search_index, {i}, char(2), char(3), '…', 32) AS {field}"
+        for i, field in enumerate(SEARCH_FIELDS)
+    )
+    sql = f"""
+        SELECT kind, ref_id, question_index, username, {snippets},
+               bm25(search_index, 2.0, 3.0, 1.0, 1.0) AS rank
+        FROM search_index
+        WHERE {' AND '.join(clauses)}
+        ORDER BY rank, rowid
+        LIMIT ? OFFSET ?
+    """
+    
+    conn = get_connection()
+    try:
+        try:
+            rows = conn.execute(sql, (query, *params, limit + 1, offset)).fetchall()
+        except sqlite3.OperationalError as e:
+            if 'search_index' in str(e) and 'no such table' in str(e):
+                raise
+            rows = conn.execute(sql, (_fts_phrase_query(query), *params, limit + 1, offset)).fetchall()
+        
+        results = []
+        for row in rows[:limit]:
+            results.append({
+                'kind': row['kind'],
+                'evaluation_id': row['ref_id'] if row['kind'] == 'evaluation' else None,
+                'feedback_id': row['ref_id'] if row['kind'] == 'feedback' else None,
+                'question_index': row['question_index'],
+                'username': row['username'],
+                'score': round(-row['rank'], 4),
+                'highlights': {
+                    field: _highlight_html(row[field])
+                    for field in SEARCH_FIELDS if _highlight_html(row[field])
+                }
+            })
+        next_cursor = str(offset + limit) if len(rows) > limit else None
+        return {'success': True, 'results': results, 'next_cursor': next_cursor}
+    except Exception as e:
+        logging.error(f"Error searching: {e}")
+        return {'success': False, 'error': str(e)}
+    finally:
+        conn.close()
+
+
+# -------------------------
+# Paginated Admin Listings
+# -------------------------
+
+ADMIN_PAGE_MAX = 200
+
+class InvalidCursor(ValueError):
+    """Raised for a pagination cursor that _encode_cursor did not produce"""
+    pass
+
+def _encode_cursor(sort_value, row_key) -> str:
+    """Build an opaque cursor from the sort value and unique key of a page's last row"""
+    payload = json.dumps([sort_value, row_key], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def _decode_cursor(cursor: str):
+    """Split a cursor into (sort_value, row_key); raises InvalidCursor if it is malformed"""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        sort_value, row_key = json.loads(payload.decode('utf-8'))
+    except (ValueError, TypeError, binascii.Error) as e:
+        raise InvalidCursor('Invalid cursor') from e
+    return sort_value, row_key
+
+def _like_prefix(text: str) -> str:
+    """LIKE pattern matching text as a literal prefix (use with ESCAPE '\\')"""
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+def _keyset_page(conn, select_sql: str, clauses: List[str], params: List,
+                 sort_col: str, key_col: str, order: str, limit: int, cursor: Optional[str],
+                 cast=str, key_cast=str):
+    """
+    Run one keyset-paginated query ordered by (sort_col, key_col)
+    
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    limit = max(1, min(int(limit or 50), ADMIN_PAGE_MAX))
+    desc = order != 'asc'
+    clauses = list(clauses)
+    params = list(params)
+    if cursor:
+        sort_value, row_key = _decode_cursor(cursor)
+        try:
+            sort_value, row_key = cast(sort_value), key_cast(row_key)
+        except (ValueError, TypeError) as e:
+            raise InvalidCursor('Invalid cursor') from e
+        op = '<' if desc else '>'
+        clauses.append(f"({sort_col} {op} ? OR ({sort_col} = ? AND {key_col} {op} ?))")
+        params.extend([sort_value, sort_value, row_key])
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    direction = 'DESC' if desc else 'ASC'
+    
+    rows = conn.execute(f"""
+        {select_sql}
+        {where}
+        ORDER BY {sort_col} {direction}, {key_col} {direction}
+        LIMIT ?
+    """, (*params, limit + 1)).fetchall()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = _encode_cursor(last[sort_col.split('.')[-1]], last[key_col.split('.')[-1]])
+    return rows, next_cursor
+
+def admin_get_counts() -> Dict:
+    """Row counts for the admin dashboard header"""
+    conn = get_connection()
+    
+    try:
+        row = conn.execute("""
+            SELECT (SELECT COUNT(*) FROM users) AS users,
+                   (SELECT COUNT(*) FROM evaluations) AS evaluations,
+                   (SELECT COUNT(*) FROM feedback) AS feedback,
+                   (SELECT COUNT(*) FROM feedback WHERE status = 'pending') AS pending_feedback
+        """).fetchone()
+        return dict(row)
+    except Exception as e:
+        logging.error(f"Error counting admin dashboard rows: {e}")
+        return {'users': 0, 'evaluations': 0, 'feedback': 0, 'pending_feedback': 0}
+    finally:
+        conn.close()
+
+def admin_list_users(limit: int = 50, cursor: str = None, sort: str = 'created_at',
+                     order: str = 'desc', search: str = None) -> Dict:
+    """
+    Get one page of users for the admin dashboard
+    
+    Args:
+        sort: 'created_at' or 'username'
+        order: 'asc' or 'desc'
+        search: Case-insensitive prefix match on username, name or email
+    
+    Returns:
+        dict: success, users (with eval_count) and next_cursor
+    """
+    sort_col = {'created_at': 'u.created_at', 'username': 'u.username'}.get(sort)
+    if not sort_col:
+        return {'success': False, 'error': f'Unsupported sort: {sort}'}
+    
+    clauses, params = [], []
+    if search:
+        clauses.append("(u.username LIKE ? ESCAPE '\\' OR u.name LIKE ? ESCAPE '\\' OR u.email LIKE ? ESCAPE '\\')")
+        params.extend([_like_prefix(search)] * 3)
+    
+    conn = get_connection()
+    try:
+        rows, next_cursor = _keyset_page(
+            conn,
+            """
+            SELECT u.username, u.name, u.email, u.experience, u.created_at, u.skills,
+                   (SELECT COUNT(*) FROM evaluations e WHERE e.username = u.username) AS eval_count
+            FROM users u
+            """,
+            clauses, params, sort_col, 'u.username', order, limit, cursor
+        )
+        users = [{
+            'username': row['username'],
+            'name': row['name'],
+            'email': row['email'] or '',
+            'experience': row['experience'],
+            'created_at': row['created_at'],
+            'skills': json.loads(row['skills']) if row['skills'] else [],
+            'eval_count': row['eval_count']
+        } for row in rows]
+        return {'success': True, 'users': users, 'next_cursor': next_cursor}
+    except InvalidCursor as e:
+        return {'success': False, 'error': str(e)}
+    except Exception as e:
+        logging.error(f"Error listing users: {e}")
+        return {'success': False, 'error': str(e)}
+    finally:
+        conn.close()
+
+def admin_list_evaluations(limit: int = 50, cursor: str = None, sort: str = 'date',
+                           order: str = 'desc', username: str = None, role: str = None,
+                           since: str = None, until: str = None,
+                           min_percentage: float = None, max_percentage: float = None) -> Dict:
+    """
+    Get one page of evaluation summaries (without qa_history) for the admin dashboard
+    
+    Args:
+        sort: 'date' or 'percentage'
+        order: 'asc' or 'desc'
+        username / role: Exact-match filters
+        since / until: Date bounds (until is exclusive)
+        min_percentage / max_percentage: Inclusive score bounds
+    
+    Returns:
+        dict: success, evaluations and next_cursor
+    """
+    if sort not in ('date', 'percentage'):
+        return {'success': False, 'error': f'Unsupported sort: {sort}'}
+    
+    clauses, params = [], []
+    if username:
+        clauses.append("username = ?")
+        params.append(username)
+    if role:
+        clauses.append("role = ?")
+        params.append(role)
+    if since:
+        clauses.append("date >= ?")
+        params.append(since)
+    if until:
+        clauses.append("date < ?")
+        params.append(until)
+    if min_percentage is not None:
+        clauses.append("percentage >= ?")
+        params.append(min_percentage)
+    if max_percentage is not None:
+        clauses.append("percentage <= ?")
+        params.append(max_percentage)
+    
+    conn = get_connection()
+    try:
+        rows, next_cursor = _keyset_page(
+            conn,
+            """
+            SELECT id, username, date, role, score, max_score, percentage, time_taken
+            FROM evaluations
+            """,
+            clauses, params, sort, 'id', order, limit, cursor,
+            cast=float if sort == 'percentage' else str, key_cast=int
+        )
+        return {'success': True, 'evaluations': [dict(row) for row in rows], 'next_cursor': next_cursor}
+    except InvalidCursor as e:
+        return {'success': False, 'error': str(e)}
+    except Exception as e:
+        logging.error(f"Error listing evaluations: {e}")
+        return {'success': False, 'error': str(e)}
+    finally:
+        conn.close()
@@ -1,11 +1,31 @@
 """
 Email Service Module
-Mock email service that simulates sending emails without actually sending them
+Queues emails in a SQLite outbox and delivers them from a background
+dispatcher through a pluggable transport (mock console logger by default)
 """
 
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
 import os
+import random
+import smtplib
+import sqlite3
+import string
+import threading
+import time
+from email.message import EmailMessage
+
+from schema_migrations import MigrationRunner, add_column
+
+# Outbox configuration (override via environment)
+EMAIL_DB = os.environ.get('EMAIL_OUTBOX_DB', 'email_outbox.db')
+LEGACY_LOG_FILE = 'email_logs.json'
+DISPATCH_BATCH_SIZE = int(os.environ.get('EMAIL_BATCH_SIZE', '20'))
+MAX_ATTEMPTS = int(os.environ.get('EMAIL_MAX_ATTEMPTS', '5'))
+RETRY_BASE_SECONDS = float(os.environ.get('EMAIL_RETRY_BASE_SECONDS', '2'))
+POLL_INTERVAL_SECONDS = float(os.environ.get('EMAIL_POLL_INTERVAL_SECONDS', '2'))
+STALE_CLAIM_SECONDS = 300
+DISPATCHER_ENABLED = os.environ.get('EMAIL_DISPATCHER', 'on').lower() not in ('0', 'off', 'false', 'no')
 
 # Email templates
 EMAIL_TEMPLATES = {
@@ -103,34 +123,303 @@ AI Evaluation Team
     }
 }
 
+class CompiledTemplate:
+    """An email template whose placeholders are parsed and validated once"""
+    
+    def __init__(self, name, subject, body):
+        self.name = name
+        self.subject = subject
+        self.body = body
+        fields = set()
+        for _, field_name, format_spec, _ in string.Formatter().parse(body):
+            if field_name is None:
+                continue
+            if not field_name.isidentifier():
+                raise ValueError(f"Template '{name}' has invalid placeholder {{{field_name}}}")
+            if format_spec and '{' in format_spec:
+                raise ValueError(f"Template '{name}' uses a nested placeholder in {{{field_name}}}")
+            fields.add(field_name)
+        self.fields = frozenset(fields)
+    
+    def missing(self, values):
+        """Return the placeholders not supplied by values"""
+        return sorted(self.fields.difference(values))
+    
+    def render(self, values):
+        """Render the body; raises KeyError naming any missing placeholders"""
+        if not self.fields.issubset(values):
+            raise KeyError(', '.join(self.missing(values)))
+        # Placeholders are plain identifiers, so format_map never evaluates
+        # attribute or index lookups and unused extra values are ignored
+        return self.body.format_map(values)
+
+# Templates are compiled (and validated) once at import
+COMPILED_TEMPLATES = {
+    name: CompiledTemplate(name, template['subject'], template['body'])
+    for name, template in EMAIL_TEMPLATES.items()
+}
+
+
+class MockTransport:
+    """Default transport: logs emails to the console instead of sending them"""
+    
+    name = 'mock'
+    
+    def send(self, message):
+        """Print the email; never fails"""
+        print("\n" + "="*60)
+        print("📧 EMAIL SENT (MOCK)")
+        print("="*60)
+        print(f"To: {message['to']}")
+        print(f"Subject: {message['subject']}")
+        print(f"Template: {message['template']}")
+        print(f"Timestamp: {message['timestamp']}")
+        print("="*60 + "\n")
+
+
+class SMTPTransport:
+    """Delivers emails through an SMTP server"""
+    
+    name = 'smtp'
+    
+    def __init__(self, host, port=587, username=None, password=None, use_tls=True, sender=None):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.sender = sender or username or 'no-reply@localhost'
+    
+    def send(self, message):
+        """Send one email; raises on failure so the dispatcher can retry"""
+        msg = EmailMessage()
+        msg['From'] = self.sender
+        msg['To'] = message['to']
+        msg['Subject'] = message['subject']
+        msg.set_content(message['body'])
+        
+        with smtplib.SMTP(self.host, self.port, timeout=30) as server:
+            if self.use_tls:
+                server.starttls()
+            if self.username:
+                server.login(self.username, self.password or '')
+            server.send_message(msg)
+
+
+def transport_from_env():
+    """Build the transport selected by EMAIL_TRANSPORT (mock or smtp)"""
+    if os.environ.get('EMAIL_TRANSPORT', 'mock').lower() == 'smtp':
+        return SMTPTransport(
+            host=os.environ.get('SMTP_HOST', 'localhost'),
+            port=int(os.environ.get('SMTP_PORT', '587')),
+            username=os.environ.get('SMTP_USERNAME'),
+            password=os.environ.get('SMTP_PASSWORD'),
+            use_tls=os.environ.get('SMTP_USE_TLS', 'true').lower() in ('1', 'true', 'yes', 'on'),
+            sender=os.environ.get('SMTP_SENDER')
+        )
+    return MockTransport()
+
+
+# Outbox schema versions (PRAGMA user_version); append new ones, never edit shipped ones
+OUTBOX_SCHEMA = MigrationRunner('email_outbox')
+
+@OUTBOX_SCHEMA.migration(1, "outbox table")
+def _migration_outbox(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS email_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            to_email TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            body TEXT NOT NULL,
+            template TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            created_at TEXT NOT NULL,
+            next_attempt_at REAL NOT NULL,
+            claimed_at REAL,
+            sent_at TEXT,
+            campaign_id INTEGER,
+            dedup_key TEXT
+        )
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_outbox_due
+        ON email_outbox(status, next_attempt_at)
+    """)
+
+@OUTBOX_SCHEMA.migration(2, "email log query indexes")
+def _migration_log_indexes(conn):
+    # Newest-first listing filtered by recipient, template or date
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_outbox_recipient
+        ON email_outbox(to_email COLLATE NOCASE, id)
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_outbox_template
+        ON email_outbox(template, id)
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_outbox_created
+        ON email_outbox(created_at)
+    """)
+
+@OUTBOX_SCHEMA.migration(3, "campaigns")
+def _migration_campaigns(conn):
+    # Outboxes created before campaigns existed lack these columns
+    add_column(conn, 'email_outbox', 'campaign_id', 'INTEGER')
+    add_column(conn, 'email_outbox', 'dedup_key', 'TEXT')
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_outbox_campaign
+        ON email_outbox(campaign_id, status)
+    """)
+    conn.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_outbox_dedup
+        ON email_outbox(dedup_key) WHERE dedup_key IS NOT NULL
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS email_campaigns (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            template TEXT NOT NULL,
+            params TEXT,
+            status TEXT NOT NULL DEFAULT 'running',
+            targets INTEGER NOT NULL DEFAULT 0,
+            enqueued INTEGER NOT NULL DEFAULT 0,
+            skipped_duplicates INTEGER NOT NULL DEFAULT 0,
+            rate_per_minute INTEGER,
+            created_at TEXT NOT NULL,
+            completed_at TEXT,
+            error TEXT
+        )
+    """)
+
+@OUTBOX_SCHEMA.migration(4, "rolling dedup window and campaign slot index")
+def _migration_rolling_dedup(conn):
+    # Keys were "template:email:window" with fixed epoch windows and unique; send_bulk now looks
+    # for the same "template:email" key created within the last dedup_days. Only campaign rows
+    # carry a key, so this is one UPDATE over them
+    conn.execute("DROP INDEX IF EXISTS idx_outbox_dedup")
+    conn.execute("""
+        UPDATE email_outbox SET dedup_key = template || ':' || lower(to_email)
+        WHERE dedup_key IS NOT NULL
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_outbox_dedup
+        ON email_outbox(dedup_key, created_at) WHERE dedup_key IS NOT NULL
+    """)
+    # Last scheduled campaign slot, shared by all campaigns (see send_bulk)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_outbox_campaign_slots
+        ON email_outbox(next_attempt_at) WHERE campaign_id IS NOT NULL AND status = 'queued'
+    """)
+
+
 class EmailService:
-    """Mock email service that logs emails instead of sending them"""
+    """
+    Email service backed by a durable SQLite outbox.
+    Request handlers only enqueue; a daemon thread claims queued rows in
+    batches and hands them to the transport, retrying failures with
+    exponential backoff.
+    """
     
-    def __init__(self):
-        self.email_log_file = 'email_logs.json'
-        self.sent_emails = []
-        self._load_logs()
+    def __init__(self, db_path=EMAIL_DB, transport=None, legacy_log_file=LEGACY_LOG_FILE):
+        self.db_path = db_path
+        self.email_log_file = legacy_log_file
+        self.transport = transport or transport_from_env()
+        self._dispatcher = None
+        self._dispatcher_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        # Schema and legacy log import wait for the first outbox access, so importing this module stays cheap
+        self._ready = False
+        self._ready_lock = threading.Lock()
     
-    def _load_logs(self):
-        """Load email logs from file"""
-        if os.path.exists(self.email_log_file):
+    def _connect(self):
+        """Open a connection to the outbox database, preparing it on first use"""
+        if not self._ready:
+            self._prepare()
+        return self._open()
+    
+    def _open(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+    
+    def _prepare(self):
+        with self._ready_lock:
+            if self._ready:
+                return
+            self._init_db()
+            self._import_legacy_logs()
+            self._ready = True
+    
+    def _init_db(self):
+        """Create or upgrade the outbox schema (see OUTBOX_SCHEMA)"""
+        conn = self._open()
+        try:
+            # Persistent per file, and cannot be switched inside the migration transaction
+            conn.execute("PRAGMA journal_mode=WAL")
+        finally:
+            conn.close()
+        OUTBOX_SCHEMA.ensure(self.db_path)
+    
+    def _import_legacy_logs(self):
+        """One-time import of the old email_logs.json into the outbox as sent mail"""
+        if not os.path.exists(self.email_log_file):
+            return
+        conn = self._open()
+        try:
+            if conn.execute("SELECT 1 FROM email_outbox LIMIT 1").fetchone():
+                return
             try:
                 with open(self.email_log_file, 'r') as f:
-                    self.sent_emails = json.load(f)
-            except:
-                self.sent_emails = []
+                    legacy = json.load(f)
+            except Exception:
+                return
+            conn.executemany("""
+                INSERT INTO email_outbox
+                (to_email, subject, body, template, status, attempts, created_at, next_attempt_at, sent_at)
+                VALUES (?, ?, ?, ?, 'sent', 1, ?, 0, ?)
+            """, [
+                (e.get('to') or '', e.get('subject', ''), e.get('body', ''), e.get('template', ''),
+                 e.get('timestamp', ''), e.get('timestamp', ''))
+                for e in legacy
+            ])
+            conn.commit()
+        finally:
+            conn.close()
     
-    def _save_logs(self):
-        """Save email logs to file"""
+    def set_transport(self, transport):
+        """Swap the delivery transport (any object with a send(message) method)"""
+        self.transport = transport
+    
+    def enqueue(self, to_email, subject, body, template_name):
+        """
+        Durably queue an email for background delivery
+        
+        Returns:
+            int: Outbox row ID
+        """
+        conn = self._connect()
         try:
-            with open(self.email_log_file, 'w') as f:
-                json.dump(self.sent_emails, f, indent=2)
-        except Exception as e:
-            print(f"Error saving email logs: {e}")
+            cursor = conn.execute("""
+                INSERT INTO email_outbox
+                (to_email, subject, body, template, status, created_at, next_attempt_at)
+                VALUES (?, ?, ?, ?, 'queued', ?, ?)
+            """, (to_email, subject, body, template_name, datetime.now().isoformat(), time.time()))
+            conn.commit()
+            email_id = cursor.lastrowid
+        finally:
+            conn.close()
+        
+        self._ensure_dispatcher()
+        self._wake.set()
+        return email_id
     
     def send_email(self, to_email, template_name, **kwargs):
         """
-        Mock send email - logs the email instead of actually sending
+        Render a template and queue the email for delivery
         
         Args:
             to_email: Recipient email address
@@ -138,50 +427,28 @@ class EmailService:
             **kwargs: Template variables
         
         Returns:
-            dict: Email send status
+            dict: Enqueue status
         """
-        if template_name not in EMAIL_TEMPLATES:
+        if template_name not in COMPILED_TEMPLATES:
             return {
                 'success': False,
                 'message': f'Template {template_name} not found'
             }
         
-        template = EMAIL_TEMPLATES[template_name]
+        template = COMPILED_TEMPLATES[template_name]
         
         try:
-            # Format the email body with provided variables
-            subject = template['subject']
-            body = template['body'].format(**kwargs)
-            
-            # Create email log entry
-            email_entry = {
-                'id': len(self.sent_emails) + 1,
-                'to': to_email,
-                'subject': subject,
-                'body': body,
-                'template': template_name,
-                'timestamp': datetime.now().isoformat(),
-                'status': 'sent'
-            }
+            # Fill the precompiled template with provided variables
+            subject = template.subject
+            body = template.render(kwargs)
             
-            # Log the email
-            self.sent_emails.append(email_entry)
-            self._save_logs()
-            
-            # Print to console for debugging
-            print("\n" + "="*60)
-            print("📧 EMAIL SENT (MOCK)")
-            print("="*60)
-            print(f"To: {to_email}")
-            print(f"Subject: {subject}")
-            print(f"Template: {template_name}")
-            print(f"Timestamp: {email_entry['timestamp']}")
-            print("="*60 + "\n")
+            email_id = self.enqueue(to_email, subject, body, template_name)
             
             return {
                 'success': True,
-                'message': 'Email sent successfully',
-                'email_id': email_entry['id']
+                'message': 'Email queued for delivery',
+                'email_id': email_id,
+                'status': 'queued'
             }
             
         except KeyError as e:
@@ -192,9 +459,126 @@ class EmailService:
         except Exception as e:
             return {
                 'success': False,
-                'message': f'Error sending email: {str(e)}'
+                'message': f'Error queueing email: {str(e)}'
             }
     
+    # -------------------------
+    # Dispatcher
+    # -------------------------
+    
+    def _ensure_dispatcher(self):
+        """Start the background dispatcher thread on first use"""
+        if not DISPATCHER_ENABLED:
+            return
+        with self._dispatcher_lock:
+            if self._dispatcher and self._dispatcher.is_alive():
+                return
+            self._stop.clear()
+            self._dispatcher = threading.Thread(
+                target=self._dispatch_loop, name='email-dispatcher', daemon=True
+            )
+            self._dispatcher.start()
+    
+    def _dispatch_loop(self):
+        """Deliver due emails until stopped, sleeping while the outbox is idle"""
+        while not self._stop.is_set():
+            try:
+                delivered = self.dispatch_pending()
+            except Exception as e:
+                print(f"Email dispatcher error: {e}")
+                delivered = 0
+            if delivered == 0:
+                self._wake.wait(POLL_INTERVAL_SECONDS)
+                self._wake.clear()
+    
+    def _claim_batch(self, batch_size):
+        """Atomically mark a batch of due emails as 'sending' and return them"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            # Requeue rows whose claiming worker died mid-send
+            conn.execute("""
+                UPDATE email_outbox SET status = 'queued'
+                WHERE status = 'sending' AND claimed_at < ?
+            """, (now - STALE_CLAIM_SECONDS,))
+            rows = conn.execute("""
+                SELECT * FROM email_outbox
+                WHERE status = 'queued' AND next_attempt_at <= ?
+                ORDER BY next_attempt_at, id
+                LIMIT ?
+            """, (now, batch_size)).fetchall()
+            if rows:
+                conn.executemany(
+                    "UPDATE email_outbox SET status = 'sending', claimed_at = ? WHERE id = ?",
+                    [(now, row['id']) for row in rows]
+                )
+            conn.commit()
+            return rows
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+    
+    def dispatch_pending(self, batch_size=DISPATCH_BATCH_SIZE):
+        """
+        Deliver one batch of due emails through the transport
+        
+        Returns:
+            int: Number of emails processed (sent or rescheduled)
+        """
+        rows = self._claim_batch(batch_size)
+        if not rows:
+            return 0
+        
+        results = []
+        for row in rows:
+            message = self._row_to_email(row)
+            attempts = row['attempts'] + 1
+            try:
+                self.transport.send(message)
+                results.append(('sent', attempts, None, time.time(), datetime.now().isoformat(), row['id']))
+            except Exception as e:
+                if attempts >= MAX_ATTEMPTS:
+                    status, next_attempt = 'failed', time.time()
+                else:
+                    # Exponential backoff with jitter
+                    delay = RETRY_BASE_SECONDS * (2 ** (attempts - 1))
+                    status, next_attempt = 'queued', time.time() + delay * random.uniform(0.8, 1.2)
+                results.append((status, attempts, str(e), next_attempt, None, row['id']))
+        
+        conn = self._connect()
+        try:
+            conn.executemany("""
+                UPDATE email_outbox
+                SET status = ?, attempts = ?, last_error = ?, next_attempt_at = ?,
+                    sent_at = ?, claimed_at = NULL
+                WHERE id = ?
+            """, results)
+            conn.commit()
+        finally:
+            conn.close()
+        return len(rows)
+    
+    def flush(self, timeout=10):
+        """Synchronously deliver everything currently due (for scripts and shutdown)"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.dispatch_pending() == 0:
+                break
+    
+    def shutdown(self, timeout=5):
+        """Stop the dispatcher thread"""
+        self._stop.set()
+        self._wake.set()
+        if self._dispatcher:
+            self._dispatcher.join(timeout)
+    
+    # -------------------------
+    # Convenience senders
+    # -------------------------
+    
     def send_welcome_email(self, to_email, name):
         """Send welcome email to new user"""
         return self.send_email(
@@ -252,16 +636,317 @@ class EmailService:
             role=role
         )
     
+    # -------------------------
+    # Bulk campaigns
+    # -------------------------
+    
+    def send_bulk(self, template_name, recipients, campaign_id=None, rate_per_minute=None,
+                  dedup_days=None, start_at=None, batch_size=500):
+        """
+        Render and enqueue one template for many recipients
+        
+        Args:
+            template_name: Name of the email template to use
+            recipients: Iterable of dicts with 'to' plus template variables
+            campaign_id: Campaign the emails belong to
+            rate_per_minute: Spread delivery so at most this many emails are due per minute.
+                Slots follow the last one already scheduled by any campaign, so
+                concurrent campaigns share the rate instead of adding up
+            dedup_days: Skip recipients who were sent this template in the last
+                dedup_days days (None disables dedup)
+            start_at: Epoch seconds of the first delivery slot (default: now)
+            batch_size: Rows inserted per transaction
+        
+        Returns:
+            dict: Counts of enqueued, duplicate and invalid recipients
+        """
+        if template_name not in COMPILED_TEMPLATES:
+            return {'success': False, 'message': f'Template {template_name} not found'}
+        
+        template = COMPILED_TEMPLATES[template_name]
+        interval = 60.0 / rate_per_minute if rate_per_minute else 0.0
+        slot = {'time': start_at or time.time()}
+        now = datetime.now()
+        created_at = now.isoformat()
+        dedup_since = (now - timedelta(days=dedup_days)).isoformat() if dedup_days else None
+        counts = {'enqueued': 0, 'skipped_duplicates': 0, 'invalid': 0}
+        
+        conn = self._connect()
+        try:
+            batch = []
+            
+            def flush_batch():
+                # One write transaction per batch: the dedup lookups and the slot
+                # reservation cannot interleave with another campaign's batch
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    if interval:
+                        last_slot = conn.execute("""
+                            SELECT MAX(next_attempt_at) FROM email_outbox
+                            WHERE campaign_id IS NOT NULL AND status = 'queued'
+                        """).fetchone()[0]
+                        if last_slot is not None:
+                            slot['time'] = max(slot['time'], last_slot + interval)
+                    for to_email, subject, body, dedup_key in batch:
+                        cursor = conn.execute("""
+                            INSERT INTO email_outbox
+                            (to_email, subject, body, template, status, created_at, next_attempt_at,
+                             campaign_id, dedup_key)
+                            SELECT ?, ?, ?, ?, 'queued', ?, ?, ?, ?
+                            WHERE ? IS NULL OR NOT EXISTS (
+                                SELECT 1 FROM email_outbox WHERE dedup_key = ? AND created_at >= ?
+                            )
+                        """, (to_email, subject, body, template_name, created_at, slot['time'],
+                              campaign_id, dedup_key, dedup_since, dedup_key, dedup_since))
+                        if cursor.rowcount:
+                            counts['enqueued'] += 1
+                            slot['time'] += interval
+                        else:
+                            counts['skipped_duplicates'] += 1
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                batch.clear()
+            
+            for recipient in recipients:
+                to_email = (recipient.get('to') or '').strip()
+                if not to_email:
+                    counts['invalid'] += 1
+                    continue
+                try:
+                    body = template.render(recipient)
+                except KeyError:
+                    counts['invalid'] += 1
+                    continue
+                dedup_key = f"{template_name}:{to_email.lower()}" if dedup_since else None
+                batch.append((to_email, template.subject, body, dedup_key))
+                if len(batch) >= batch_size:
+                    flush_batch()
+                    if campaign_id:
+                        self._update_campaign(campaign_id, counts)
+            if batch:
+                flush_batch()
+        finally:
+            conn.close()
+        
+        if campaign_id:
+            self._update_campaign(campaign_id, counts)
+        if counts['enqueued']:
+            self._ensure_dispatcher()
+            self._wake.set()
+        return {'success': True, **counts}
+    
+    def start_campaign(self, name, template_name, recipients, template_vars=None,
+                       rate_per_minute=60, dedup_days=7, run_async=True):
+        """
+        Create a campaign and enqueue its emails (in a background thread by default)
+        
+        Args:
+            name: Campaign name
+            template_name: Name of the email template to use
+            recipients: Iterable of dicts with 'email' and 'name' (e.g. db_utils.iter_campaign_targets)
+            template_vars: Variables shared by every email (e.g. role)
+            rate_per_minute: Delivery rate limit for this campaign
+            dedup_days: Don't resend this template to an address within this many days
+            run_async: Return immediately and enqueue in a background thread
+        
+        Returns:
+            dict: Campaign ID and initial status
+        """
+        if template_name not in COMPILED_TEMPLATES:
+            return {'success': False, 'message': f'Template {template_name} not found'}
+        
+        template_vars = template_vars or {}
+        conn = self._connect()
+        try:
+            cursor = conn.execute("""
+                INSERT INTO email_campaigns (name, template, params, status, rate_per_minute, created_at)
+                VALUES (?, ?, ?, 'running', ?, ?)
+            """, (name, template_name, json.dumps({**template_vars, 'dedup_days': dedup_days}),
+                  rate_per_minute, datetime.now().isoformat()))
+            conn.commit()
+            campaign_id = cursor.lastrowid
+        finally:
+            conn.close()
+        
+        def run():
+            targets = {'count': 0}
+            
+            def rendered():
+                for user in recipients:
+                    targets['count'] += 1
+                    yield {**template_vars, 'name': user.get('name') or user.get('username', ''),
+                           'to': user.get('email')}
+            
+            try:
+                self.send_bulk(template_name, rendered(), campaign_id=campaign_id,
+                               rate_per_minute=rate_per_minute, dedup_days=dedup_days)
+                self._finish_campaign(campaign_id, 'completed', targets['count'])
+            except Exception as e:
+                self._finish_campaign(campaign_id, 'failed', targets['count'], str(e))
+        
+        if run_async:
+            threading.Thread(target=run, name=f'email-campaign-{campaign_id}', daemon=True).start()
+        else:
+            run()
+        return {'success': True, 'campaign_id': campaign_id, 'status': 'running' if run_async else 'completed'}
+    
+    def _update_campaign(self, campaign_id, counts):
+        """Record enqueue progress for a campaign"""
+        conn = self._connect()
+        try:
+            conn.execute("""
+                UPDATE email_campaigns SET enqueued = ?, skipped_duplicates = ? WHERE id = ?
+            """, (counts['enqueued'], counts['skipped_duplicates'], campaign_id))
+            conn.commit()
+        finally:
+            conn.close()
+    
+    def _finish_campaign(self, campaign_id, status, targets, error=None):
+        """Mark a campaign as done enqueueing"""
+        conn = self._connect()
+        try:
+            conn.execute("""
+                UPDATE email_campaigns SET status = ?, targets = ?, completed_at = ?, error = ?
+                WHERE id = ?
+            """, (status, targets, datetime.now().isoformat(), error, campaign_id))
+            conn.commit()
+        finally:
+            conn.close()
+    
+    def get_campaign_status(self, campaign_id):
+        """Get campaign progress including per-status delivery counts"""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM email_campaigns WHERE id = ?", (campaign_id,)).fetchone()
+            if not row:
+                return {'success': False, 'message': 'Campaign not found'}
+            delivery = {'queued': 0, 'sending': 0, 'sent': 0, 'failed': 0}
+            for status, count in conn.execute("""
+                SELECT status, COUNT(*) FROM email_outbox WHERE campaign_id = ? GROUP BY status
+            """, (campaign_id,)):
+                delivery[status] = count
+            total = sum(delivery.values())
+            return {
+                'success': True,
+                'campaign': {
+                    'id': row['id'],
+                    'name': row['name'],
+                    'template': row['template'],
+                    'params': json.loads(row['params']) if row['params'] else {},
+                    'status': row['status'],
+                    'targets': row['targets'],
+                    'enqueued': row['enqueued'],
+                    'skipped_duplicates': row['skipped_duplicates'],
+                    'rate_per_minute': row['rate_per_minute'],
+                    'created_at': row['created_at'],
+                    'completed_at': row['completed_at'],
+                    'error': row['error'],
+                    'delivery': delivery,
+                    'progress': round((delivery['sent'] + delivery['failed']) / total * 100, 1) if total else 0
+                }
+            }
+        finally:
+            conn.close()
+    
+    def list_campaigns(self, limit=20):
+        """Get the most recent campaigns"""
+        conn = self._connect()
+        try:
+            rows = conn.execute("""
+                SELECT id, name, template, status, targets, enqueued, skipped_duplicates, created_at, completed_at
+                FROM email_campaigns ORDER BY id DESC LIMIT ?
+            """, (limit,)).fetchall()
+            return [dict(row) for row in rows]
+        finally:
+            conn.close()
+    
+    # -------------------------
+    # Log queries
+    # -------------------------
+    
+    def _row_to_email(self, row):
+        """Convert an outbox row to the email log format"""
+        return {
+            'id': row['id'],
+            'to': row['to_email'],
+            'subject': row['subject'],
+            'body': row['body'],
+            'template': row['template'],
+            'timestamp': row['created_at'],
+            'status': row['status'],
+            'attempts': row['attempts'],
+            'last_error': row['last_error'],
+            'sent_at': row['sent_at']
+        }
+    
+    def query_emails(self, limit=50, cursor=None, recipient=None, template=None,
+                     since=None, until=None, status=None):
+        """
+        Page through the email log newest first using keyset pagination
+        
+        Args:
+            limit: Page size
+            cursor: next_cursor from the previous page (an outbox ID)
+            recipient: Exact recipient address (case-insensitive)
+            template: Template name
+            since / until: ISO timestamps bounding created_at (until is exclusive)
+            status: queued, sending, sent or failed
+        
+        Returns:
+            dict: {'emails': [...], 'next_cursor': int or None}
+        """
+        clauses = []
+        params = []
+        if cursor:
+            clauses.append("id < ?")
+            params.append(int(cursor))
+        if recipient:
+            clauses.append("to_email = ? COLLATE NOCASE")
+            params.append(recipient)
+        if template:
+            clauses.append("template = ?")
+            params.append(template)
+        if since:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until:
+            clauses.append("created_at < ?")
+            params.append(until)
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                f"SELECT * FROM email_outbox {where} ORDER BY id DESC LIMIT ?",
+                (*params, limit + 1)
+            ).fetchall()
+        finally:
+            conn.close()
+        
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            'emails': [self._row_to_email(row) for row in rows],
+            'next_cursor': rows[-1]['id'] if has_more else None
+        }
+    
     def get_sent_emails(self, limit=50):
-        """Get list of sent emails"""
-        return self.sent_emails[-limit:]
+        """Get the most recent emails (oldest first, like the old JSON log)"""
+        return list(reversed(self.query_emails(limit=limit)['emails']))
     
     def get_email_by_id(self, email_id):
         """Get specific email by ID"""
-        for email in self.sent_emails:
-            if email['id'] == email_id:
-                return email
-        return None
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM email_outbox WHERE id = ?", (email_id,)).fetchone()
+            return self._row_to_email(row) if row else None
+        finally:
+            conn.close()
 
 # Global email service instance
 email_service = EmailService()
@@ -5,21 +5,9 @@ import os
 import time
 import io
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import PromptTemplate
-# from langchain_core.runnables import RunnableSequence  # removed - unused
 from langchain_core.output_parsers import StrOutputParser
-# from langchain_core.runnables import RunnableSequence  # removed - unused
-import PyPDF2 as _maybe_PyPDF2
-try:
-    import PyPDF2
-except Exception:
-    PyPDF2 = None
-try:
-    import docx
-except Exception:
-    docx = None
-# from langchain_core.runnables import RunnableSequence  # removed - unused
+# PDF/DOCX text extraction lives in resume_parser, which imports PyPDF2 / docx on first use
 import json
 import re
 import hashlib
@@ -28,6 +16,16 @@ import inspect
 # from pathlib import Path  # removed - unused
 # Import database utilities
 import db_utils
+import exporter
+from plagiarism import answer_index
+import question_index
+import question_prefetch
+from llm_metrics import llm_metrics
+import llm_json
+import llm_router
+import prompt_budget
+from resume_cache import resume_cache, file_key, content_hash
+import resume_parser
 import logging
 import csv
 import io
@@ -137,45 +135,54 @@ def _is_readable(path):
     except Exception:
         return False
 
-# If explicitly allowed, disable TLS verification for the LLM client.
-ALLOW_INSECURE = os.environ.get("ALLOW_INSECURE_LLM", "").lower() in ("1", "true", "yes", "on")
-if ALLOW_INSECURE:
-    logging.warning("ALLOW_INSECURE_LLM enabled: TLS verification DISABLED for LLM http client (INSECURE)")
-    client = httpx.Client(verify=False)
-else:
-    # Prefer the env var if it's readable, otherwise override with certifi.
-    _env_cert = os.environ.get("SSL_CERT_FILE")
-    if not _is_readable(_env_cert):
-        try:
-            os.environ["SSL_CERT_FILE"] = certifi.where()
-            logging.info("SSL_CERT_FILE overridden to certifi bundle to avoid unreadable system CA file")
-        except Exception:
-            # If certifi isn't available or something goes wrong, leave env as-is
-            pass
+@st.cache_resource
+def _llm_router():
+    """
+    HTTP client and model router, built once per Streamlit server process
 
-    _verify_path = os.environ.get("SSL_CERT_FILE")
-    try:
-        if _verify_path:
-            client = httpx.Client(verify=_verify_path)
-        else:
-            client = httpx.Client(verify=True)
-    except PermissionError:
-        logging.warning("PermissionError reading SSL_CERT_FILE; removing env var and falling back to system verification")
+    This script re-runs on every interaction; caching keeps one connection
+    pool and the router's rolling latency statistics across reruns.
+    """
+    # If explicitly allowed, disable TLS verification for the LLM client.
+    allow_insecure = os.environ.get("ALLOW_INSECURE_LLM", "").lower() in ("1", "true", "yes", "on")
+    if allow_insecure:
+        logging.warning("ALLOW_INSECURE_LLM enabled: TLS verification DISABLED for LLM http client (INSECURE)")
+        client = httpx.Client(verify=False)
+    else:
+        # Prefer the env var if it's readable, otherwise override with certifi.
+        _env_cert = os.environ.get("SSL_CERT_FILE")
+        if not _is_readable(_env_cert):
+            try:
+                os.environ["SSL_CERT_FILE"] = certifi.where()
+                logging.info("SSL_CERT_FILE overridden to certifi bundle to avoid unreadable system CA file")
+            except Exception:
+                # If certifi isn't available or something goes wrong, leave env as-is
+                pass
+
+        _verify_path = os.environ.get("SSL_CERT_FILE")
         try:
-            os.environ.pop("SSL_CERT_FILE", None)
-        except Exception:
-            pass
-        client = httpx.Client(verify=True)
-
-# Initialize the ChatOpenAI wrapper using our httpx client
-client = httpx.Client(verify=False)
-# Primary LLM client using DeepSeek configuration
-llm = ChatOpenAI(
-    base_url=DEEPSEEK_BASE_URL,
-    model=DEEPSEEK_MODEL,
-    api_key=API_KEY,
-    http_client=client,
-)
+            if _verify_path:
+                client = httpx.Client(verify=_verify_path)
+            else:
+                client = httpx.Client(verify=True)
+        except PermissionError:
+            logging.warning("PermissionError reading SSL_CERT_FILE; removing env var and falling back to system verification")
+            try:
+                os.environ.pop("SSL_CERT_FILE", None)
+            except Exception:
+                pass
+            client = httpx.Client(verify=True)
+
+    # Per-prompt-type model selection with failover (fast model for questions, reasoner for code review);
+    # endpoint models are built off the startup path (LLMRouter.warm_up)
+    router = llm_router.LLMRouter.from_env(http_client=client)
+    router.warm_up()
+    return router
+
+# Schema migrations run once per process; queued data backfills continue in the background
+db_utils.init_database(backfill=True)
+
+router = _llm_router()
 
 # Role -> suggested skills mapping used to populate the skills multiselect
 ROLE_SKILLS = {
@@ -230,6 +237,9 @@ ROLE_SKILLS = {
     ],
 }
 
+# LLM calls allowed per question slot before falling back (duplicates are checked locally)
+MAX_QUESTION_ATTEMPTS = int(os.environ.get("MAX_QUESTION_ATTEMPTS", "3"))
+
 EVAL_HISTORY_DB = "evaluation_history.json"
 FEEDBACK_DB = "feedback.json"
 
@@ -288,49 +298,14 @@ def add_feedback_entry(username: str, message: str, role: str = None, skills: li
 
 def eval_history_to_csv_for_user(username: str) -> str:
     """Generate CSV string for a single user's evaluation history."""
-    history = load_eval_history()
-    evs = history.get(username, [])
-    out = io.StringIO()
-    writer = csv.writer(out)
-    # Header
-    writer.writerow(["username", "date", "role", "total_score", "max_score", "percentage", "time_taken", "question_index", "question", "answer", "score", "feedback"])
-    for ev in evs:
-        date = ev.get('date')
-        role = ev.get('role')
-        total = ev.get('score')
-        mx = ev.get('max_score')
-        pct = ev.get('percentage')
-        tt = ev.get('time_taken')
-        qa_list = ev.get('qa_history', [])
-        if not qa_list:
-            writer.writerow([username, date, role, total, mx, pct, tt, "", "", "", "", ""])
-        else:
-            for idx, qa in enumerate(qa_list, start=1):
-                writer.writerow([username, date, role, total, mx, pct, tt, idx, qa.get('q',''), qa.get('a',''), qa.get('score',''), qa.get('feedback','')])
-    return out.getvalue()
+    return "".join(exporter.stream_csv(exporter.iter_evaluation_rows(username=username)))
 
 
 def eval_history_to_csv_all() -> str:
     """Generate CSV string for all users' evaluation history."""
-    history = load_eval_history()
-    out = io.StringIO()
-    writer = csv.writer(out)
-    writer.writerow(["username", "date", "role", "total_score", "max_score", "percentage", "time_taken", "question_index", "question", "answer", "score", "feedback"])
-    for username, evs in history.items():
-        for ev in evs:
-            date = ev.get('date')
-            role = ev.get('role')
-            total = ev.get('score')
-            mx = ev.get('max_score')
-            pct = ev.get('percentage')
-            tt = ev.get('time_taken')
-            qa_list = ev.get('qa_history', [])
-            if not qa_list:
-                writer.writerow([username, date, role, total, mx, pct, tt, "", "", "", "", ""])
-            else:
-                for idx, qa in enumerate(qa_list, start=1):
-                    writer.writerow([username, date, role, total, mx, pct, tt, idx, qa.get('q',''), qa.get('a',''), qa.get('score',''), qa.get('feedback','')])
-    return out.getvalue()
+    # st.download_button needs the whole payload; the Flask app exposes a
+    # streaming variant at /api/admin/export/evaluations for large exports.
+    return "".join(exporter.stream_csv(exporter.iter_evaluation_rows()))
 
 def hash_password(password):
     """Hash password using SHA256"""
@@ -734,43 +709,42 @@ def verify_password(stored_hash, password):
     return stored_hash == hash_password(password)
 
 def save_evaluation_result(username, eval_data):
-    """Save evaluation result to user's history"""
-    db_utils.save_evaluation_result(username, eval_data)
+    """Save evaluation result to user's history and index its answers for similarity checks"""
+    evaluation_id = db_utils.save_evaluation_result(username, eval_data)
+    answer_index.index_evaluation(evaluation_id, username, eval_data.get('qa_history', []))
+    return evaluation_id
+
+
+def _extract_resume_text(file_bytes: bytes, filename: str) -> str:
+    """Decode PDF, DOCX or plain-text resume bytes into text (page and size bounded)."""
+    return resume_parser.extract_text(file_bytes, filename)
+
+
+def extract_resume_text(file_bytes: bytes, filename: str) -> str:
+    """Extract resume text, reusing the cached result for previously seen files."""
+    return resume_cache.get_or_compute(
+        'text', file_key(file_bytes, filename),
+        lambda: _extract_resume_text(file_bytes, filename)
+    ) or ""
 
 
 def parse_resume(file_bytes: bytes, filename: str) -> Dict[str, str]:
     """Attempt to extract name, email, experience and skills from resume bytes.
 
     Supports PDF, DOCX, and plain text. Returns a dict with keys 'name', 'email', 'experience', 'skills'.
-    Uses simple heuristics and regex; not a full NLP parser.
+    Uses simple heuristics and regex; not a full NLP parser. Results are cached by file hash.
     """
-    text = ""
-    fname = (filename or "").lower()
-    try:
-        if fname.endswith('.pdf') and PyPDF2:
-            try:
-                reader = PyPDF2.PdfReader(io.BytesIO(file_bytes))
-                pages = []
-                for p in reader.pages:
-                    try:
-                        pages.append(p.extract_text() or "")
-                    except Exception:
-                        continue
-                text = "\n".join(pages)
-            except Exception:
-                text = file_bytes.decode('utf-8', errors='ignore')
-        elif fname.endswith('.docx') and docx:
-            try:
-                doc = docx.Document(io.BytesIO(file_bytes))
-                text = "\n".join([p.text for p in doc.paragraphs])
-            except Exception:
-                text = file_bytes.decode('utf-8', errors='ignore')
-        else:
-            # Try plain text decode for txt or unknown
-            text = file_bytes.decode('utf-8', errors='ignore')
-    except Exception:
-        text = file_bytes.decode('utf-8', errors='ignore')
+    key = file_key(file_bytes, filename)
+    cached = resume_cache.get('heuristic', key)
+    if cached is not None:
+        return cached
+    parsed = _parse_resume_text(extract_resume_text(file_bytes, filename))
+    resume_cache.set('heuristic', key, parsed)
+    return parsed
+
 
+def _parse_resume_text(text: str) -> Dict[str, str]:
+    """Heuristic field extraction over already-decoded resume text."""
     # Normalize whitespace
     cleaned = re.sub(r"\s+", " ", text).strip()
 
@@ -867,6 +841,14 @@ def llm_parse_resume(text: str) -> Dict[str, object]:
     if not text or not API_KEY:
         return {}
 
+    # Identical (masked) resume text was already parsed by the model this call is routed to:
+    # skip the LLM round trip
+    text_hash = content_hash(text)
+    cached = resume_cache.get('llm', f"{text_hash}:{router.model_for('llm_parse_resume')}")
+    llm_metrics.record_cache('llm_parse_resume', cached is not None)
+    if cached is not None:
+        return cached
+
     try:
         template = (
             "You are a resume parsing assistant.\n"
@@ -877,12 +859,20 @@ def llm_parse_resume(text: str) -> Dict[str, object]:
             "Resume text:\n```{resume_text}```\n"
         )
         prompt = PromptTemplate(template=template, input_variables=["resume_text"])
-        chain = prompt | llm | StrOutputParser()
-        out = chain.invoke({"resume_text": text})
+        chain = prompt | router.runnable('llm_parse_resume')
+        resume_text = prompt_budget.compact_resume(text)
+        prompt_budget.log_savings('llm_parse_resume', text, resume_text)
+        with llm_metrics.track('llm_parse_resume') as call:
+            message = chain.invoke({"resume_text": resume_text}, config=call.config)
+        out = StrOutputParser().invoke(message)
+        # After a failover or hedge another endpoint may have answered; cache under its model
+        served_model = (getattr(message, 'response_metadata', None) or {}).get('model_name') \
+            or router.model_for('llm_parse_resume')
         # Try to extract JSON object from the output
         try:
-            jtext = out[out.find("{"):out.rfind("}")+1]
-            parsed = json.loads(jtext)
+            parsed = llm_json.extract_json(out)
+            if parsed is None:
+                raise ValueError("No JSON object in resume parse output")
             # Normalize keys
             name = parsed.get('name') or parsed.get('full_name') or parsed.get('candidate_name') or ""
             email = parsed.get('email') or ""
@@ -892,50 +882,19 @@ def llm_parse_resume(text: str) -> Dict[str, object]:
             if isinstance(skills, str):
                 # comma-separated
                 skills = [s.strip() for s in skills.split(',') if s.strip()]
-            return {"name": name, "email": email, "experience": exp, "skills": skills}
+            result = {"name": name, "email": email, "experience": exp, "skills": skills}
+            resume_cache.set('llm', f"{text_hash}:{served_model}", result)
+            return result
         except Exception:
             # If LLM didn't return strict JSON, attempt to parse heuristically
             # Fallback: return empty so caller can use heuristics
+            llm_metrics.record_json_failure('llm_parse_resume')
             return {}
     except Exception as e:
         # On any LLM error, return empty dict so caller falls back
         return {}
 
 
-def mask_pii(text: str) -> str:
-    """Mask common PII in free text before sending to an external LLM.
-
-    Replaces email addresses with `[EMAIL]` and phone-like sequences
-    (7+ digits, allowing separators) with `[PHONE]`. Keeps other text intact.
-    """
-    if not text:
-        return text
-
-    # Mask emails
-    try:
-        email_re = r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}"
-        masked = re.sub(email_re, "[EMAIL]", text)
-    except Exception:
-        masked = text
-
-    # Mask phone-like sequences: use a permissive pattern but only replace
-    # matches that contain >=7 digits to avoid masking years or small numbers.
-    try:
-        phone_pattern = r"[\d\+\(\)\.\-\s]{7,}"
-
-        def _phone_repl(m):
-            s = m.group(0)
-            digits = re.sub(r"\D", "", s)
-            if len(digits) >= 7:
-                return "[PHONE]"
-            return s
-
-        masked = re.sub(phone_pattern, _phone_repl, masked)
-    except Exception:
-        pass
-
-    return masked
-
 def home_page():
     # Page styling (removed blue gradient background)
     st.markdown("""
@@ -1022,36 +981,22 @@ def home_page():
             parsed_filename = st.session_state.get('reg_resume_filename')
             try:
                 if not parsed_flag or parsed_filename != getattr(uploaded_resume, 'name', None):
+                    if getattr(uploaded_resume, 'size', 0) > resume_parser.MAX_RESUME_BYTES:
+                        raise resume_parser.ResumeUploadError(
+                            f"file is larger than {resume_parser.MAX_RESUME_BYTES // (1024 * 1024)} MB"
+                        )
                     if hasattr(uploaded_resume, 'getvalue'):
                         data = uploaded_resume.getvalue()
                     else:
                         uploaded_resume.seek(0)
-                        data = uploaded_resume.read()
+                        data = resume_parser.read_upload(uploaded_resume)
                     parsed = parse_resume(data, uploaded_resume.name)
                     # If user opted in and API key available, call the LLM to get a richer parse
                     if use_llm and API_KEY:
-                        # extract raw text for LLM
-                        text = ""
-                        fname = (uploaded_resume.name or "").lower()
+                        # extract raw text for LLM (cached from the heuristic parse above)
+                        text = extract_resume_text(data, uploaded_resume.name)
                         try:
-                            if fname.endswith('.pdf') and PyPDF2:
-                                reader = PyPDF2.PdfReader(io.BytesIO(data))
-                                pages = []
-                                for p in reader.pages:
-                                    try:
-                                        pages.append(p.extract_text() or "")
-                                    except Exception:
-                                        continue
-                                text = "\n".join(pages)
-                            elif fname.endswith('.docx') and docx:
-                                doc = docx.Document(io.BytesIO(data))
-                                text = "\n".join([p.text for p in doc.paragraphs])
-                            else:
-                                text = data.decode('utf-8', errors='ignore')
-                        except Exception:
-                            text = data.decode('utf-8', errors='ignore')
-                        try:
-                            masked_text = mask_pii(text)
+                            masked_text = resume_parser.mask_pii(text)
                             llm_parsed = llm_parse_resume(masked_text)
                             # Prefer LLM fields when present, fallback to heuristic
                             merged = parsed.copy()
@@ -1315,15 +1260,8 @@ def home_page():
                                             mark_key = f"admin_fb_resolve_{sel_user}_{original_idx}"
                                             if st.button("Mark Resolved", key=mark_key):
                                                 try:
-                                                    fa = load_feedback()
-                                                    entries = fa.get(sel_user, [])
-                                                    # find matching entry by date and message
-                                                    for e in entries:
-                                                        if e.get('date') == fb.get('date') and e.get('message') == fb.get('message'):
-                                                            e['resolved'] = True
-                                                            e['admin_comment'] = admin_note
-                                                            break
-                                                    save_feedback(fa)
+                                                    if not db_utils.resolve_feedback(fb['id'], admin_note):
+                                                        raise RuntimeError("feedback entry not found")
                                                     st.success("Feedback marked resolved.")
                                                     request_rerun()
                                                 except Exception:
@@ -1407,7 +1345,10 @@ def build_question_prompt(role: str, skills: List[str], language: str, is_coding
         # accidentally become template placeholders w   hen embedded into
         # the PromptTemplate. This avoids pydantic validation errors like
         # "Invalid variable name '...': Variable names cannot contain '.' or other chars".
-        joined = ', '.join(asked_questions)
+        # Only the latest few are sent; repeats are also caught locally (question_index)
+        recent = prompt_budget.recent_questions(asked_questions)
+        joined = ', '.join(recent)
+        prompt_budget.log_savings('gen_question', ', '.join(asked_questions), joined)
         joined_safe = joined.replace('{', '{{').replace('}', '}}')
         previous_questions = f"\n\nIMPORTANT: Do NOT repeat these previously asked questions: {joined_safe}\nGenerate a completely DIFFERENT question."
     
@@ -1479,35 +1420,38 @@ def gen_question(role: str, skills: List[str], language: str, question_num: int
     prompt = build_question_prompt(role, ", ".join(skills), language, is_coding, asked_questions)
     
     # Use temperature > 0 for variety in questions
-    varied_llm = ChatOpenAI(
-        base_url=DEEPSEEK_BASE_URL,
-        model=DEEPSEEK_MODEL,
-        api_key=API_KEY,
-        http_client=client,
+    varied_llm = router.runnable(
+        'gen_question',
         temperature=0.7,  # Add randomness to avoid repetition
         max_tokens=400
     )
     chain = prompt | varied_llm | StrOutputParser()
-    question = chain.invoke({"role": role, "skills": ", ".join(skills), "language": language})
+    with llm_metrics.track('gen_question') as call:
+        question = chain.invoke({"role": role, "skills": ", ".join(skills), "language": language}, config=call.config)
     return question.strip().strip('"'), is_coding
 
 def evaluate_answer(role: str, skill_focus: str, question: str, answer: str, language: str, is_coding: bool = False) -> Dict:
     prompt = build_evaluator_prompt(role, skill_focus, question, answer, language, is_coding)
-    chain = prompt | llm | StrOutputParser()
-    res = chain.invoke({"role": role, "skill_focus": skill_focus, "question": question, "candidate_answer": answer, "language": language})
-    # Try to parse simple "score: X" or JSON-like output; we'll be permissive
-    # Expecting a JSON-like, but if not, we fallback to parsing digits.
-    try:
-        # attempt to find JSON substring
-        jtext = res[res.find("{"):res.rfind("}")+1]
-        parsed = json.loads(jtext)
-        parsed['raw'] = res
+    compact = prompt_budget.compact_answer(answer, is_coding)
+    prompt_type = 'evaluate_coding' if is_coding else 'evaluate_answer'
+    prompt_budget.log_savings(prompt_type, answer, compact)
+    answer = compact
+    text = prompt.format(role=role, skill_focus=skill_focus, question=question, candidate_answer=answer, language=language)
+    # JSON mode + schema check, with one repair request if the reply is unusable
+    result = llm_json.invoke_json(router, text, llm_json.EVALUATION_SCHEMA, prompt_type)
+    if result['success']:
+        parsed = result['data']
+        parsed['raw'] = result['raw']
         return parsed
-    except Exception:
-        # fallback: try to extract first integer 0-20
-        m = re.search(r"(\b[0-1]?\d|20)\b", res)
-        score = int(m.group(0)) if m else 0
-        return {"score": score, "reason": res[:200], "suggestions": "", "raw": res}
+    # Don't guess a score from stray digits; flag it so the candidate can dispute it
+    return {"score": 0, "reason": result['raw'][:200], "suggestions": "", "raw": result['raw'], "parse_error": True}
+
+def start_question_prefetch(role: str, skills: List[str], language: str):
+    """Background question generator bound to one interview's role, skills and language"""
+    skills = list(skills)
+    return question_prefetch.QuestionPrefetcher(
+        lambda question_num, asked: gen_question(role, skills, language, question_num=question_num, asked_questions=asked)
+    )
 
 # -------------------------
 # UI
@@ -1535,6 +1479,8 @@ def init_state():
         st.session_state.current_question = ""
     if "welcome_shown" not in st.session_state:
         st.session_state.welcome_shown = False
+    if "question_prefetcher" not in st.session_state:
+        st.session_state.question_prefetcher = None
     if "last_ai_message" not in st.session_state:
         st.session_state.last_ai_message = ""
     if "current_is_coding" not in st.session_state:
@@ -1753,6 +1699,9 @@ elif choice == "New Evaluation":
                             st.session_state.question_count = 0
                             st.session_state.finalized = False
                             st.session_state.welcome_shown = False  # Reset welcome for new evaluation
+                            if st.session_state.question_prefetcher:
+                                st.session_state.question_prefetcher.cancel_all()
+                            st.session_state.question_prefetcher = None
                             st.session_state.current_question = ""
                             st.session_state.question_start_time = None
                             st.session_state.total_start_time = time.time()  # Start total timer
@@ -1780,9 +1729,18 @@ elif choice == "New Evaluation":
             st.session_state.welcome_shown = True
             st.session_state.last_ai_message = welcome_text
             
-            # Generate first question
-            first_q, is_coding = gen_question(st.session_state.role, st.session_state.skills, st.session_state.lang, question_num=1, asked_questions=[])
+            # Generate first question (optionally all five in parallel; the rest are checked for duplicates when used)
+            prefetcher = start_question_prefetch(st.session_state.role, st.session_state.skills, st.session_state.lang)
+            st.session_state.question_prefetcher = prefetcher
+            if question_prefetch.PREFETCH_ALL:
+                prefetcher.schedule_all(range(1, 6), [])
+            prefetched = prefetcher.take(1)
+            if prefetched:
+                first_q, is_coding = prefetched
+            else:
+                first_q, is_coding = gen_question(st.session_state.role, st.session_state.skills, st.session_state.lang, question_num=1, asked_questions=[])
             st.session_state.asked_questions.append(first_q)
+            question_index.get_index(st.session_state.role, st.session_state.skills).add(first_q)
             st.session_state.question_count = 1
             st.session_state.current_question = first_q
             st.session_state.current_is_coding = is_coding
@@ -1793,6 +1751,8 @@ elif choice == "New Evaluation":
         if total_time_remaining <= 0 and not st.session_state.finalized:
             st.session_state.finalized = True
             st.session_state.time_expired = True
+            if st.session_state.question_prefetcher:
+                st.session_state.question_prefetcher.cancel_all()
             st.error("⏰ Time's up! Total interview time (50 minutes) has expired.")
             st.info("👉 Please go to the **Results** page to see your evaluation.")
             st.session_state.function_called = False
@@ -1893,6 +1853,10 @@ elif choice == "New Evaluation":
 
         # Display current question (newest at bottom)
         if st.session_state.current_question and st.session_state.question_count > 0 and st.session_state.question_count <= 5:
+            # Start generating the next question while this one is being answered
+            if st.session_state.question_prefetcher and not st.session_state.finalized and st.session_state.question_count < 5:
+                st.session_state.question_prefetcher.schedule(st.session_state.question_count + 1, st.session_state.asked_questions)
+            
             # Check question time (10 minutes max per question)
             question_time_remaining = get_time_remaining(st.session_state.question_start_time, 10 * 60)
             
@@ -2151,6 +2115,8 @@ elif choice == "New Evaluation":
                     spinner_text = "🤔 Evaluating your code..." if is_coding else "🤔 Evaluating your answer..."
                     with st.spinner(spinner_text):
                         eval_result = evaluate_answer(st.session_state.role, skill_focus, q, answer, st.session_state.lang, is_coding)
+                    if eval_result.get("parse_error"):
+                        st.warning("⚠️ The evaluator's response could not be read, so this answer was scored 0. Use the feedback option on the Results page to request a review.")
                     
                     # Parse evaluation results
                     score = int(eval_result.get("score", 0))
@@ -2222,33 +2188,33 @@ elif choice == "New Evaluation":
                         # Generate next question
                         next_q_num = st.session_state.question_count + 1
                         with st.spinner("Preparing next question..."):
-                            tries = 0
                             new_q = ""
                             new_is_coding = False
-                            while tries < 8:
-                                tries += 1
-                                candidate_q, new_is_coding = gen_question(
+                            # Compare locally against this session's questions (and rejected
+                            # candidates) so the LLM is only re-asked for real near-duplicates
+                            session_index = question_index.QuestionIndex(st.session_state.asked_questions)
+                            scope_index = question_index.get_index(st.session_state.role, st.session_state.skills)
+                            # Usually already generated in the background while the answer was written
+                            prefetched = st.session_state.question_prefetcher.take(next_q_num) if st.session_state.question_prefetcher else None
+                            pending = [prefetched] if prefetched else []
+                            
+                            def generate(rejected):
+                                if pending:
+                                    return pending.pop()
+                                return gen_question(
                                     st.session_state.role, 
                                     st.session_state.skills, 
                                     st.session_state.lang, 
                                     question_num=next_q_num,
-                                    asked_questions=st.session_state.asked_questions
+                                    asked_questions=st.session_state.asked_questions + rejected
                                 )
-                                # Check if question is truly unique (not just different wording)
-                                is_duplicate = False
-                                for asked in st.session_state.asked_questions:
-                                    # Simple similarity check - if more than 50% of words match, consider it duplicate
-                                    asked_words = set(asked.lower().split())
-                                    candidate_words = set(candidate_q.lower().split())
-                                    if len(asked_words) > 0:
-                                        overlap = len(asked_words.intersection(candidate_words)) / len(asked_words)
-                                        if overlap > 0.5:
-                                            is_duplicate = True
-                                            break
-                                
-                                if not is_duplicate:
-                                    new_q = candidate_q
-                                    break
+                            
+                            chosen = question_index.choose_question(
+                                generate, session_index, scope_index, MAX_QUESTION_ATTEMPTS,
+                                on_reject=lambda _q: llm_metrics.record_retry('gen_question')
+                            )
+                            if chosen:
+                                new_q, new_is_coding = chosen
                             
                             if not new_q:
                                 # Fallback question if generation fails
@@ -2260,6 +2226,7 @@ elif choice == "New Evaluation":
                                     new_is_coding = False
                             
                             st.session_state.asked_questions.append(new_q)
+                            scope_index.add(new_q)
                             st.session_state.current_question = new_q
                             st.session_state.current_is_coding = new_is_coding
                             st.session_state.question_count = next_q_num
@@ -2267,7 +2234,6 @@ elif choice == "New Evaluation":
                             st.session_state.audio_answer = None  # Clear previous audio recording
                         
                         st.success(f"✅ Moving to Question {st.session_state.question_count}...")
-                        time.sleep(1.5)  # Brief pause before refresh
                         st.rerun()
 
 elif choice == "Evaluation History":
@@ -2388,15 +2354,16 @@ elif choice == "Results":
                 input_variables=["role", "total_score", "max_score", "percentage", "time_taken", "qa_summary"]
             )
             
-            chain = recommendation_prompt | llm | StrOutputParser()
-            recommendation = chain.invoke({
-                "role": st.session_state.role,
-                "total_score": total_score,
-                "max_score": max_score,
-                "percentage": pct,
-                "time_taken": f"{int(time_taken // 60)}:{int(time_taken % 60):02d}",
-                "qa_summary": qa_summary
-            })
+            chain = recommendation_prompt | router.runnable('hiring_recommendation') | StrOutputParser()
+            with llm_metrics.track('hiring_recommendation') as call:
+                recommendation = chain.invoke({
+                    "role": st.session_state.role,
+                    "total_score": total_score,
+                    "max_score": max_score,
+                    "percentage": pct,
+                    "time_taken": f"{int(time_taken // 60)}:{int(time_taken % 60):02d}",
+                    "qa_summary": qa_summary
+                }, config=call.config)
             
             # Display recommendation with styling
             if "RECOMMENDED" in recommendation.upper() and "NOT RECOMMENDED" not in recommendation.upper():
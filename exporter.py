@@ -0,0 +1,231 @@
+"""
+Evaluation History Export
+Streams evaluation history out of SQLite as CSV, JSONL or Parquet
+"""
+
+import csv
+import io
+import json
+import logging
+
+import db_utils
+
+# pyarrow is imported by the first Parquet export rather than with the app
+pa = None
+pq = None
+
+# One row per answered question; evaluations without questions get a single row
+EXPORT_COLUMNS = ["username", "date", "role", "total_score", "max_score", "percentage",
+                  "time_taken", "question_index", "question", "answer", "score", "feedback"]
+
+FETCH_SIZE = 200           # evaluations pulled from SQLite per round trip
+CSV_CHUNK_ROWS = 500       # rows buffered before a CSV/JSONL chunk is yielded
+PARQUET_ROW_GROUP = 5000   # rows per Parquet row group
+PYARROW_MISSING = "Parquet export needs pyarrow (pip install pyarrow); csv and jsonl are always available"
+
+
+def iter_evaluation_rows(username=None, role=None, since=None, until=None, fetch_size=FETCH_SIZE):
+    """
+    Yield flattened export rows (tuples in EXPORT_COLUMNS order)
+
+    Evaluations are read through a server-side cursor in batches of
+    fetch_size, so memory use does not grow with the size of the table.
+
+    Args:
+        username / role: Exact-match filters
+        since / until: Date bounds (until is exclusive)
+    """
+    clauses, params = [], []
+    if username:
+        clauses.append("username = ?")
+        params.append(username)
+    if role:
+        clauses.append("role = ?")
+        params.append(role)
+    if since:
+        clauses.append("date >= ?")
+        params.append(since)
+    if until:
+        clauses.append("date < ?")
+        params.append(until)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    conn = db_utils.get_connection()
+    try:
+        cursor = conn.execute(f"""
+            SELECT username, date, role, score, max_score, percentage, time_taken, qa_history
+            FROM evaluations
+            {where}
+            ORDER BY date, id
+        """, params)
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            for row in rows:
+                head = (row['username'], row['date'], row['role'], row['score'],
+                        row['max_score'], row['percentage'], row['time_taken'])
+                try:
+                    qa_list = json.loads(row['qa_history']) if row['qa_history'] else []
+                except ValueError:
+                    logging.error(f"Skipping unreadable qa_history for {row['username']} on {row['date']}")
+                    qa_list = []
+                if not qa_list:
+                    yield head + (None, None, None, None, None)
+                    continue
+                for idx, qa in enumerate(qa_list, start=1):
+                    # Streamlit stores q/a, the Flask app question/answer
+                    question = qa.get('q', qa.get('question', ''))
+                    answer = qa.get('a', qa.get('answer', ''))
+                    yield head + (idx, question, answer, qa.get('score'), qa.get('feedback', ''))
+    finally:
+        conn.close()
+
+
+def stream_csv(rows, chunk_rows=CSV_CHUNK_ROWS):
+    """Yield CSV text in chunks of chunk_rows rows, header first"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    pending = 0
+    for row in rows:
+        writer.writerow(["" if value is None else value for value in row])
+        pending += 1
+        if pending >= chunk_rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+    yield buffer.getvalue()
+
+
+def stream_jsonl(rows, chunk_rows=CSV_CHUNK_ROWS):
+    """Yield JSON Lines text, one object per row, in chunks of chunk_rows rows"""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False))
+        if len(lines) >= chunk_rows:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands written bytes back to a generator"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _load_pyarrow():
+    """Import pyarrow into pa / pq; returns False if it is not installed"""
+    global pa, pq
+    if pq is None:
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except Exception:
+            return False
+        pa, pq = pyarrow, pyarrow.parquet
+    return True
+
+
+def _parquet_schema():
+    return pa.schema([
+        ("username", pa.string()),
+        ("date", pa.string()),
+        ("role", pa.string()),
+        ("total_score", pa.float64()),
+        ("max_score", pa.float64()),
+        ("percentage", pa.float64()),
+        ("time_taken", pa.float64()),
+        ("question_index", pa.int32()),
+        ("question", pa.string()),
+        ("answer", pa.string()),
+        ("score", pa.float64()),
+        ("feedback", pa.string()),
+    ])
+
+
+def _to_float(value):
+    try:
+        return None if value in (None, "") else float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def stream_parquet(rows, row_group=PARQUET_ROW_GROUP):
+    """Yield Parquet file bytes, one row group at a time (requires pyarrow)"""
+    if not _load_pyarrow():
+        raise RuntimeError(PYARROW_MISSING)
+
+    schema = _parquet_schema()
+    numeric = {"total_score", "max_score", "percentage", "time_taken", "score"}
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+
+    def flush(batch):
+        columns = list(zip(*batch))
+        arrays = []
+        for field, values in zip(schema, columns):
+            if field.name in numeric:
+                values = [_to_float(v) for v in values]
+            elif field.name not in ("question_index",):
+                values = [None if v is None else str(v) for v in values]
+            arrays.append(pa.array(values, type=field.type))
+        writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+    batch = []
+    try:
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= row_group:
+                flush(batch)
+                batch = []
+                yield sink.drain()
+        if batch:
+            flush(batch)
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+# format -> (streamer, mimetype, file extension)
+EXPORT_FORMATS = {
+    'csv': (stream_csv, 'text/csv', 'csv'),
+    'jsonl': (stream_jsonl, 'application/x-ndjson', 'jsonl'),
+    'parquet': (stream_parquet, 'application/vnd.apache.parquet', 'parquet'),
+}
+
+
+def export_evaluations(fmt='csv', **filters):
+    """
+    Stream an evaluation export in the given format
+
+    Returns:
+        tuple: (chunk generator, mimetype, file extension)
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    if fmt == 'parquet' and not _load_pyarrow():
+        raise RuntimeError(PYARROW_MISSING)
+    streamer, mimetype, extension = EXPORT_FORMATS[fmt]
+    return streamer(iter_evaluation_rows(**filters)), mimetype, extension
@@ -1,40 +1,102 @@
 """
 Feedback Database Utilities
 Manages user feedback on AI evaluations
+
+Feedback lives in the feedback table of evaluation_system.db (see db_utils),
+alongside the evaluations it refers to. The old evaluation_feedback.db is
+imported by the first feedback query of each process and left in place as
+a backup.
 """
 
+import os
 import sqlite3
 import json
+import threading
 from datetime import datetime
 
-DB_PATH = 'evaluation_feedback.db'
+import db_utils
 
-def init_feedback_db():
-    """Initialize the feedback database"""
+DB_PATH = db_utils.DB_FILE
+LEGACY_DB_PATH = 'evaluation_feedback.db'
+
+# Unified feedback columns, aliased to the field names this module has always returned
+FEEDBACK_FIELDS = '''
+    id, user_id, username, question_id, question_text, user_answer,
+    ai_score, ai_feedback, message AS user_feedback, user_expected_score,
+    date AS submitted_at, COALESCE(status, 'pending') AS status,
+    evaluation_id, question_index
+'''
+
+_initialized = False
+_init_lock = threading.Lock()
+
+def _open():
     conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def _connect():
+    if not _initialized:
+        init_feedback_db()
+    return _open()
+
+def init_feedback_db():
+    """Initialize the feedback database (done by the first query; later calls return at once)"""
+    global _initialized
+    with _init_lock:
+        if _initialized:
+            return
+        db_utils.init_database()
+        migrate_legacy_feedback()
+        _initialized = True
+    print("Feedback database initialized successfully")
     
-    # Create feedback table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS feedback (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id TEXT NOT NULL,
-            username TEXT NOT NULL,
-            question_id TEXT NOT NULL,
-            question_text TEXT NOT NULL,
-            user_answer TEXT NOT NULL,
-            ai_score INTEGER NOT NULL,
-            ai_feedback TEXT NOT NULL,
-            user_feedback TEXT NOT NULL,
-            user_expected_score INTEGER,
-            submitted_at TEXT NOT NULL,
-            status TEXT DEFAULT 'pending'
-        )
-    ''')
+def migrate_legacy_feedback(legacy_path=LEGACY_DB_PATH):
+    """
+    Copy rows from the standalone evaluation_feedback.db into the unified table
+
+    Rows are keyed by their original id (legacy_id), so running this again
+    only picks up rows that were added to the old database since.
     
-    conn.commit()
-    conn.close()
-    print("Feedback database initialized successfully")
+    Returns:
+        int: Number of rows imported
+    """
+    if not os.path.exists(legacy_path):
+        return 0
+
+    conn = _open()
+    try:
+        conn.execute('ATTACH DATABASE ? AS legacy', (legacy_path,))
+        has_table = conn.execute('''
+            SELECT 1 FROM legacy.sqlite_master WHERE type = 'table' AND name = 'feedback'
+        ''').fetchone()
+        if not has_table:
+            return 0
+
+        # Legacy timestamps are ISO-8601; store them in the same format as db_utils
+        cursor = conn.execute('''
+            INSERT OR IGNORE INTO main.feedback (
+                username, date, role, skills, message, resolved, admin_comment,
+                status, user_id, question_id, question_text, user_answer,
+                ai_score, ai_feedback, user_expected_score, legacy_id
+            )
+            SELECT
+                username, substr(replace(submitted_at, 'T', ' '), 1, 19), NULL, '[]',
+                user_feedback, CASE WHEN status = 'resolved' THEN 1 ELSE 0 END, NULL,
+                COALESCE(status, 'pending'), user_id, question_id, question_text, user_answer,
+                ai_score, ai_feedback, user_expected_score, id
+            FROM legacy.feedback
+        ''')
+        imported = cursor.rowcount
+        conn.commit()
+        if imported:
+            print(f"Imported {imported} feedback entries from {legacy_path}")
+        return imported
+    except Exception as e:
+        print(f"Error importing legacy feedback: {e}")
+        return 0
+    finally:
+        conn.close()
 
 def save_feedback(feedback_data):
     """
@@ -51,20 +113,25 @@ def save_feedback(feedback_data):
             - ai_feedback: Feedback given by AI
             - user_feedback: User's feedback/complaint
             - user_expected_score: Score user thinks they deserved
+            - evaluation_id: Evaluation the question belongs to (optional)
+            - question_index: Position of the question in that evaluation (optional)
     
     Returns:
         dict: Success status and feedback ID
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = _connect()
         cursor = conn.cursor()
         
+        # Only link evaluations that belong to the submitting user
         cursor.execute('''
             INSERT INTO feedback (
                 user_id, username, question_id, question_text, 
-                user_answer, ai_score, ai_feedback, user_feedback,
-                user_expected_score, submitted_at
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                user_answer, ai_score, ai_feedback, message,
+                user_expected_score, date, status, resolved, skills,
+                evaluation_id, question_index
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'pending', 0, '[]',
+                (SELECT id FROM evaluations WHERE id = ? AND username = ?), ?)
         ''', (
             feedback_data.get('user_id'),
             feedback_data.get('username'),
@@ -75,7 +142,10 @@ def save_feedback(feedback_data):
             feedback_data.get('ai_feedback'),
             feedback_data.get('user_feedback'),
             feedback_data.get('user_expected_score'),
-            datetime.now().isoformat()
+            datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            feedback_data.get('evaluation_id'),
+            feedback_data.get('username'),
+            feedback_data.get('question_index')
         ))
         
         feedback_id = cursor.lastrowid
@@ -86,89 +156,134 @@ def save_feedback(feedback_data):
     except Exception as e:
         return {'success': False, 'error': str(e)}
 
-def get_user_feedback(username):
-    """Get all feedback submitted by a user"""
+def _row_to_feedback(row):
+    """Convert a feedback row to a dictionary"""
+    return dict(row)
+
+def encode_cursor(submitted_at, feedback_id):
+    """Build an opaque pagination cursor from the last row of a page"""
+    return db_utils._encode_cursor(submitted_at, feedback_id)
+
+def decode_cursor(cursor):
+    """Split a pagination cursor into (submitted_at, id); raises db_utils.InvalidCursor if it is malformed"""
+    submitted_at, feedback_id = db_utils._decode_cursor(cursor)
+    if not isinstance(submitted_at, str) or not isinstance(feedback_id, int):
+        raise db_utils.InvalidCursor('Invalid cursor')
+    return submitted_at, feedback_id
+
+def query_feedback(limit=100, cursor=None, status=None, username=None, since=None, until=None):
+    """
+    Get one page of feedback, newest first, using keyset pagination
+
+    Args:
+        limit: Page size
+        cursor: next_cursor returned with the previous page
+        status: Filter by status (pending, reviewed, resolved)
+        username: Filter by username
+        since / until: Timestamps bounding submitted_at (until is exclusive)
+
+    Returns:
+        dict: Success status, feedback list and next_cursor (None on the last page)
+    """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT * FROM feedback 
-            WHERE username = ? 
-            ORDER BY submitted_at DESC
-        ''', (username,))
-        
-        rows = cursor.fetchall()
+        limit = max(1, int(limit))
+        clauses = []
+        params = []
+        if status:
+            clauses.append('status = ?')
+            params.append(status)
+        if username:
+            clauses.append('username = ?')
+            params.append(username)
+        if since:
+            clauses.append('date >= ?')
+            params.append(since.replace('T', ' '))
+        if until:
+            clauses.append('date < ?')
+            params.append(until.replace('T', ' '))
+        if cursor:
+            cursor_at, cursor_id = decode_cursor(cursor)
+            clauses.append('(date < ? OR (date = ? AND id < ?))')
+            params.extend([cursor_at, cursor_at, cursor_id])
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+
+        conn = _connect()
+        db_cursor = conn.cursor()
+        db_cursor.execute(f'''
+            SELECT {FEEDBACK_FIELDS} FROM feedback
+            {where}
+            ORDER BY date DESC, id DESC
+            LIMIT ?
+        ''', (*params, limit + 1))
+        rows = db_cursor.fetchall()
         conn.close()
         
-        feedback_list = []
-        for row in rows:
-            feedback_list.append({
-                'id': row[0],
-                'user_id': row[1],
-                'username': row[2],
-                'question_id': row[3],
-                'question_text': row[4],
-                'user_answer': row[5],
-                'ai_score': row[6],
-                'ai_feedback': row[7],
-                'user_feedback': row[8],
-                'user_expected_score': row[9],
-                'submitted_at': row[10],
-                'status': row[11]
-            })
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        feedback_list = [_row_to_feedback(row) for row in rows]
+        next_cursor = encode_cursor(rows[-1]['submitted_at'], rows[-1]['id']) if has_more else None
         
-        return {'success': True, 'feedback': feedback_list}
+        return {
+            'success': True,
+            'feedback': feedback_list,
+            'count': len(feedback_list),
+            'next_cursor': next_cursor
+        }
+    except db_utils.InvalidCursor:
+        return {'success': False, 'error': 'Invalid cursor'}
     except Exception as e:
         return {'success': False, 'error': str(e)}
 
-def get_all_feedback(limit=100):
-    """Get all feedback (for admin review)"""
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+def get_user_feedback(username, limit=100, cursor=None):
+    """Get feedback submitted by a user, newest first, one page at a time"""
+    return query_feedback(limit=limit, cursor=cursor, username=username)
         
-        cursor.execute('''
-            SELECT * FROM feedback 
-            ORDER BY submitted_at DESC 
-            LIMIT ?
-        ''', (limit,))
-        
-        rows = cursor.fetchall()
+def get_all_feedback(limit=100, cursor=None, status=None, username=None, since=None, until=None):
+    """Get all feedback (for admin review), one page at a time"""
+    return query_feedback(limit=limit, cursor=cursor, status=status,
+                          username=username, since=since, until=until)
+
+def get_feedback_target(feedback_id):
+    """
+    Resolve the evaluation question a feedback entry disputes
+
+    Returns:
+        dict: Success status plus evaluation_id, question_index and the
+              evaluation's username (evaluation_id is None for unlinked feedback)
+    """
+    try:
+        conn = _connect()
+        row = conn.execute('''
+            SELECT f.id, f.username, f.evaluation_id, f.question_index, e.username AS evaluation_username
+            FROM feedback f
+            LEFT JOIN evaluations e ON e.id = f.evaluation_id
+            WHERE f.id = ?
+        ''', (feedback_id,)).fetchone()
         conn.close()
-        
-        feedback_list = []
-        for row in rows:
-            feedback_list.append({
-                'id': row[0],
-                'user_id': row[1],
-                'username': row[2],
-                'question_id': row[3],
-                'question_text': row[4],
-                'user_answer': row[5],
-                'ai_score': row[6],
-                'ai_feedback': row[7],
-                'user_feedback': row[8],
-                'user_expected_score': row[9],
-                'submitted_at': row[10],
-                'status': row[11]
-            })
-        
-        return {'success': True, 'feedback': feedback_list, 'count': len(feedback_list)}
+
+        if not row:
+            return {'success': False, 'error': 'Feedback not found'}
+        return {
+            'success': True,
+            'feedback_id': row['id'],
+            'username': row['username'],
+            'evaluation_id': row['evaluation_id'] if row['evaluation_username'] else None,
+            'question_index': row['question_index']
+        }
     except Exception as e:
         return {'success': False, 'error': str(e)}
 
 def update_feedback_status(feedback_id, status):
     """Update feedback status (pending, reviewed, resolved)"""
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = _connect()
         cursor = conn.cursor()
         
         cursor.execute('''
             UPDATE feedback 
-            SET status = ? 
+            SET status = ?, resolved = ?
             WHERE id = ?
-        ''', (status, feedback_id))
+        ''', (status, 1 if status == 'resolved' else 0, feedback_id))
         
         conn.commit()
         conn.close()
@@ -178,35 +293,25 @@ def update_feedback_status(feedback_id, status):
         return {'success': False, 'error': str(e)}
 
 def get_feedback_stats():
-    """Get feedback statistics"""
+    """Get feedback statistics in a single grouped scan"""
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = _connect()
         cursor = conn.cursor()
         
-        # Total feedback count
-        cursor.execute('SELECT COUNT(*) FROM feedback')
-        total = cursor.fetchone()[0]
-        
-        # Pending feedback
-        cursor.execute('SELECT COUNT(*) FROM feedback WHERE status = "pending"')
-        pending = cursor.fetchone()[0]
-        
-        # Reviewed feedback
-        cursor.execute('SELECT COUNT(*) FROM feedback WHERE status = "reviewed"')
-        reviewed = cursor.fetchone()[0]
+        cursor.execute("SELECT COALESCE(status, 'pending'), COUNT(*) FROM feedback GROUP BY 1")
+        by_status = dict(cursor.fetchall())
         
         conn.close()
         
         return {
             'success': True,
             'stats': {
-                'total': total,
-                'pending': pending,
-                'reviewed': reviewed
+                'total': sum(by_status.values()),
+                'pending': by_status.get('pending', 0),
+                'reviewed': by_status.get('reviewed', 0),
+                'resolved': by_status.get('resolved', 0),
+                'by_status': by_status
             }
         }
     except Exception as e:
         return {'success': False, 'error': str(e)}
-
-# Initialize database when module is imported
-init_feedback_db()
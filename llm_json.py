@@ -0,0 +1,244 @@
+"""
+Structured LLM Output
+Requests JSON from the model, extracts it tolerantly (also while streaming) and validates it against a small schema
+"""
+
+import json
+import logging
+import os
+import re
+
+from llm_metrics import llm_metrics
+from llm_router import LLMRouter
+
+# JSON mode (response_format=json_object) is not available on reasoning models
+JSON_MODE = os.environ.get("LLM_JSON_MODE", "auto").lower()
+
+# Answer evaluation, as requested by both the Streamlit and the Flask prompts
+EVALUATION_SCHEMA = {
+    'score': {'type': 'number', 'required': True, 'min': 0, 'max': 20},
+    'reason': {'type': 'string', 'aliases': ('feedback', 'explanation')},
+    'suggestions': {'type': 'string', 'aliases': ('improvements',)},
+}
+
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+_SCORE_RE = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*(?:/\s*\d+(?:\.\d+)?)?\s*$")
+_SMART_QUOTES = str.maketrans({'“': '"', '”': '"', '‘': "'", '’': "'"})
+
+
+class JSONExtractor:
+    """
+    Incremental scanner that pulls top-level JSON objects out of model output
+
+    Text can be fed in arbitrary chunks (e.g. from llm.stream()); feed()
+    returns the objects completed by that chunk. Prose, markdown fences and
+    anything else around the braces are ignored, and braces inside JSON
+    strings do not count.
+    """
+
+    def __init__(self):
+        self._buffer = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, text):
+        """Consume a chunk of text and return any dicts completed by it"""
+        found = []
+        for char in text or "":
+            if self._depth == 0:
+                if char == '{':
+                    self._buffer = [char]
+                    self._depth = 1
+                continue
+
+            self._buffer.append(char)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == '{':
+                self._depth += 1
+            elif char == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    parsed = loads_lenient("".join(self._buffer))
+                    if isinstance(parsed, dict):
+                        found.append(parsed)
+                    self._buffer = []
+        return found
+
+
+def loads_lenient(text):
+    """json.loads with fixes for the usual model slips; returns None if still invalid"""
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    repaired = _TRAILING_COMMA_RE.sub(r"\1", text.translate(_SMART_QUOTES))
+    repaired = re.sub(r"\bTrue\b", "true", re.sub(r"\bFalse\b", "false", re.sub(r"\bNone\b", "null", repaired)))
+    try:
+        return json.loads(repaired)
+    except ValueError:
+        return None
+
+
+def extract_json(text):
+    """First JSON object found in text, or None"""
+    found = JSONExtractor().feed(text)
+    return found[0] if found else None
+
+
+def validate(data, schema):
+    """
+    Check a parsed object against a schema and normalise its fields
+
+    Schema fields are {'type': 'number' | 'string', 'required', 'min', 'max',
+    'aliases'}. Numbers given as strings ("15", "15/20") are converted, lists
+    of strings are joined, and numbers are clamped to [min, max].
+
+    Returns:
+        tuple: (normalised dict, list of error messages)
+    """
+    if not isinstance(data, dict):
+        return None, ['response is not a JSON object']
+
+    result = {}
+    errors = []
+    for field, spec in schema.items():
+        value = data.get(field)
+        for alias in spec.get('aliases', ()):
+            if value is None:
+                value = data.get(alias)
+
+        if value is None:
+            if spec.get('required'):
+                errors.append(f"missing required field '{field}'")
+            elif spec['type'] == 'string':
+                result[field] = ""
+            continue
+
+        if spec['type'] == 'number':
+            if isinstance(value, str):
+                match = _SCORE_RE.match(value)
+                value = float(match.group(1)) if match else None
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                errors.append(f"field '{field}' must be a number")
+                continue
+            if 'min' in spec:
+                value = max(spec['min'], value)
+            if 'max' in spec:
+                value = min(spec['max'], value)
+            result[field] = int(value) if float(value).is_integer() else value
+        else:
+            if isinstance(value, (list, tuple)):
+                value = "; ".join(str(v) for v in value)
+            result[field] = str(value)
+    return result, errors
+
+
+def _schema_example(schema):
+    return json.dumps({field: (0 if spec['type'] == 'number' else "...") for field, spec in schema.items()})
+
+
+def _use_json_mode(llm):
+    if JSON_MODE in ("1", "true", "on"):
+        return True
+    if JSON_MODE in ("0", "false", "off"):
+        return False
+    return 'reasoner' not in (getattr(llm, 'model_name', '') or '').lower()
+
+
+def _stream_first_valid(model, messages, schema, config):
+    """Stream a response, stopping as soon as a valid object is complete"""
+    extractor = JSONExtractor()
+    chunks = []
+    last_errors = ['no JSON object in response']
+    stream = model.stream(messages, config=config)
+    try:
+        for chunk in stream:
+            text = chunk.content if isinstance(chunk.content, str) else ""
+            chunks.append(text)
+            for candidate in extractor.feed(text):
+                data, errors = validate(candidate, schema)
+                if not errors:
+                    return data, "".join(chunks), []
+                last_errors = errors
+    finally:
+        # Closing early drops the rest of the response (trailing prose)
+        stream.close()
+    return None, "".join(chunks), last_errors
+
+
+def _json_model(llm):
+    return llm.bind(response_format={"type": "json_object"}) if _use_json_mode(llm) else llm
+
+
+def _stream_routed(llm, prompt_type, messages, schema, config):
+    """Stream from a chat model, or from a router's endpoints in order until one answers"""
+    if not isinstance(llm, LLMRouter):
+        return _stream_first_valid(_json_model(llm), messages, schema, config)
+    last_error = None
+    for endpoint in llm.candidates(prompt_type):
+        try:
+            return endpoint.run(
+                lambda: _stream_first_valid(_json_model(endpoint.chat), messages, schema, config),
+                prompt_type
+            )
+        except Exception as e:
+            last_error = e
+            logging.warning(f"{prompt_type}: endpoint {endpoint.name} failed: {e}")
+    raise last_error
+
+
+def invoke_json(llm, prompt, schema, prompt_type, repair=True):
+    """
+    Ask the model for a JSON object and return it validated
+
+    Uses JSON mode where the model supports it, streams the reply so the call
+    ends once a valid object has arrived, and makes at most one repair
+    request quoting the validation errors.
+
+    Args:
+        llm: Chat model, or an LLMRouter (endpoints are tried in route order)
+        prompt: Fully formatted prompt text
+        schema: Field specification (see validate)
+        prompt_type: Name used for metrics
+
+    Returns:
+        dict: success, data (normalised object), raw (model text), repaired
+    """
+    # Not at module level: langchain_core would be loaded by every app import
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    messages = [HumanMessage(content=prompt)]
+
+    with llm_metrics.track(prompt_type) as call:
+        data, raw, errors = _stream_routed(llm, prompt_type, messages, schema, call.config)
+    if not errors:
+        return {'success': True, 'data': data, 'raw': raw, 'repaired': False}
+
+    llm_metrics.record_json_failure(prompt_type)
+    logging.warning(f"{prompt_type}: invalid JSON from model ({'; '.join(errors)})")
+    if not repair:
+        return {'success': False, 'error': '; '.join(errors), 'raw': raw}
+
+    messages += [
+        AIMessage(content=raw),
+        HumanMessage(content=(
+            f"Your reply could not be used: {'; '.join(errors)}. "
+            f"Reply again with only a JSON object of the form {_schema_example(schema)} and nothing else."
+        )),
+    ]
+    with llm_metrics.track(f"{prompt_type}_repair") as call:
+        data, repair_raw, errors = _stream_routed(llm, prompt_type, messages, schema, call.config)
+    if not errors:
+        return {'success': True, 'data': data, 'raw': repair_raw, 'repaired': True}
+
+    llm_metrics.record_json_failure(prompt_type)
+    return {'success': False, 'error': '; '.join(errors), 'raw': raw}
@@ -0,0 +1,436 @@
+"""
+LLM Call Metrics
+Records latency, token usage, retries, cache hits and JSON parse failures for every LLM call
+
+Metrics end up in evaluation_system.db because the Streamlit interview app
+and the Flask app run as separate processes; both write here and the Flask
+app serves /metrics and the admin latency table. Each process buffers them
+in memory and writes them in batches.
+"""
+
+import atexit
+import functools
+import logging
+import os
+import socket
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import db_utils
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+# Raw samples kept per prompt type for the percentile table
+SAMPLES_PER_PROMPT_TYPE = int(os.environ.get("LLM_METRICS_SAMPLES", "5000"))
+# Buffered metrics are written this often per process
+FLUSH_INTERVAL_SECONDS = float(os.environ.get("LLM_METRICS_FLUSH_SECONDS", "1"))
+# Unwritten samples kept while the database is unavailable; older ones are dropped
+MAX_PENDING_SAMPLES = 10000
+# Gauge values from processes that stopped reporting are ignored after this long
+GAUGE_STALE_SECONDS = 300
+
+_METRIC_HELP = {
+    'llm_calls_total': ('counter', 'LLM calls by outcome'),
+    'llm_call_duration_seconds': ('histogram', 'Wall-clock latency of LLM calls'),
+    'llm_tokens_total': ('counter', 'Tokens reported by the provider'),
+    'llm_retries_total': ('counter', 'Repeated LLM calls (provider retries and regenerations)'),
+    'llm_cache_hits_total': ('counter', 'LLM calls answered from a cache'),
+    'llm_cache_misses_total': ('counter', 'Cache lookups that fell through to the LLM'),
+    'llm_json_parse_failures_total': ('counter', 'Responses that could not be parsed as JSON'),
+    'llm_prompt_bytes_saved_total': ('counter', 'Bytes removed from prompts by compaction'),
+    'llm_rate_limited_total': ('counter', 'Provider 429 responses'),
+    'llm_coalesced_requests_total': ('counter', 'Calls answered by an identical in-flight call'),
+    'llm_rate_limit_queue_depth': ('gauge', 'Calls waiting for a rate limiter slot, per endpoint'),
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _usage_handler_class():
+    """Define the callback class on first use, so importing this module does not load langchain_core"""
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class _UsageHandler(BaseCallbackHandler):
+        """LangChain callback collecting token usage and retries for one call"""
+
+        def __init__(self):
+            self.prompt_tokens = 0
+            self.completion_tokens = 0
+            self.retries = 0
+
+        def on_llm_end(self, response, **kwargs):
+            usage = (response.llm_output or {}).get('token_usage') or {}
+            if usage:
+                self.prompt_tokens += usage.get('prompt_tokens') or 0
+                self.completion_tokens += usage.get('completion_tokens') or 0
+                return
+            # Newer langchain-openai versions report usage on the message instead
+            for generations in response.generations:
+                for generation in generations:
+                    metadata = getattr(getattr(generation, 'message', None), 'usage_metadata', None) or {}
+                    self.prompt_tokens += metadata.get('input_tokens') or 0
+                    self.completion_tokens += metadata.get('output_tokens') or 0
+
+        def on_retry(self, retry_state, **kwargs):
+            self.retries += 1
+
+    return _UsageHandler
+
+
+class LLMCall:
+    """Handle for one tracked call; pass .config to chain.invoke()"""
+
+    def __init__(self, prompt_type):
+        self.prompt_type = prompt_type
+        self.handler = _usage_handler_class()()
+        self.config = {'callbacks': [self.handler]}
+
+
+def _percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class LLMMetrics:
+    """
+    Cumulative counters (Prometheus semantics) plus a bounded window of raw
+    call samples per prompt type for p50/p95/p99.
+
+    Recording only updates in-memory buffers; a daemon thread writes them
+    to the database in one transaction every FLUSH_INTERVAL_SECONDS, so
+    LLM calls on the request path never wait for the SQLite write lock.
+    Readers flush this process's buffer first.
+
+    Recording never raises: a metrics failure is logged and the LLM call it
+    describes carries on.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._source = f"{socket.gethostname()}:{os.getpid()}"
+        self._pending_counts = {}
+        self._pending_samples = deque(maxlen=MAX_PENDING_SAMPLES)
+        self._pending_gauges = {}
+        self._gauge_values = {}
+        self._flusher = None
+
+    def _increment(self, metric, prompt_type, label='', amount=1):
+        """Add to a buffered counter (caller holds self._lock)"""
+        key = (metric, prompt_type, label)
+        self._pending_counts[key] = self._pending_counts.get(key, 0) + amount
+
+    def _record(self, update):
+        """Apply update() to the buffers and make sure the flush thread runs"""
+        with self._lock:
+            update()
+        if self._flusher is None:
+            self._start_flusher()
+
+    def _start_flusher(self):
+        with self._flush_lock:
+            if self._flusher is not None:
+                return
+
+            def run():
+                while True:
+                    time.sleep(FLUSH_INTERVAL_SECONDS)
+                    self.flush()
+
+            self._flusher = threading.Thread(target=run, name="llm-metrics-flush", daemon=True)
+            self._flusher.start()
+            atexit.register(self.flush)
+
+    def flush(self):
+        """
+        Write buffered metrics to the database in one transaction
+
+        Also prunes samples beyond SAMPLES_PER_PROMPT_TYPE and gauge rows of
+        processes that stopped reporting. On failure the buffers are kept
+        for the next attempt.
+
+        Returns:
+            bool: False if the write failed
+        """
+        with self._flush_lock:
+            with self._lock:
+                counts, self._pending_counts = self._pending_counts, {}
+                gauges, self._pending_gauges = self._pending_gauges, {}
+                samples = list(self._pending_samples)
+                self._pending_samples.clear()
+            if not (counts or gauges or samples):
+                return True
+
+            try:
+                conn = db_utils.get_connection()
+                try:
+                    self._write(conn, counts, gauges, samples)
+                    conn.commit()
+                finally:
+                    conn.close()
+                return True
+            except Exception as e:
+                logging.error(f"Error recording LLM metrics: {e}")
+                with self._lock:
+                    for key, amount in counts.items():
+                        self._pending_counts[key] = self._pending_counts.get(key, 0) + amount
+                    for key, gauge in gauges.items():
+                        self._pending_gauges.setdefault(key, gauge)
+                    # Oldest samples go first if the buffer is full
+                    self._pending_samples = deque([*samples, *self._pending_samples], maxlen=MAX_PENDING_SAMPLES)
+                return False
+
+    def _write(self, conn, counts, gauges, samples):
+        conn.executemany("""
+            INSERT INTO llm_metric_counters (metric, prompt_type, label, value)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (metric, prompt_type, label) DO UPDATE SET value = value + excluded.value
+        """, [(metric, prompt_type, label, amount) for (metric, prompt_type, label), amount in counts.items()])
+        conn.executemany("""
+            INSERT INTO llm_call_samples
+                (prompt_type, created_at, duration_ms, status, prompt_tokens, completion_tokens, retries)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, samples)
+        for prompt_type in {sample[0] for sample in samples}:
+            conn.execute("""
+                DELETE FROM llm_call_samples
+                WHERE prompt_type = ? AND id <= (
+                    SELECT id FROM llm_call_samples WHERE prompt_type = ?
+                    ORDER BY id DESC LIMIT 1 OFFSET ?
+                )
+            """, (prompt_type, prompt_type, SAMPLES_PER_PROMPT_TYPE))
+        if gauges:
+            conn.executemany("""
+                INSERT INTO llm_metric_gauges (metric, label, source, value, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (metric, label, source) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+            """, [(metric, label, self._source, value, updated_at)
+                  for (metric, label), (value, updated_at) in gauges.items()])
+            conn.execute("DELETE FROM llm_metric_gauges WHERE updated_at < ?",
+                         (time.time() - GAUGE_STALE_SECONDS,))
+
+    @contextmanager
+    def track(self, prompt_type):
+        """
+        Time an LLM call and record its outcome
+
+        Usage:
+            with llm_metrics.track('evaluate_answer') as call:
+                result = chain.invoke(inputs, config=call.config)
+        """
+        call = LLMCall(prompt_type)
+        started = time.perf_counter()
+        status = 'ok'
+        try:
+            yield call
+        except Exception:
+            status = 'error'
+            raise
+        finally:
+            self.record_call(prompt_type, time.perf_counter() - started, status,
+                             prompt_tokens=call.handler.prompt_tokens,
+                             completion_tokens=call.handler.completion_tokens,
+                             retries=call.handler.retries)
+
+    def record_call(self, prompt_type, seconds, status='ok', prompt_tokens=0, completion_tokens=0, retries=0):
+        """Record one finished LLM call"""
+        def update():
+            self._increment('llm_calls_total', prompt_type, status)
+            self._increment('llm_call_duration_seconds_sum', prompt_type, '', seconds)
+            # Buckets are stored cumulatively, as Prometheus expects them
+            for bound in LATENCY_BUCKETS:
+                if seconds <= bound:
+                    self._increment('llm_call_duration_seconds_bucket', prompt_type, str(bound))
+            self._increment('llm_call_duration_seconds_bucket', prompt_type, '+Inf')
+            if prompt_tokens:
+                self._increment('llm_tokens_total', prompt_type, 'prompt', prompt_tokens)
+            if completion_tokens:
+                self._increment('llm_tokens_total', prompt_type, 'completion', completion_tokens)
+            if retries:
+                self._increment('llm_retries_total', prompt_type, '', retries)
+            self._pending_samples.append((prompt_type, datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                                          seconds * 1000, status, prompt_tokens, completion_tokens, retries))
+        self._record(update)
+
+    def record_cache(self, prompt_type, hit):
+        """Record a cache lookup in front of an LLM call"""
+        metric = 'llm_cache_hits_total' if hit else 'llm_cache_misses_total'
+        self._record(lambda: self._increment(metric, prompt_type))
+
+    def record_json_failure(self, prompt_type):
+        """Record a response that did not contain parseable JSON"""
+        self._record(lambda: self._increment('llm_json_parse_failures_total', prompt_type))
+
+    def record_bytes_saved(self, prompt_type, saved):
+        """Record bytes removed from a prompt before sending it"""
+        self._record(lambda: self._increment('llm_prompt_bytes_saved_total', prompt_type, '', saved))
+
+    def record_rate_limited(self, prompt_type):
+        """Record a 429 from the provider"""
+        self._record(lambda: self._increment('llm_rate_limited_total', prompt_type))
+
+    def record_coalesced(self, prompt_type):
+        """Record a call that reused an identical in-flight call's result"""
+        self._record(lambda: self._increment('llm_coalesced_requests_total', prompt_type))
+
+    def set_gauge(self, metric, label, value):
+        """
+        Report this process's current value of a gauge
+
+        Values from all processes are summed on export. Only the latest
+        value per flush is written.
+        """
+        key = (metric, label)
+
+        def update():
+            if self._gauge_values.get(key) == value:
+                return
+            self._gauge_values[key] = value
+            self._pending_gauges[key] = (value, time.time())
+        self._record(update)
+
+    def _gauges(self):
+        self.flush()
+        conn = db_utils.get_connection()
+        try:
+            return conn.execute("""
+                SELECT metric, label, SUM(value) AS value FROM llm_metric_gauges
+                WHERE updated_at >= ?
+                GROUP BY metric, label
+                ORDER BY metric, label
+            """, (time.time() - GAUGE_STALE_SECONDS,)).fetchall()
+        finally:
+            conn.close()
+
+    def record_retry(self, prompt_type, count=1):
+        """Record regenerations made outside a tracked call"""
+        self._record(lambda: self._increment('llm_retries_total', prompt_type, '', count))
+
+    def _counters(self):
+        self.flush()
+        conn = db_utils.get_connection()
+        try:
+            return conn.execute("""
+                SELECT metric, prompt_type, label, value FROM llm_metric_counters
+                ORDER BY metric, prompt_type, label
+            """).fetchall()
+        finally:
+            conn.close()
+
+    def render_prometheus(self):
+        """Counters and histograms in the Prometheus text exposition format"""
+        by_metric = {}
+        for row in self._counters():
+            by_metric.setdefault(row['metric'], []).append(row)
+        gauges = {}
+        for row in self._gauges():
+            gauges.setdefault(row['metric'], []).append(row)
+
+        bucket_order = {str(bound): i for i, bound in enumerate(LATENCY_BUCKETS)}
+        bucket_order['+Inf'] = len(LATENCY_BUCKETS)
+        label_names = {'llm_calls_total': 'status', 'llm_tokens_total': 'kind'}
+
+        lines = []
+        for name, (kind, help_text) in _METRIC_HELP.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == 'histogram':
+                buckets = sorted(by_metric.get(f"{name}_bucket", []),
+                                 key=lambda r: (r['prompt_type'], bucket_order.get(r['label'], 0)))
+                counts = {}
+                for row in buckets:
+                    prompt_type = _escape_label(row['prompt_type'])
+                    lines.append(f'{name}_bucket{{prompt_type="{prompt_type}",le="{row["label"]}"}} {int(row["value"])}')
+                    if row['label'] == '+Inf':
+                        counts[row['prompt_type']] = int(row['value'])
+                for row in by_metric.get(f"{name}_sum", []):
+                    prompt_type = _escape_label(row['prompt_type'])
+                    lines.append(f'{name}_sum{{prompt_type="{prompt_type}"}} {row["value"]:.6f}')
+                    lines.append(f'{name}_count{{prompt_type="{prompt_type}"}} {counts.get(row["prompt_type"], 0)}')
+                continue
+            if kind == 'gauge':
+                for row in gauges.get(name, []):
+                    lines.append(f'{name}{{endpoint="{_escape_label(row["label"])}"}} {int(row["value"])}')
+                continue
+            for row in by_metric.get(name, []):
+                labels = f'prompt_type="{_escape_label(row["prompt_type"])}"'
+                if name in label_names:
+                    labels += f',{label_names[name]}="{_escape_label(row["label"])}"'
+                lines.append(f"{name}{{{labels}}} {int(row['value'])}")
+        return "\n".join(lines) + "\n"
+
+    def latency_summary(self, hours=None):
+        """
+        Per prompt type latency percentiles over the retained samples
+
+        Args:
+            hours: Only consider calls from the last N hours
+
+        Returns:
+            dict: Success status and one entry per prompt type with count,
+                  error count, p50/p95/p99/mean in milliseconds, average
+                  tokens, and lifetime cache / JSON failure counters
+        """
+        try:
+            self.flush()
+            params = []
+            where = ''
+            if hours:
+                where = 'WHERE created_at >= ?'
+                params.append((datetime.now() - timedelta(hours=hours)).strftime("%Y-%m-%d %H:%M:%S"))
+
+            conn = db_utils.get_connection()
+            try:
+                rows = conn.execute(f"""
+                    SELECT prompt_type, duration_ms, status, prompt_tokens, completion_tokens
+                    FROM llm_call_samples {where}
+                """, params).fetchall()
+            finally:
+                conn.close()
+
+            samples = {}
+            for row in rows:
+                samples.setdefault(row['prompt_type'], []).append(row)
+
+            counters = {}
+            for row in self._counters():
+                if row['metric'] in ('llm_cache_hits_total', 'llm_cache_misses_total',
+                                     'llm_json_parse_failures_total', 'llm_retries_total'):
+                    counters.setdefault(row['prompt_type'], {})[row['metric']] = int(row['value'])
+
+            summary = []
+            for prompt_type in sorted(set(samples) | set(counters)):
+                calls = samples.get(prompt_type, [])
+                durations = sorted(r['duration_ms'] for r in calls)
+                extra = counters.get(prompt_type, {})
+                summary.append({
+                    'prompt_type': prompt_type,
+                    'count': len(calls),
+                    'errors': sum(1 for r in calls if r['status'] != 'ok'),
+                    'p50_ms': _percentile(durations, 50),
+                    'p95_ms': _percentile(durations, 95),
+                    'p99_ms': _percentile(durations, 99),
+                    'mean_ms': sum(durations) / len(durations) if durations else None,
+                    'avg_prompt_tokens': sum(r['prompt_tokens'] for r in calls) / len(calls) if calls else None,
+                    'avg_completion_tokens': sum(r['completion_tokens'] for r in calls) / len(calls) if calls else None,
+                    'retries': extra.get('llm_retries_total', 0),
+                    'cache_hits': extra.get('llm_cache_hits_total', 0),
+                    'cache_misses': extra.get('llm_cache_misses_total', 0),
+                    'json_parse_failures': extra.get('llm_json_parse_failures_total', 0),
+                })
+            return {'success': True, 'prompt_types': summary}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+
+# Global metrics instance
+llm_metrics = LLMMetrics()
@@ -0,0 +1,173 @@
+"""
+LLM Rate Limiting
+Token-bucket limiter with a priority queue, 429 backoff with jitter, and single-flight coalescing of identical calls
+"""
+
+import heapq
+import itertools
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+from llm_metrics import llm_metrics
+
+RATE_PER_SECOND = float(os.environ.get("LLM_RATE_PER_SECOND", "5"))
+BURST = int(os.environ.get("LLM_RATE_BURST", "10"))
+QUEUE_TIMEOUT_SECONDS = float(os.environ.get("LLM_QUEUE_TIMEOUT", "60"))
+MAX_RATE_LIMIT_RETRIES = int(os.environ.get("LLM_RATE_LIMIT_RETRIES", "3"))
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 30.0
+
+# Lower runs first: a candidate waiting on a score beats pre-generating the next question
+PRIORITIES = {
+    'evaluate_answer': 0,
+    'evaluate_coding': 0,
+    'hiring_recommendation': 1,
+    'llm_parse_resume': 1,
+    'gen_question': 2,
+}
+DEFAULT_PRIORITY = 1
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a call waited longer than the queue timeout for a slot"""
+
+
+def priority_for(prompt_type):
+    return PRIORITIES.get(prompt_type, DEFAULT_PRIORITY)
+
+
+def is_rate_limited(error):
+    """True for provider 429 responses (openai.RateLimitError and friends)"""
+    status = getattr(error, 'status_code', None) or getattr(getattr(error, 'response', None), 'status_code', None)
+    return status == 429
+
+
+def _retry_after(error):
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """
+    Token bucket shared by all threads in this process for one endpoint
+
+    Callers queue by (priority, arrival); only the head of the queue may take
+    a token, so a burst of question generations cannot starve evaluations.
+    A 429 pauses the whole bucket, since the provider limits the key rather
+    than the caller.
+    """
+
+    def __init__(self, name, rate=RATE_PER_SECOND, burst=BURST, queue_timeout=QUEUE_TIMEOUT_SECONDS):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.queue_timeout = queue_timeout
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def queue_depth(self):
+        with self._cond:
+            return len(self._waiters)
+
+    def _report_depth(self):
+        llm_metrics.set_gauge('llm_rate_limit_queue_depth', self.name, self.queue_depth())
+
+    def acquire(self, priority=DEFAULT_PRIORITY):
+        """Block until this caller may send a request"""
+        entry = (priority, next(self._sequence))
+        deadline = time.monotonic() + self.queue_timeout
+        with self._cond:
+            heapq.heappush(self._waiters, entry)
+        self._report_depth()
+        try:
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if self._waiters[0] == entry and now >= self._paused_until and self._tokens >= 1:
+                        heapq.heappop(self._waiters)
+                        self._tokens -= 1
+                        self._cond.notify_all()
+                        return
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._waiters.remove(entry)
+                        heapq.heapify(self._waiters)
+                        self._cond.notify_all()
+                        raise RateLimitTimeout(f"No LLM slot on {self.name} within {self.queue_timeout:g}s")
+                    if self._waiters[0] == entry:
+                        wait = max(self._paused_until - now, (1 - self._tokens) / self.rate, 0.001)
+                    else:
+                        wait = remaining  # woken when the head takes its token
+                    self._cond.wait(min(wait, remaining))
+        finally:
+            self._report_depth()
+
+    def backoff(self, error, attempt):
+        """Pause the bucket after a 429: Retry-After if given, else capped exponential with full jitter"""
+        delay = _retry_after(error)
+        if delay is None:
+            delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+        else:
+            delay += random.uniform(0, BACKOFF_BASE_SECONDS)
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            self._cond.notify_all()
+        logging.warning(f"LLM endpoint {self.name} rate limited; pausing {delay:.1f}s")
+
+    def run(self, fn, prompt_type=None):
+        """Call fn() once a slot is free, retrying on 429 up to MAX_RATE_LIMIT_RETRIES times"""
+        priority = priority_for(prompt_type)
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            self.acquire(priority)
+            try:
+                return fn()
+            except Exception as e:
+                if not is_rate_limited(e) or attempt == MAX_RATE_LIMIT_RETRIES:
+                    raise
+                llm_metrics.record_rate_limited(prompt_type or 'unknown')
+                self.backoff(e, attempt)
+
+
+class SingleFlight:
+    """Identical calls made while one is already running wait for and share its result"""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, prompt_type=None):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            llm_metrics.record_coalesced(prompt_type or 'unknown')
+            return future.result()
+
+        try:
+            result = fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
@@ -0,0 +1,179 @@
+"""
+LLM Record / Replay
+Captures real chat-completion request/response pairs to JSONL and serves them back for offline load tests
+"""
+
+import hashlib
+import json
+import logging
+import math
+import random
+import threading
+import time
+import weakref
+from datetime import datetime
+
+_SPACE = " "
+
+
+def _message_text(content):
+    if isinstance(content, str):
+        return content
+    # OpenAI content parts: [{"type": "text", "text": "..."}]
+    return _SPACE.join(part.get('text', '') for part in content or [] if isinstance(part, dict))
+
+
+def fingerprint(messages):
+    """
+    Model-independent key of a chat prompt
+
+    Whitespace is normalised so a recording still matches after cosmetic
+    template changes; the model name is left out so a recording made against
+    one provider replays for any endpoint.
+    """
+    normalised = [(m.get('role', ''), _SPACE.join(_message_text(m.get('content')).split()))
+                  for m in messages or []]
+    return hashlib.sha256(json.dumps(normalised).encode('utf-8')).hexdigest()
+
+
+def _completion_text(response_body, streamed):
+    """Assistant text and usage from a plain or server-sent-events completion body"""
+    if not streamed:
+        payload = json.loads(response_body)
+        return payload['choices'][0]['message'].get('content') or '', payload.get('usage')
+    parts = []
+    usage = None
+    for line in response_body.splitlines():
+        if not line.startswith('data:') or line.strip() == 'data: [DONE]':
+            continue
+        chunk = json.loads(line[5:])
+        usage = chunk.get('usage') or usage
+        for choice in chunk.get('choices', []):
+            parts.append((choice.get('delta') or {}).get('content') or '')
+    return ''.join(parts), usage
+
+
+class LLMRecorder:
+    """
+    Appends every chat completion made through an httpx client to a JSONL file
+
+    Attach it to the client handed to ChatOpenAI. Recording reads streamed
+    responses in full before returning them, so it is meant for capture
+    sessions, not production traffic.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._started = weakref.WeakKeyDictionary()
+
+    def attach(self, client):
+        client.event_hooks = {
+            'request': list(client.event_hooks.get('request', [])) + [self._on_request],
+            'response': list(client.event_hooks.get('response', [])) + [self._on_response],
+        }
+        return client
+
+    def _on_request(self, request):
+        self._started[request] = time.perf_counter()
+
+    def _on_response(self, response):
+        request = response.request
+        if request.method != 'POST' or not request.url.path.endswith('/chat/completions'):
+            return
+        try:
+            body = json.loads(request.content)
+            response.read()
+            latency_ms = (time.perf_counter() - self._started.get(request, time.perf_counter())) * 1000
+            content, usage = (None, None)
+            if response.status_code == 200:
+                content, usage = _completion_text(response.text, bool(body.get('stream')))
+            record = {
+                'key': fingerprint(body.get('messages')),
+                'model': body.get('model'),
+                'messages': body.get('messages'),
+                'params': {k: v for k, v in body.items() if k not in ('messages', 'model', 'stream')},
+                'status': response.status_code,
+                'content': content,
+                'usage': usage,
+                'latency_ms': round(latency_ms, 1),
+                'recorded_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except Exception as e:
+            logging.error(f"Error recording LLM exchange: {e}")
+
+
+class ReplayStore:
+    """
+    Recorded completions indexed by prompt fingerprint
+
+    An exact match replays its recording. Unknown prompts (e.g. a question
+    generated with a different history) get a recording of the same kind,
+    JSON or plain text, picked by fingerprint, so the same prompt always
+    gets the same reply.
+    """
+
+    def __init__(self, path):
+        self.by_key = {}
+        self.json_records = []
+        self.text_records = []
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record.get('status') != 200 or record.get('content') is None:
+                    continue
+                self.by_key.setdefault(record['key'], []).append(record)
+                wants_json = 'json' in json.dumps(record.get('messages', [])).lower()
+                (self.json_records if wants_json else self.text_records).append(record)
+
+    def __len__(self):
+        return sum(len(records) for records in self.by_key.values())
+
+    def lookup(self, messages):
+        """(record, exact) for a prompt, or (None, False) if nothing suitable was recorded"""
+        key = fingerprint(messages)
+        pick = int(key[:8], 16)
+        if key in self.by_key:
+            records = self.by_key[key]
+            return records[pick % len(records)], True
+        wants_json = 'json' in json.dumps(messages or []).lower()
+        pool = (self.json_records if wants_json else self.text_records) or self.json_records + self.text_records
+        if not pool:
+            return None, False
+        return pool[pick % len(pool)], False
+
+
+def latency_sampler(spec, seed=None):
+    """
+    Build a latency function (seconds) from a distribution spec
+
+    Specs: "fixed:S", "uniform:LOW,HIGH", "normal:MEAN,SD",
+    "lognormal:MEDIAN,SIGMA" and "recorded" (the recording's own latency,
+    optionally scaled: "recorded:0.5"). The sampler takes the replayed
+    record, or None.
+    """
+    rng = random.Random(seed)
+    lock = threading.Lock()
+    name, _, args = (spec or "fixed:0").partition(":")
+    values = [float(v) for v in args.split(",") if v.strip()]
+
+    def draw(fn):
+        with lock:
+            return max(0.0, fn())
+
+    if name == "fixed":
+        return lambda record=None: values[0] if values else 0.0
+    if name == "uniform":
+        return lambda record=None: draw(lambda: rng.uniform(values[0], values[1]))
+    if name == "normal":
+        return lambda record=None: draw(lambda: rng.gauss(values[0], values[1]))
+    if name == "lognormal":
+        return lambda record=None: draw(lambda: rng.lognormvariate(math.log(values[0]), values[1]))
+    if name == "recorded":
+        scale = values[0] if values else 1.0
+        return lambda record=None: (record or {}).get('latency_ms', 0) / 1000 * scale
+    raise ValueError(f"Unknown latency distribution: {spec}")
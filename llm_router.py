@@ -0,0 +1,326 @@
+"""
+LLM Router
+Picks a model endpoint per prompt type and fails over (or hedges) based on rolling latency and error rate
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+
+import httpx
+
+from llm_ratelimit import RateLimiter, SingleFlight
+from llm_replay import LLMRecorder
+
+WINDOW_SIZE = 50              # recent calls kept per endpoint
+MIN_SAMPLES = 5               # before latency/error statistics are trusted
+ERROR_RATE_LIMIT = 0.5        # endpoint is skipped above this recent error rate...
+COOLDOWN_SECONDS = 30         # ...for this long, then tried again
+HEDGE_ENABLED = os.environ.get("LLM_HEDGE", "on").lower() not in ("0", "false", "no", "off")
+HEDGE_MIN_SECONDS = float(os.environ.get("LLM_HEDGE_MIN_SECONDS", "2"))
+# Hedge no later than this even when the endpoint's p95 is higher (0 = p95 only)
+HEDGE_MAX_SECONDS = float(os.environ.get("LLM_HEDGE_MAX_SECONDS", "0"))
+# Client-level retries per endpoint; the router's failover covers the rest
+ENDPOINT_MAX_RETRIES = int(os.environ.get("LLM_ENDPOINT_RETRIES", "1"))
+# Build endpoint clients in the background after startup (see LLMRouter.warm_up)
+WARM_UP_ENABLED = os.environ.get("LLM_WARM_UP", "on").lower() not in ("0", "false", "no", "off")
+
+# Ordered endpoint preference per prompt type; 'default' covers anything unlisted
+DEFAULT_ROUTES = {
+    'gen_question': ['fast', 'reasoning'],
+    'evaluate_answer': ['fast', 'reasoning'],
+    'evaluate_coding': ['reasoning', 'fast'],
+    'llm_parse_resume': ['fast', 'reasoning'],
+    'hiring_recommendation': ['reasoning', 'fast'],
+    'default': ['reasoning', 'fast'],
+}
+
+# Calls wait for rate limiter slots on these threads, so size it for a full queue
+_call_executor = ThreadPoolExecutor(max_workers=int(os.environ.get("LLM_MAX_CONCURRENCY", "64")),
+                                     thread_name_prefix="llm-call")
+
+
+class Endpoint:
+    """One OpenAI-compatible model endpoint with a rolling window of call outcomes"""
+
+    def __init__(self, name, base_url, model, api_key, http_client=None):
+        self.name = name
+        self.model = model
+        self.base_url = base_url
+        self._api_key = api_key
+        self._http_client = http_client
+        self._chat = None
+        self._chat_lock = threading.Lock()
+        self.limiter = RateLimiter(name)
+        self._samples = deque(maxlen=WINDOW_SIZE)
+        self._lock = threading.Lock()
+        self._open_until = 0.0
+
+    @property
+    def chat(self):
+        """
+        ChatOpenAI client for this endpoint, built on the first call
+
+        Importing langchain_openai (and the openai SDK) takes over a second,
+        so processes that never call this endpoint do not pay for it.
+        """
+        if self._chat is None:
+            with self._chat_lock:
+                if self._chat is None:
+                    from langchain_openai import ChatOpenAI
+                    self._chat = ChatOpenAI(base_url=self.base_url, model=self.model, api_key=self._api_key,
+                                            http_client=self._http_client, max_retries=ENDPOINT_MAX_RETRIES)
+        return self._chat
+
+    def record(self, seconds, ok):
+        """Add a call outcome; too many recent errors take the endpoint out of rotation"""
+        with self._lock:
+            self._samples.append((seconds, ok))
+            if not ok and self.healthy() and len(self._samples) >= MIN_SAMPLES \
+                    and self._error_rate() >= ERROR_RATE_LIMIT:
+                self._open_until = time.monotonic() + COOLDOWN_SECONDS
+                logging.warning(f"LLM endpoint {self.name} disabled for {COOLDOWN_SECONDS}s (error rate too high)")
+
+    def run(self, fn, prompt_type=None):
+        """Call fn() through this endpoint's rate limiter, recording only the call itself"""
+        def measured():
+            with self.measure():
+                return fn()
+        return self.limiter.run(measured, prompt_type)
+
+    @contextmanager
+    def measure(self):
+        """Record the latency and outcome of the enclosed call"""
+        started = time.perf_counter()
+        try:
+            yield self
+        except Exception:
+            self.record(time.perf_counter() - started, False)
+            raise
+        self.record(time.perf_counter() - started, True)
+
+    def _error_rate(self):
+        if not self._samples:
+            return 0.0
+        return sum(1 for _, ok in self._samples if not ok) / len(self._samples)
+
+    def healthy(self):
+        return time.monotonic() >= self._open_until
+
+    def latency_p95(self):
+        """Rolling p95 latency of successful calls, or None without enough data"""
+        with self._lock:
+            latencies = sorted(seconds for seconds, ok in self._samples if ok)
+        if len(latencies) < MIN_SAMPLES:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+    def stats(self):
+        with self._lock:
+            samples = list(self._samples)
+            error_rate = self._error_rate()
+        return {
+            'name': self.name,
+            'model': self.model,
+            'healthy': self.healthy(),
+            'calls': len(samples),
+            'error_rate': error_rate,
+            'p95_seconds': self.latency_p95(),
+            'queue_depth': self.limiter.queue_depth(),
+        }
+
+
+def _flight_key(endpoint, messages, overrides):
+    """Identity of a call for coalescing: endpoint, parameters and full prompt"""
+    if hasattr(messages, 'to_messages'):
+        messages = messages.to_messages()
+    if isinstance(messages, list):
+        messages = [(getattr(m, 'type', ''), getattr(m, 'content', m)) for m in messages]
+    payload = json.dumps([endpoint.name, sorted(overrides.items()), messages], default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LLMRouter:
+    """
+    Routes prompt types to endpoints
+
+    Prompt templates stay provider-agnostic: chains use
+    `prompt | router.runnable('gen_question') | StrOutputParser()` and the
+    router decides which model serves the call.
+    """
+
+    def __init__(self, endpoints, routes=None):
+        self.endpoints = {endpoint.name: endpoint for endpoint in endpoints}
+        self.routes = dict(DEFAULT_ROUTES)
+        self.routes.update(routes or {})
+        self._flights = SingleFlight()
+        self._warm_up_thread = None
+
+    @classmethod
+    def from_env(cls, http_client=None):
+        """
+        Build endpoints from the environment
+
+        'reasoning' is DEEPSEEK_MODEL and 'fast' is DEEPSEEK_FAST_MODEL on
+        DEEPSEEK_BASE_URL. LLM_ENDPOINTS (JSON list of {name, base_url,
+        model, api_key_env}) adds or replaces endpoints, e.g. another
+        provider or the local stub server; LLM_ROUTES (JSON object of
+        prompt type -> endpoint names) overrides DEFAULT_ROUTES.
+        LLM_RECORD_FILE appends every completion to a JSONL file that
+        tools/llm_stub_server.py --replay can serve back.
+        """
+        base_url = os.environ.get("DEEPSEEK_BASE_URL", "https://api.deepseek.com")
+        api_key = os.environ.get("DEEPSEEK_API_KEY")
+        specs = [
+            {'name': 'reasoning', 'base_url': base_url, 'model': os.environ.get("DEEPSEEK_MODEL", "deepseek-reasoner")},
+            {'name': 'fast', 'base_url': base_url, 'model': os.environ.get("DEEPSEEK_FAST_MODEL", "deepseek-chat")},
+        ]
+        routes = {}
+        try:
+            extra = json.loads(os.environ.get("LLM_ENDPOINTS") or "[]")
+            names = {spec['name'] for spec in extra}
+            specs = [spec for spec in specs if spec['name'] not in names] + extra
+            routes = json.loads(os.environ.get("LLM_ROUTES") or "{}")
+        except (ValueError, KeyError, TypeError) as e:
+            logging.error(f"Ignoring invalid LLM_ENDPOINTS/LLM_ROUTES: {e}")
+
+        record_path = os.environ.get("LLM_RECORD_FILE")
+        if record_path:
+            http_client = LLMRecorder(record_path).attach(http_client or httpx.Client())
+            logging.warning(f"Recording LLM completions to {record_path}")
+
+        endpoints = []
+        for spec in specs:
+            key = os.environ.get(spec['api_key_env']) if spec.get('api_key_env') else api_key
+            endpoints.append(Endpoint(spec['name'], spec.get('base_url', base_url), spec['model'],
+                                      key or "not-needed", http_client=http_client))
+        return cls(endpoints, routes)
+
+    def candidates(self, prompt_type):
+        """Endpoints for a prompt type in preference order; unhealthy ones go last"""
+        names = self.routes.get(prompt_type) or self.routes['default']
+        ordered = [self.endpoints[name] for name in names if name in self.endpoints]
+        if not ordered:
+            ordered = list(self.endpoints.values())
+        return [e for e in ordered if e.healthy()] + [e for e in ordered if not e.healthy()]
+
+    def model_for(self, prompt_type):
+        """Model of the endpoint a call of this prompt type goes to first"""
+        return self.candidates(prompt_type)[0].model
+
+    def _call(self, endpoint, prompt_type, messages, config, overrides, coalesce):
+        model = endpoint.chat.bind(**overrides) if overrides else endpoint.chat
+        call = lambda: endpoint.run(lambda: model.invoke(messages, config=config), prompt_type)
+        if not coalesce:
+            return call()
+        # A cohort starting together sends many identical prompts; only one goes out
+        return self._flights.do(_flight_key(endpoint, messages, overrides), call, prompt_type)
+
+    def invoke(self, prompt_type, messages, config=None, coalesce=None, **overrides):
+        """
+        Run a chat call with failover and hedging
+
+        The first candidate is called; if it fails the next one is tried. If
+        it is still running after its own rolling p95 latency (capped by
+        LLM_HEDGE_MAX_SECONDS), one hedge request goes to the next candidate
+        and whichever succeeds first wins.
+
+        Args:
+            messages: Prompt value, message list or string
+            coalesce: Share the result of an identical call already in flight.
+                Defaults to True only for deterministic calls (temperature 0
+                or unset): sampled calls such as question generation must each
+                get their own completion
+            overrides: Model parameters such as temperature or max_tokens
+        """
+        if coalesce is None:
+            coalesce = not overrides.get('temperature')
+        endpoints = self.candidates(prompt_type)
+        pending = {}
+        next_index = 0
+        last_error = None
+        hedged = False
+
+        def launch():
+            nonlocal next_index
+            endpoint = endpoints[next_index]
+            next_index += 1
+            pending[_call_executor.submit(self._call, endpoint, prompt_type, messages, config, overrides,
+                                          coalesce)] = endpoint
+
+        launch()
+        while pending:
+            hedge_after = None
+            if HEDGE_ENABLED and not hedged and next_index < len(endpoints) and len(pending) == 1:
+                p95 = next(iter(pending.values())).latency_p95()
+                if p95 is not None:
+                    hedge_after = max(HEDGE_MIN_SECONDS, p95)
+                if HEDGE_MAX_SECONDS:
+                    hedge_after = min(hedge_after or HEDGE_MAX_SECONDS, HEDGE_MAX_SECONDS)
+
+            done, _ = wait(list(pending), timeout=hedge_after, return_when=FIRST_COMPLETED)
+            if not done:
+                logging.info(f"{prompt_type}: hedging to {endpoints[next_index].name} after {hedge_after:.1f}s")
+                hedged = True
+                launch()
+                continue
+
+            for future in done:
+                endpoint = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    last_error = e
+                    logging.warning(f"{prompt_type}: endpoint {endpoint.name} failed: {e}")
+                    continue
+                # Slower duplicates keep running in the background; their result is dropped
+                return result
+
+            if not pending and next_index < len(endpoints):
+                launch()
+
+        raise last_error
+
+    def runnable(self, prompt_type, coalesce=None, **overrides):
+        """Runnable for use in LCEL chains (prompt | runnable | parser)"""
+        from langchain_core.runnables import RunnableLambda
+        return RunnableLambda(
+            lambda value, config: self.invoke(prompt_type, value, config=config, coalesce=coalesce, **overrides),
+            name=f"llm_router:{prompt_type}"
+        )
+
+    def stats(self):
+        return [endpoint.stats() for endpoint in self.endpoints.values()]
+
+    def warm_up(self):
+        """
+        Build the endpoint clients on a daemon thread (unless LLM_WARM_UP is off)
+
+        Keeps the LangChain/OpenAI imports out of worker startup without
+        making the first LLM call of a new worker pay for them. Calling it
+        again returns the thread already started.
+
+        Returns:
+            threading.Thread or None
+        """
+        if not WARM_UP_ENABLED:
+            return None
+        if self._warm_up_thread is not None:
+            return self._warm_up_thread
+
+        def build():
+            for endpoint in self.endpoints.values():
+                try:
+                    endpoint.chat
+                except Exception as e:
+                    logging.warning(f"LLM endpoint {endpoint.name}: client setup failed: {e}")
+
+        self._warm_up_thread = threading.Thread(target=build, name="llm-warm-up", daemon=True)
+        self._warm_up_thread.start()
+        return self._warm_up_thread
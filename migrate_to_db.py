@@ -7,6 +7,7 @@ import os
 import sys
 import db_utils
 import logging
+from plagiarism import answer_index
 
 # Configure logging
 logging.basicConfig(
@@ -58,17 +59,36 @@ def main():
     
     print()
     print("Step 2: Migrating data to SQLite database...")
+    fast = '--fast' in sys.argv
     try:
-        migrated = db_utils.migrate_from_json()
-        print("✓ Migration completed successfully!")
+        # --fast turns the rollback journal and fsync off; a failure then needs the database backup restored
+        migrated = db_utils.migrate_from_json(fast=fast)
+        if migrated['backup']:
+            print(f"  - Database backed up to: {migrated['backup']}")
         print(f"  - Users migrated: {migrated['users']}")
         print(f"  - Evaluations migrated: {migrated['evaluations']}")
         print(f"  - Feedback entries migrated: {migrated['feedback']}")
+        print(f"  - Time taken: {migrated['seconds']}s")
+        if not migrated['verified']:
+            print("✗ Row counts do not match the JSON files. Please check the logs and backup files.")
+            return
+        print("✓ Migration completed and verified successfully!")
     except Exception as e:
         print(f"✗ Error during migration: {e}")
         print("Please check the logs and backup files.")
+        if fast:
+            print("Restore the database backup above before running this script again.")
+        else:
+            print("Running this script again resumes from the last completed batch.")
         return
     
+    if 'evaluation_history.json' in existing_files:
+        print()
+        print("Step 3: Rebuilding the answer similarity index...")
+        # The import replaced the evaluations and cleared their answer signatures
+        indexed = answer_index.rebuild()
+        print(f"✓ Indexed answers of {indexed} evaluation(s)")
+    
     print()
     print("=" * 60)
     print("Migration Summary:")
@@ -0,0 +1,295 @@
+"""
+Answer Similarity Index
+Flags near-duplicate candidate answers with MinHash signatures and LSH banding
+"""
+
+import hashlib
+import json
+import logging
+import random
+import re
+import struct
+import threading
+from datetime import datetime
+
+import db_utils
+
+# Signature layout: NUM_BANDS bands of ROWS_PER_BAND hashes. Two answers with
+# Jaccard similarity s share at least one band with probability
+# 1 - (1 - s^ROWS_PER_BAND)^NUM_BANDS (~0.5 threshold for 16 x 4).
+NUM_PERM = 64
+NUM_BANDS = 16
+ROWS_PER_BAND = NUM_PERM // NUM_BANDS
+SHINGLE_SIZE = 3            # words per shingle
+MIN_ANSWER_WORDS = 12       # shorter answers ("I don't know") are not indexed
+SIMILARITY_THRESHOLD = 0.6  # estimated Jaccard at which a match is reported
+MAX_MATCHES = 10
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Fixed seed: signatures stored in the database must stay comparable across restarts
+_rng = random.Random(1_000_003)
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+                 for _ in range(NUM_PERM)]
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize_answer(text):
+    """Lowercase and reduce an answer to its alphanumeric word tokens"""
+    return _WORD_RE.findall((text or "").lower())
+
+
+def shingles(words, size=SHINGLE_SIZE):
+    """Set of overlapping word n-grams"""
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _shingle_hash(shingle):
+    return struct.unpack("<I", hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest())[0]
+
+
+def minhash(shingle_set):
+    """MinHash signature (NUM_PERM 32-bit values) of a shingle set"""
+    hashes = [_shingle_hash(s) for s in shingle_set]
+    return [min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+            for a, b in _PERMUTATIONS]
+
+
+def band_keys(signature):
+    """One signed 64-bit bucket key per band (fits an SQLite INTEGER)"""
+    keys = []
+    for band in range(NUM_BANDS):
+        chunk = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(struct.pack(f"<{ROWS_PER_BAND}I", *chunk), digest_size=8).digest()
+        keys.append(struct.unpack("<q", digest)[0])
+    return keys
+
+
+def estimate_similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity: share of equal MinHash values"""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+def _pack(signature):
+    return struct.pack(f"<{NUM_PERM}I", *signature)
+
+
+def _unpack(blob):
+    return list(struct.unpack(f"<{NUM_PERM}I", blob))
+
+
+def _answer_text(qa):
+    # Streamlit stores q/a, the Flask app question/answer
+    return qa.get('a', qa.get('answer', '')) or ''
+
+
+class AnswerSimilarityIndex:
+    """
+    Persistent MinHash/LSH index of candidate answers in evaluation_system.db
+
+    Each indexed answer stores its signature once and one (band, bucket) row
+    per band. A lookup is NUM_BANDS primary-key probes plus a signature
+    comparison for the few candidates that share a bucket, so the cost does
+    not grow with the number of indexed answers.
+    """
+
+    def __init__(self, threshold=SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+        self._lock = threading.Lock()
+
+    def signature_for(self, text):
+        """MinHash signature for an answer, or None if it is too short to compare"""
+        words = normalize_answer(text)
+        if len(words) < MIN_ANSWER_WORDS:
+            return None
+        return minhash(shingles(words))
+
+    def _find_similar(self, conn, signature, exclude_username=None, exclude_evaluation_id=None,
+                      limit=MAX_MATCHES):
+        keys = band_keys(signature)
+        probes = " OR ".join(["(l.band = ? AND l.bucket = ?)"] * NUM_BANDS)
+        params = [value for band, key in enumerate(keys) for value in (band, key)]
+        rows = conn.execute(f"""
+            SELECT DISTINCT s.id, s.evaluation_id, s.question_index, s.username, s.signature
+            FROM answer_lsh l
+            JOIN answer_signatures s ON s.id = l.answer_id
+            WHERE {probes}
+        """, params).fetchall()
+
+        matches = []
+        for row in rows:
+            if exclude_username and row['username'] == exclude_username:
+                continue
+            if exclude_evaluation_id and row['evaluation_id'] == exclude_evaluation_id:
+                continue
+            similarity = estimate_similarity(signature, _unpack(row['signature']))
+            if similarity >= self.threshold:
+                matches.append({
+                    'answer_id': row['id'],
+                    'evaluation_id': row['evaluation_id'],
+                    'question_index': row['question_index'],
+                    'username': row['username'],
+                    'similarity': round(similarity, 3)
+                })
+        matches.sort(key=lambda m: m['similarity'], reverse=True)
+        return matches[:limit]
+
+    def find_similar(self, text, exclude_username=None, limit=MAX_MATCHES):
+        """Look up prior answers similar to text without indexing it"""
+        signature = self.signature_for(text)
+        if signature is None:
+            return []
+        conn = db_utils.get_connection()
+        try:
+            return self._find_similar(conn, signature, exclude_username=exclude_username, limit=limit)
+        finally:
+            conn.close()
+
+    def index_evaluation(self, evaluation_id, username, qa_history):
+        """
+        Index every answer of a saved evaluation and record matches against prior answers
+
+        Answers by the same candidate are not reported as matches.
+
+        Returns:
+            dict: success and matches keyed by question index
+        """
+        if evaluation_id is None:
+            return {'success': False, 'error': 'Evaluation was not saved'}
+
+        # Signatures are computed outside the write transaction
+        pending = []
+        for idx, qa in enumerate(qa_history or []):
+            if isinstance(qa, dict):
+                signature = self.signature_for(_answer_text(qa))
+                if signature is not None:
+                    pending.append((idx, signature))
+        if not pending:
+            return {'success': True, 'matches': {}}
+
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        found = {}
+        with self._lock:
+            conn = db_utils.get_connection()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                for idx, signature in pending:
+                    matches = self._find_similar(conn, signature, exclude_username=username,
+                                                 exclude_evaluation_id=evaluation_id)
+                    cursor = conn.execute("""
+                        INSERT OR REPLACE INTO answer_signatures
+                        (evaluation_id, question_index, username, signature, created_at)
+                        VALUES (?, ?, ?, ?, ?)
+                    """, (evaluation_id, idx, username, _pack(signature), now))
+                    answer_id = cursor.lastrowid
+                    conn.executemany("""
+                        INSERT OR IGNORE INTO answer_lsh (band, bucket, answer_id) VALUES (?, ?, ?)
+                    """, [(band, key, answer_id) for band, key in enumerate(band_keys(signature))])
+                    if matches:
+                        conn.executemany("""
+                            INSERT OR REPLACE INTO answer_matches
+                            (answer_id, matched_answer_id, similarity, created_at)
+                            VALUES (?, ?, ?, ?)
+                        """, [(answer_id, m['answer_id'], m['similarity'], now) for m in matches])
+                        found[idx] = matches
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logging.error(f"Error indexing answers for evaluation {evaluation_id}: {e}")
+                return {'success': False, 'error': str(e)}
+            finally:
+                conn.close()
+
+        if found:
+            logging.info(f"Evaluation {evaluation_id}: {len(found)} answer(s) similar to other candidates")
+        return {'success': True, 'matches': found}
+
+    def _match_rows(self, where, params, limit):
+        conn = db_utils.get_connection()
+        try:
+            rows = conn.execute(f"""
+                SELECT m.similarity, m.created_at,
+                       a.id AS answer_id, a.evaluation_id, a.question_index, a.username,
+                       b.id AS matched_answer_id, b.evaluation_id AS matched_evaluation_id,
+                       b.question_index AS matched_question_index, b.username AS matched_username
+                FROM answer_matches m
+                JOIN answer_signatures a ON a.id = m.answer_id
+                JOIN answer_signatures b ON b.id = m.matched_answer_id
+                {where}
+                ORDER BY m.created_at DESC, m.answer_id DESC, m.matched_answer_id DESC
+                LIMIT ?
+            """, (*params, limit)).fetchall()
+            return [dict(row) for row in rows]
+        finally:
+            conn.close()
+
+    def get_matches_for_evaluation(self, evaluation_id, limit=100):
+        """Recorded matches for the answers of one evaluation"""
+        return self._match_rows("WHERE a.evaluation_id = ?", (evaluation_id,), limit)
+
+    def get_matches_for_user(self, username, since=None, limit=100):
+        """Recorded matches for a candidate's answers, optionally since a timestamp"""
+        if since:
+            return self._match_rows("WHERE a.username = ? AND m.created_at >= ?",
+                                    (username, since.replace('T', ' ')[:19]), limit)
+        return self._match_rows("WHERE a.username = ?", (username,), limit)
+
+    def get_recent_matches(self, limit=50, cursor=None):
+        """Most recently recorded matches across all candidates, one page at a time"""
+        limit = max(1, min(int(limit or 50), 200))
+        where, params = "", ()
+        if cursor:
+            try:
+                created_at, (answer_id, matched_id) = db_utils._decode_cursor(cursor)
+            except (db_utils.InvalidCursor, TypeError, ValueError):
+                return {'success': False, 'error': 'Invalid cursor'}
+            if not (isinstance(created_at, str) and isinstance(answer_id, int) and isinstance(matched_id, int)):
+                return {'success': False, 'error': 'Invalid cursor'}
+            where = "WHERE (m.created_at, m.answer_id, m.matched_answer_id) < (?, ?, ?)"
+            params = (created_at, answer_id, matched_id)
+        rows = self._match_rows(where, params, limit + 1)
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = db_utils._encode_cursor(last['created_at'], [last['answer_id'], last['matched_answer_id']])
+        return {'success': True, 'matches': rows, 'next_cursor': next_cursor}
+
+    def rebuild(self, batch_size=500):
+        """Re-index every stored evaluation in id order (e.g. after save_eval_history)"""
+        conn = db_utils.get_connection()
+        try:
+            conn.execute("DELETE FROM answer_matches")
+            conn.execute("DELETE FROM answer_lsh")
+            conn.execute("DELETE FROM answer_signatures")
+            conn.commit()
+        finally:
+            conn.close()
+
+        # Short keyset reads so indexing writes are never blocked by an open read
+        indexed, last_id = 0, 0
+        while True:
+            conn = db_utils.get_connection()
+            try:
+                rows = conn.execute("""
+                    SELECT id, username, qa_history FROM evaluations WHERE id > ? ORDER BY id LIMIT ?
+                """, (last_id, batch_size)).fetchall()
+            finally:
+                conn.close()
+            if not rows:
+                return indexed
+            for row in rows:
+                last_id = row['id']
+                try:
+                    qa_history = json.loads(row['qa_history']) if row['qa_history'] else []
+                except ValueError:
+                    continue
+                self.index_evaluation(row['id'], row['username'], qa_history)
+                indexed += 1
+
+# Global similarity index instance
+answer_index = AnswerSimilarityIndex()
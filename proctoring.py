@@ -6,6 +6,8 @@ Monitors candidate behavior during evaluations
 from datetime import datetime
 import json
 
+from plagiarism import answer_index
+
 class VideoProctoring:
     """
     Video proctoring system to monitor candidates during evaluations
@@ -254,6 +256,7 @@ class VideoProctoring:
                 'copy_paste_attempts': session['copy_paste_attempts'],
                 'suspicious_activity_score': session['suspicious_activity_score']
             },
+            'answer_similarity': self._get_answer_similarity(session),
             'assessment': {
                 'risk_level': self._calculate_risk_level(session['suspicious_activity_score']),
                 'recommendation': self._get_recommendation(session['suspicious_activity_score']),
@@ -267,6 +270,23 @@ class VideoProctoring:
             'report': report
         }
     
+    def _get_answer_similarity(self, session):
+        """Answers from this session that closely match other candidates' answers"""
+        try:
+            evaluation_id = session['evaluation_id']
+            if isinstance(evaluation_id, int) or str(evaluation_id).isdigit():
+                matches = answer_index.get_matches_for_evaluation(int(evaluation_id))
+            else:
+                matches = answer_index.get_matches_for_user(session['username'], since=session['start_time'])
+        except Exception:
+            matches = []
+        
+        return {
+            'flagged_answers': len({m['answer_id'] for m in matches}),
+            'max_similarity': max((m['similarity'] for m in matches), default=0),
+            'matches': matches
+        }
+    
     def _group_violations_by_type(self, violations):
         """Group violations by type"""
         grouped = {}
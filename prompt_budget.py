@@ -0,0 +1,126 @@
+"""
+Prompt Budget
+Keeps long prompt fields (asked questions, resume text, candidate answers) within a token budget
+"""
+
+import logging
+import os
+import re
+import threading
+
+from llm_metrics import llm_metrics
+
+MAX_ASKED_QUESTIONS = int(os.environ.get("PROMPT_MAX_ASKED_QUESTIONS", "4"))
+MAX_QUESTION_TOKENS = int(os.environ.get("PROMPT_MAX_QUESTION_TOKENS", "60"))
+MAX_RESUME_TOKENS = int(os.environ.get("PROMPT_MAX_RESUME_TOKENS", "2500"))
+MAX_ANSWER_TOKENS = int(os.environ.get("PROMPT_MAX_ANSWER_TOKENS", "1500"))
+# "tiktoken" counts with cl100k_base (its encoding file must be available locally);
+# the default is a chars/4 estimate, which is close enough for budgeting
+TOKENIZER = os.environ.get("PROMPT_TOKENIZER", "estimate").lower()
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+_BLANK_LINES_RE = re.compile(r"\n\s*\n(\s*\n)+")
+_SPACE_RE = re.compile(r"\s+")
+
+# Resume lines that carry no information for parsing
+_RESUME_BOILERPLATE = [re.compile(p, re.I) for p in (
+    r"^(references|referees)\b.*(available|upon request|on request)",
+    r"^page \d+( of \d+)?$",
+    r"^(curriculum vitae|resume|r[ée]sum[ée]|cv)$",
+    r"^(i hereby declare|declaration\b).*",
+    r"^(date|place)\s*[:\-].*$",
+    r"^[\W_]+$",
+)]
+
+
+def _tiktoken_encoding():
+    global _encoding
+    with _encoding_lock:
+        if _encoding is None:
+            try:
+                import tiktoken
+                _encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                logging.warning(f"tiktoken unavailable, estimating prompt tokens instead: {e}")
+                _encoding = False
+    return _encoding
+
+
+def count_tokens(text):
+    """Token count of text (exact with PROMPT_TOKENIZER=tiktoken, otherwise estimated)"""
+    if not text:
+        return 0
+    if TOKENIZER == "tiktoken":
+        encoding = _tiktoken_encoding()
+        if encoding:
+            return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def truncate_tokens(text, max_tokens, keep_tail=True):
+    """
+    Cut text to about max_tokens
+
+    With keep_tail the end is kept as well as the start (conclusions of
+    answers and the bottom of code often matter), joined by an omission marker.
+    """
+    if count_tokens(text) <= max_tokens:
+        return text
+    # Both counters are ~4 characters per token, so cut by characters
+    budget = max_tokens * 4
+    if not keep_tail:
+        return text[:budget].rstrip() + "\n[... truncated ...]"
+    head = text[:budget * 2 // 3].rstrip()
+    tail = text[-(budget // 3):].lstrip()
+    omitted = count_tokens(text) - count_tokens(head) - count_tokens(tail)
+    return f"{head}\n[... {omitted} tokens omitted ...]\n{tail}"
+
+
+def compact_code(code):
+    """
+    Drop trailing whitespace and runs of blank lines
+
+    Spaces and tabs inside a line are left alone: they may sit in a string
+    literal, and the evaluator has to score the code the candidate wrote.
+    """
+    lines = [line.rstrip() for line in (code or "").splitlines()]
+    return _BLANK_LINES_RE.sub("\n\n", "\n".join(lines)).strip("\n")
+
+
+def compact_answer(answer, is_coding=False, max_tokens=MAX_ANSWER_TOKENS):
+    """Candidate answer ready for the evaluator prompt"""
+    text = compact_code(answer) if is_coding else _SPACE_RE.sub(" ", answer or "").strip()
+    return truncate_tokens(text, max_tokens)
+
+
+def compact_resume(text, max_tokens=MAX_RESUME_TOKENS):
+    """Resume text without boilerplate lines, repeated lines and extra whitespace"""
+    seen = set()
+    kept = []
+    for line in (text or "").splitlines():
+        line = _SPACE_RE.sub(" ", line).strip()
+        key = line.lower()
+        if not line or key in seen or any(p.search(line) for p in _RESUME_BOILERPLATE):
+            continue
+        seen.add(key)
+        kept.append(line)
+    # Name, contact details and the skills summary are usually near the top
+    return truncate_tokens("\n".join(kept), max_tokens, keep_tail=False)
+
+
+def recent_questions(questions, max_questions=MAX_ASKED_QUESTIONS, max_tokens=MAX_QUESTION_TOKENS):
+    """The most recently asked questions, each cut to max_tokens"""
+    recent = list(questions or [])[-max_questions:] if max_questions else []
+    return [truncate_tokens(_SPACE_RE.sub(" ", q).strip(), max_tokens, keep_tail=False) for q in recent]
+
+
+def log_savings(prompt_type, original, compacted):
+    """Log and count the bytes removed from a prompt field"""
+    before = len((original or "").encode("utf-8"))
+    saved = before - len((compacted or "").encode("utf-8"))
+    if saved > 0:
+        logging.info(f"{prompt_type}: prompt compacted by {saved} bytes ({before} -> {before - saved})")
+        llm_metrics.record_bytes_saved(prompt_type, saved)
+    return saved
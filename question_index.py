@@ -0,0 +1,131 @@
+"""
+Question Similarity Index
+Character n-gram vectors for spotting repeated interview questions without an LLM call
+"""
+
+import math
+import re
+import threading
+import zlib
+from collections import Counter, OrderedDict, deque
+
+NGRAM_SIZE = 3
+DUPLICATE_THRESHOLD = 0.6     # same session: reject candidates at or above this cosine
+REPEAT_THRESHOLD = 0.9        # across sessions: only near-verbatim repeats are rejected
+MAX_QUESTIONS_PER_SCOPE = 200
+MAX_SCOPES = 256
+
+_SPACE_RE = re.compile(r"\s+")
+_PUNCT_RE = re.compile(r"[^\w\s]")
+
+
+def vectorize(text):
+    """L2-normalised sparse vector of hashed character trigrams"""
+    norm = _SPACE_RE.sub(" ", _PUNCT_RE.sub(" ", (text or "").lower())).strip()
+    padded = f" {norm} "
+    counts = Counter(zlib.crc32(padded[i:i + NGRAM_SIZE].encode("utf-8"))
+                     for i in range(len(padded) - NGRAM_SIZE + 1))
+    length = math.sqrt(sum(c * c for c in counts.values()))
+    if not length:
+        return {}
+    return {key: count / length for key, count in counts.items()}
+
+
+def cosine(vec_a, vec_b):
+    """Cosine similarity of two normalised sparse vectors"""
+    if len(vec_a) > len(vec_b):
+        vec_a, vec_b = vec_b, vec_a
+    return sum(weight * vec_b.get(key, 0.0) for key, weight in vec_a.items())
+
+
+class QuestionIndex:
+    """Bounded collection of question vectors with a nearest-neighbour lookup"""
+
+    def __init__(self, questions=None, max_size=MAX_QUESTIONS_PER_SCOPE):
+        self._entries = deque(maxlen=max_size)
+        self._lock = threading.Lock()
+        for question in questions or []:
+            self.add(question)
+
+    def add(self, question):
+        """Add a question to the index"""
+        vector = vectorize(question)
+        if vector:
+            with self._lock:
+                self._entries.append((question, vector))
+
+    def nearest(self, question):
+        """Return (similarity, closest question), or (0.0, None) if the index is empty"""
+        vector = vectorize(question)
+        best = (0.0, None)
+        with self._lock:
+            entries = list(self._entries)
+        for text, other in entries:
+            similarity = cosine(vector, other)
+            if similarity > best[0]:
+                best = (similarity, text)
+        return best
+
+    def is_duplicate(self, question, threshold=DUPLICATE_THRESHOLD):
+        """True if the index already holds a question at least this similar"""
+        return self.nearest(question)[0] >= threshold
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_scopes = OrderedDict()
+_scopes_lock = threading.Lock()
+
+
+def scope_key(role, skills):
+    """Index scope: role plus the candidate's skill set (order-insensitive)"""
+    return (role or "").strip().lower(), tuple(sorted({s.strip().lower() for s in skills or [] if s}))
+
+
+def get_index(role, skills):
+    """Shared index of questions recently asked for a role/skill combination"""
+    key = scope_key(role, skills)
+    with _scopes_lock:
+        index = _scopes.get(key)
+        if index is None:
+            index = _scopes[key] = QuestionIndex()
+            while len(_scopes) > MAX_SCOPES:
+                _scopes.popitem(last=False)
+        else:
+            _scopes.move_to_end(key)
+        return index
+
+
+def choose_question(generate, session_index, scope_index, attempts, on_reject=None):
+    """
+    Ask generate(rejected) for up to `attempts` (question, is_coding) candidates
+
+    A candidate is rejected if it is close to a question of this session
+    (DUPLICATE_THRESHOLD) or a near-verbatim repeat of one recently asked in
+    its scope (REPEAT_THRESHOLD). Rejected questions are added to
+    session_index and passed to the next generate call.
+
+    Returns:
+        tuple: The first new candidate; once attempts run out, the candidate
+               least similar to both indexes unless even that is a
+               near-verbatim repeat of either; None if there is none
+    """
+    rejected = []
+    best, best_similarity = None, 1.0
+    for _ in range(attempts):
+        candidate = generate(rejected)
+        question = candidate[0]
+        similarity = session_index.nearest(question)[0]
+        repeat = scope_index.nearest(question)[0]
+        if similarity < DUPLICATE_THRESHOLD and repeat < REPEAT_THRESHOLD:
+            return candidate
+        # Ranked by the worse of the two, so a cross-session repeat never wins the fallback
+        worst = max(similarity, repeat)
+        if worst < best_similarity:
+            best, best_similarity = candidate, worst
+        rejected.append(question)
+        session_index.add(question)
+        if on_reject:
+            on_reject(question)
+    return best if best_similarity < REPEAT_THRESHOLD else None
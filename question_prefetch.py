@@ -0,0 +1,76 @@
+"""
+Question Prefetch Scheduler
+Generates upcoming interview questions in background threads so the next one is ready on submit
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+PREFETCH_WORKERS = int(os.environ.get("QUESTION_PREFETCH_WORKERS", "8"))
+PREFETCH_ALL = os.environ.get("QUESTION_PREFETCH_ALL", "").lower() in ("1", "true", "yes", "on")
+PREFETCH_TIMEOUT_SECONDS = float(os.environ.get("QUESTION_PREFETCH_TIMEOUT", "60"))
+
+# Shared by every session in the process; LLM calls are I/O bound
+_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="question-prefetch")
+
+
+class QuestionPrefetcher:
+    """
+    Per-interview set of in-flight question generations, keyed by question number
+
+    The generator is called as generate(question_num, asked_questions) in a
+    worker thread and must not touch Streamlit state; everything it needs is
+    passed in when the job is scheduled.
+    """
+
+    def __init__(self, generate):
+        self._generate = generate
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def schedule(self, question_num, asked_questions):
+        """Start generating a question unless one is already pending for that number"""
+        with self._lock:
+            if question_num in self._futures:
+                return False
+            self._futures[question_num] = _executor.submit(self._generate, question_num, list(asked_questions))
+            return True
+
+    def schedule_all(self, question_nums, asked_questions):
+        """Start generating several questions in parallel"""
+        for question_num in question_nums:
+            self.schedule(question_num, asked_questions)
+
+    def is_ready(self, question_num):
+        with self._lock:
+            future = self._futures.get(question_num)
+        return future is not None and future.done()
+
+    def take(self, question_num, timeout=PREFETCH_TIMEOUT_SECONDS):
+        """
+        Return the prefetched (question, is_coding) for a question number
+
+        Waits for an in-flight job up to timeout. Returns None if nothing was
+        scheduled or the job failed, so the caller can generate synchronously.
+        """
+        with self._lock:
+            future = self._futures.pop(question_num, None)
+        if future is None:
+            return None
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            logging.warning(f"Prefetch for question {question_num} timed out")
+        except Exception as e:
+            logging.error(f"Prefetch for question {question_num} failed: {e}")
+        return None
+
+    def cancel_all(self):
+        """Drop all pending jobs (running ones finish but their results are discarded)"""
+        with self._lock:
+            futures, self._futures = self._futures, {}
+        for future in futures.values():
+            future.cancel()
@@ -0,0 +1,114 @@
+"""
+Resume Parse Cache
+Caches extracted resume text and parse results keyed by file content hash
+"""
+
+import copy
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+# Cache bounds (override via environment)
+MAX_ENTRIES = int(os.environ.get("RESUME_CACHE_MAX_ENTRIES", "256"))
+MAX_BYTES = int(os.environ.get("RESUME_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+
+def content_hash(data):
+    """Return the SHA-256 hex digest of resume bytes (or text)"""
+    if isinstance(data, str):
+        data = data.encode('utf-8', errors='ignore')
+    return hashlib.sha256(data or b"").hexdigest()
+
+
+def file_key(file_bytes, filename):
+    """Cache key for a resume file: content hash plus extension (extraction depends on both)"""
+    ext = os.path.splitext((filename or "").lower())[1]
+    return f"{content_hash(file_bytes)}{ext}"
+
+
+def _estimate_size(value):
+    """Rough in-memory size of a cached value in bytes"""
+    if isinstance(value, (bytes, str)):
+        return len(value)
+    try:
+        return len(json.dumps(value, default=str))
+    except Exception:
+        return 1024
+
+
+class ResumeCache:
+    """
+    Size-bounded LRU cache for resume text and parse results.
+    Entries are grouped by namespace ('text', 'heuristic', 'enhanced', 'llm')
+    and evicted least-recently-used first once either bound is exceeded.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, namespace, key):
+        """Return a copy of the cached value, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((namespace, key))
+            self.hits += 1
+            value = entry[0]
+        return copy.deepcopy(value)
+
+    def set(self, namespace, key, value):
+        """Store a value, evicting old entries to stay within bounds"""
+        size = _estimate_size(value)
+        if size > self.max_bytes:
+            return
+        value = copy.deepcopy(value)
+        with self._lock:
+            old = self._entries.pop((namespace, key), None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[(namespace, key)] = (value, size)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def get_or_compute(self, namespace, key, compute):
+        """Return the cached value for key, computing and storing it on a miss"""
+        cached = self.get(namespace, key)
+        if cached is not None:
+            return cached
+        value = compute()
+        if value:
+            self.set(namespace, key, value)
+        return value
+
+    def clear(self):
+        """Drop all cached entries"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Get cache statistics"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes
+            }
+
+# Global cache instance
+resume_cache = ResumeCache()
@@ -5,17 +5,169 @@ Extracts comprehensive information from resumes
 
 import re
 import io
+import os
+import importlib
 from datetime import datetime
 
-try:
-    import PyPDF2
-except:
-    PyPDF2 = None
+from resume_cache import resume_cache, file_key
 
-try:
-    import docx
-except:
-    docx = None
+# PyPDF2 and python-docx take ~100ms to import together; load them on the first upload that needs them
+_optional_modules = {}
+
+def _optional_import(name):
+    """Import an optional dependency on first use; None if it is not installed"""
+    if name not in _optional_modules:
+        try:
+            _optional_modules[name] = importlib.import_module(name)
+        except Exception:
+            _optional_modules[name] = None
+    return _optional_modules[name]
+
+# Upload limits (override via environment)
+MAX_RESUME_BYTES = int(float(os.environ.get("RESUME_MAX_UPLOAD_MB", "5")) * 1024 * 1024)
+MAX_RESUME_PAGES = int(os.environ.get("RESUME_MAX_PAGES", "10"))
+MAX_RESUME_CHARS = int(os.environ.get("RESUME_MAX_CHARS", "50000"))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+class ResumeUploadError(Exception):
+    """Raised when an uploaded resume is too large or of an unsupported type"""
+    pass
+
+def read_upload(stream, max_bytes=MAX_RESUME_BYTES, chunk_size=UPLOAD_CHUNK_SIZE):
+    """
+    Read an upload stream in chunks, refusing anything over max_bytes
+    
+    Args:
+        stream: File-like object (e.g. werkzeug FileStorage.stream)
+        max_bytes: Maximum accepted size in bytes
+        chunk_size: Read size per iteration
+        
+    Returns:
+        bytes: File content
+    """
+    chunks = []
+    total = 0
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        total += len(chunk)
+        if total > max_bytes:
+            raise ResumeUploadError(
+                f'Resume exceeds the {max_bytes // (1024 * 1024)} MB upload limit'
+            )
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+def detect_file_type(file_bytes, filename=""):
+    """
+    Detect resume type from magic bytes, falling back to the extension
+    
+    Returns:
+        str: 'pdf', 'docx', 'txt' or 'unknown'
+    """
+    head = file_bytes[:8]
+    if head.startswith(b'%PDF-'):
+        return 'pdf'
+    if head.startswith(b'PK\x03\x04'):
+        # DOCX is a zip container
+        return 'docx'
+    if head.startswith(b'\xd0\xcf\x11\xe0'):
+        # Legacy OLE2 (.doc) is not supported
+        return 'unknown'
+    sample = file_bytes[:4096]
+    if b'\x00' in sample:
+        return 'unknown'
+    try:
+        sample.decode('utf-8')
+        return 'txt'
+    except UnicodeDecodeError as e:
+        # Tolerate a multi-byte character cut off at the sample boundary
+        if e.start >= len(sample) - 3:
+            return 'txt'
+    fname = (filename or "").lower()
+    return 'txt' if fname.endswith('.txt') else 'unknown'
+
+def _iter_pdf_pages(file_bytes, max_pages):
+    """Yield page text lazily, never touching pages beyond max_pages"""
+    reader = _optional_import('PyPDF2').PdfReader(io.BytesIO(file_bytes))
+    for index, page in enumerate(reader.pages):
+        if index >= max_pages:
+            break
+        try:
+            yield page.extract_text() or ""
+        except Exception:
+            continue
+
+def extract_text(file_bytes, filename="", max_pages=MAX_RESUME_PAGES, max_chars=MAX_RESUME_CHARS):
+    """
+    Extract text from PDF, DOCX, or TXT bytes within page and size limits
+    
+    Args:
+        file_bytes: Resume file content
+        filename: Original filename (only used as a type hint)
+        max_pages: Maximum number of PDF pages to read
+        max_chars: Maximum number of characters to return
+        
+    Returns:
+        str: Extracted text ('' for unsupported or unreadable files)
+    """
+    file_type = detect_file_type(file_bytes, filename)
+    text = ""
+    
+    if file_type == 'pdf' and _optional_import('PyPDF2'):
+        pages = []
+        length = 0
+        try:
+            for page_text in _iter_pdf_pages(file_bytes, max_pages):
+                pages.append(page_text)
+                length += len(page_text)
+                if length >= max_chars:
+                    break
+        except Exception:
+            pass
+        text = "\n".join(pages)
+    elif file_type == 'docx' and _optional_import('docx'):
+        try:
+            doc = _optional_import('docx').Document(io.BytesIO(file_bytes))
+            paragraphs = []
+            length = 0
+            for p in doc.paragraphs:
+                paragraphs.append(p.text)
+                length += len(p.text) + 1
+                if length >= max_chars:
+                    break
+            text = "\n".join(paragraphs)
+        except Exception:
+            text = ""
+    elif file_type == 'txt':
+        # Decode only as much as could end up in the result
+        text = file_bytes[:max_chars * 4].decode('utf-8', errors='ignore')
+    
+    return text[:max_chars]
+
+_EMAIL_RE = re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}")
+# Permissive on purpose; matches with fewer than 7 digits (years, small numbers) are kept
+_PHONE_LIKE_RE = re.compile(r"[\d\+\(\)\.\-\s]{7,}")
+_NON_DIGIT_RE = re.compile(r"\D")
+
+def _phone_repl(match):
+    s = match.group(0)
+    if len(_NON_DIGIT_RE.sub("", s)) >= 7:
+        return "[PHONE]"
+    return s
+
+def mask_pii(text):
+    """
+    Mask common PII in free text before sending it to an external LLM
+    
+    Replaces email addresses with [EMAIL] and phone-like sequences (7+ digits,
+    allowing separators) with [PHONE]. Keeps other text intact.
+    """
+    if not text:
+        return text
+    masked = _EMAIL_RE.sub("[EMAIL]", text)
+    return _PHONE_LIKE_RE.sub(_phone_repl, masked)
 
 # Skill keywords database
 SKILL_KEYWORDS = {
@@ -60,8 +212,17 @@ class EnhancedResumeParser:
         Returns:
             dict: Extracted resume data
         """
-        # Extract text from file
-        self.text = self._extract_text(file_bytes, filename)
+        # Repeated uploads of the same file are served from the cache
+        key = file_key(file_bytes, filename)
+        cached = resume_cache.get('enhanced', key)
+        if cached is not None:
+            self.extracted_data = cached
+            return cached
+        
+        # Extract text from file (shared with eval.extract_resume_text)
+        self.text = resume_cache.get_or_compute(
+            'text', key, lambda: self._extract_text(file_bytes, filename)
+        ) or ""
         
         # Extract various fields
         self.extracted_data = {
@@ -78,38 +239,12 @@ class EnhancedResumeParser:
             'raw_text': self.text[:500]  # First 500 chars for preview
         }
         
+        resume_cache.set('enhanced', key, self.extracted_data)
         return self.extracted_data
     
     def _extract_text(self, file_bytes, filename):
-        """Extract text from PDF, DOCX, or TXT file"""
-        text = ""
-        fname = (filename or "").lower()
-        
-        try:
-            if fname.endswith('.pdf') and PyPDF2:
-                try:
-                    reader = PyPDF2.PdfReader(io.BytesIO(file_bytes))
-                    pages = []
-                    for p in reader.pages:
-                        try:
-                            pages.append(p.extract_text() or "")
-                        except:
-                            continue
-                    text = "\n".join(pages)
-                except:
-                    text = file_bytes.decode('utf-8', errors='ignore')
-            elif fname.endswith('.docx') and docx:
-                try:
-                    doc = docx.Document(io.BytesIO(file_bytes))
-                    text = "\n".join([p.text for p in doc.paragraphs])
-                except:
-                    text = file_bytes.decode('utf-8', errors='ignore')
-            else:
-                text = file_bytes.decode('utf-8', errors='ignore')
-        except:
-            text = file_bytes.decode('utf-8', errors='ignore')
-        
-        return text
+        """Extract text from PDF, DOCX, or TXT file within the page and size limits"""
+        return extract_text(file_bytes, filename)
     
     def _extract_name(self):
         """Extract candidate name from resume"""
@@ -0,0 +1,262 @@
+"""
+Schema Migrations
+Versioned schema upgrades for the SQLite stores, with batched online backfills
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+BACKFILL_BATCH_SIZE = int(os.environ.get("SCHEMA_BACKFILL_BATCH_SIZE", "2000"))
+# Pause between backfill batches so request handlers get the write lock in between
+BACKFILL_PAUSE_SECONDS = float(os.environ.get("SCHEMA_BACKFILL_PAUSE_SECONDS", "0.05"))
+BUSY_TIMEOUT_SECONDS = 30
+
+
+def add_column(conn, table, name, decl):
+    """Add a column unless the table already has it; returns True when it was added"""
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    if name in existing:
+        return False
+    conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+    return True
+
+
+def table_exists(conn, name):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                        (name,)).fetchone() is not None
+
+
+class MigrationRunner:
+    """
+    Ordered schema migrations for one kind of SQLite database
+
+    PRAGMA user_version holds the last migration applied. Each pending
+    migration runs in its own BEGIN IMMEDIATE transaction together with the
+    version bump, so when Flask and Streamlit start at the same time one of
+    them applies it and the other sees the new version; a failing migration
+    leaves the previous version in place. Migration functions must
+    therefore not commit and must not use executescript (it commits first).
+
+    Databases created before versioning report version 0 but already hold
+    part of the schema, so migrations use IF NOT EXISTS and add_column.
+
+    Data changes that touch many rows are not done inside a migration:
+    the migration queues a backfill, which later updates one key range
+    per short transaction (see run_backfills).
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.migrations = []
+        self.backfills = {}
+        self._ready = set()
+        self._lock = threading.Lock()
+        self._threads = {}
+
+    @property
+    def latest(self):
+        return self.migrations[-1][0] if self.migrations else 0
+
+    def migration(self, version, description):
+        """Register fn(conn) as migration `version`; versions must be added in increasing order"""
+        def register(fn):
+            if version <= self.latest:
+                raise ValueError(f"{self.name} migration {version} is not after {self.latest}")
+            self.migrations.append((version, description, fn))
+            return fn
+        return register
+
+    def backfill(self, name, table, key='id'):
+        """
+        Register fn(conn, low, high) as a backfill over table rows with low <= key <= high
+
+        A batch must be safe to run again, since writes by the app can land
+        on the same rows (delete-then-insert or UPDATE ... WHERE x IS NULL).
+        """
+        def register(fn):
+            self.backfills[name] = (table, key, fn)
+            return fn
+        return register
+
+    def _connect(self, path):
+        # Autocommit mode: transactions are opened explicitly with BEGIN IMMEDIATE
+        return sqlite3.connect(path, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None)
+
+    def queue_backfill(self, conn, name):
+        """
+        Schedule a registered backfill for the rows present now (call from a migration)
+
+        Rows written afterwards are expected to be handled by the code or
+        triggers the migration added. Queuing again restarts the backfill.
+        """
+        table, key, _ = self.backfills[name]
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_backfills (
+                name TEXT PRIMARY KEY,
+                next_key INTEGER,
+                end_key INTEGER,
+                completed INTEGER NOT NULL DEFAULT 0,
+                updated_at TEXT NOT NULL
+            )
+        """)
+        low, high = conn.execute(f"SELECT MIN({key}), MAX({key}) FROM {table}").fetchone()
+        conn.execute("""
+            INSERT OR REPLACE INTO schema_backfills (name, next_key, end_key, completed, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, (name, low, high, int(high is None), datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+
+    def upgrade(self, path):
+        """
+        Apply pending migrations to the database at path
+
+        Returns:
+            int: Schema version after the upgrade
+        """
+        conn = self._connect(path)
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version > self.latest:
+                logging.warning(f"{path} has {self.name} schema version {version}, newer than this code "
+                                f"({self.latest}); leaving it unchanged")
+            for target, description, fn in self.migrations:
+                if target <= version:
+                    continue
+                started = time.perf_counter()
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    # Another process may have applied it while we waited for the lock
+                    version = conn.execute("PRAGMA user_version").fetchone()[0]
+                    if target <= version:
+                        conn.execute("ROLLBACK")
+                        continue
+                    fn(conn)
+                    conn.execute(f"PRAGMA user_version = {int(target)}")
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+                version = target
+                logging.info(f"{path}: applied {self.name} migration {target} ({description}) "
+                             f"in {time.perf_counter() - started:.2f}s")
+            return version
+        finally:
+            conn.close()
+
+    def ensure(self, path):
+        """
+        Upgrade the database at path once per process
+
+        Later calls for the same file return immediately. A failed upgrade is
+        logged and not retried until the next start, as the import-time
+        initialization used to do.
+        """
+        key = os.path.abspath(path)
+        if key in self._ready:
+            return
+        with self._lock:
+            if key in self._ready:
+                return
+            try:
+                self.upgrade(path)
+            except Exception as e:
+                logging.error(f"Error upgrading {self.name} schema of {path}: {e}")
+            finally:
+                self._ready.add(key)
+
+    def forget(self, path):
+        """Make the next ensure() check the database again (after it was replaced or restored)"""
+        with self._lock:
+            self._ready.discard(os.path.abspath(path))
+
+    def run_backfills(self, path, batch_size=BACKFILL_BATCH_SIZE, pause=BACKFILL_PAUSE_SECONDS, stop=None):
+        """
+        Work through queued backfills, one key range per transaction
+
+        Progress is committed with every batch, so an interrupted backfill
+        continues where it stopped on the next call.
+
+        Returns:
+            dict: Batches run per backfill name
+        """
+        conn = self._connect(path)
+        done = {}
+        try:
+            if not table_exists(conn, 'schema_backfills'):
+                return done
+            pending = conn.execute("""
+                SELECT name, next_key, end_key FROM schema_backfills WHERE completed = 0 ORDER BY rowid
+            """).fetchall()
+            for name, low, end in pending:
+                if name not in self.backfills:
+                    logging.warning(f"{path}: no {self.name} backfill named {name}; skipping it")
+                    continue
+                _, _, fn = self.backfills[name]
+                started = time.perf_counter()
+                done[name] = 0
+                while not (stop and stop.is_set()):
+                    high = min(low + batch_size - 1, end)
+                    conn.execute("BEGIN IMMEDIATE")
+                    try:
+                        fn(conn, low, high)
+                        conn.execute("""
+                            UPDATE schema_backfills SET next_key = ?, completed = ?, updated_at = ?
+                            WHERE name = ?
+                        """, (high + 1, int(high >= end), datetime.now().strftime("%Y-%m-%d %H:%M:%S"), name))
+                        conn.execute("COMMIT")
+                    except Exception:
+                        conn.execute("ROLLBACK")
+                        raise
+                    done[name] += 1
+                    low = high + 1
+                    if low > end:
+                        logging.info(f"{path}: backfill {name} finished in {done[name]} batch(es), "
+                                     f"{time.perf_counter() - started:.1f}s")
+                        break
+                    if pause:
+                        time.sleep(pause)
+            return done
+        finally:
+            conn.close()
+
+    def start_backfills(self, path, **kwargs):
+        """Run queued backfills on a daemon thread (one per database); returns the thread"""
+        key = os.path.abspath(path)
+        with self._lock:
+            thread = self._threads.get(key)
+            if thread and thread.is_alive():
+                return thread
+
+            def run():
+                try:
+                    self.run_backfills(path, **kwargs)
+                except Exception as e:
+                    logging.error(f"{path}: {self.name} backfill stopped, it resumes on the next start: {e}")
+
+            thread = threading.Thread(target=run, name=f"backfill-{self.name}", daemon=True)
+            self._threads[key] = thread
+            thread.start()
+            return thread
+
+    def status(self, path):
+        """Schema version and backfill progress of the database at path"""
+        conn = self._connect(path)
+        try:
+            backfills = []
+            if table_exists(conn, 'schema_backfills'):
+                backfills = [
+                    {'name': name, 'next_key': next_key, 'end_key': end_key, 'completed': bool(completed),
+                     'updated_at': updated_at}
+                    for name, next_key, end_key, completed, updated_at in conn.execute(
+                        "SELECT name, next_key, end_key, completed, updated_at FROM schema_backfills ORDER BY rowid")
+                ]
+            return {
+                'version': conn.execute("PRAGMA user_version").fetchone()[0],
+                'latest': self.latest,
+                'backfills': backfills,
+            }
+        finally:
+            conn.close()
@@ -0,0 +1,77 @@
+"""
+Test Fixtures
+Shared setup for the behaviour tests
+
+    pytest            # runs tests/ (see pytest.ini)
+
+Modules open their databases by relative path (evaluation_system.db,
+email_outbox.db), so the session runs from a scratch directory and each
+test that needs a database gets a fresh one under tmp_path.
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+os.environ.setdefault("EMAIL_DISPATCHER", "off")
+os.environ.setdefault("LLM_WARM_UP", "off")
+
+
+@pytest.fixture(scope="session", autouse=True)
+def scratch_databases():
+    """
+    Point the default database paths into a scratch directory for the session
+
+    The paths are made absolute and not restored: pytest changes back to
+    the invocation directory before exit-time flushes (llm_metrics) run.
+    """
+    import db_utils
+    import email_service
+    import feedback_db
+    scratch = tempfile.mkdtemp(prefix="tests_")
+    os.chdir(scratch)
+    db_utils.DB_FILE = feedback_db.DB_PATH = os.path.join(scratch, "evaluation_system.db")
+    email_service.email_service.db_path = os.path.join(scratch, "email_outbox.db")
+
+
+@pytest.fixture
+def eval_db(tmp_path, monkeypatch):
+    """db_utils pointed at an empty evaluation_system.db, upgraded to the current schema"""
+    import db_utils
+    path = str(tmp_path / "evaluation_system.db")
+    monkeypatch.setattr(db_utils, "DB_FILE", path)
+    db_utils.init_database()
+    yield path
+    # Buffered metrics from code under test belong to this database
+    from llm_metrics import llm_metrics
+    llm_metrics.flush()
+    db_utils.SCHEMA.forget(path)
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    """EmailService on an empty outbox that records deliveries instead of sending them"""
+    import email_service
+
+    class RecordingTransport:
+        name = 'recording'
+
+        def __init__(self):
+            self.sent = []
+            self.fail = False
+
+        def send(self, message):
+            if self.fail:
+                raise ConnectionError("transport down")
+            self.sent.append(message)
+
+    service = email_service.EmailService(db_path=str(tmp_path / "email_outbox.db"),
+                                         transport=RecordingTransport(),
+                                         legacy_log_file=str(tmp_path / "email_logs.json"))
+    yield service
+    service.shutdown()
@@ -0,0 +1,90 @@
+"""Keyset pagination of the admin listings"""
+
+import json
+import sqlite3
+
+import db_utils
+
+
+def _add_users(path, usernames, created_at="2024-01-01 10:00:00"):
+    conn = sqlite3.connect(path)
+    conn.executemany("""
+        INSERT INTO users (username, name, email, experience, password, created_at)
+        VALUES (?, ?, ?, 'Fresher', 'x', ?)
+    """, [(name, name.title(), f"{name}@example.com", created_at) for name in usernames])
+    conn.commit()
+    conn.close()
+
+
+def _add_evaluations(path, percentages):
+    conn = sqlite3.connect(path)
+    conn.executemany("""
+        INSERT INTO evaluations (username, date, role, score, max_score, percentage, time_taken, qa_history)
+        VALUES ('ada', '2024-01-01 10:00:00', 'Python Developer', 1, 10, ?, 1.0, '[]')
+    """, [(p,) for p in percentages])
+    conn.commit()
+    conn.close()
+
+
+def _all_pages(list_fn, key, **kwargs):
+    items, cursor, pages = [], None, 0
+    while True:
+        result = list_fn(cursor=cursor, **kwargs)
+        assert result['success'], result
+        items.extend(result[key])
+        pages += 1
+        cursor = result['next_cursor']
+        if cursor is None:
+            return items, pages
+
+
+def test_pages_cover_every_row_once_with_separator_in_keys(eval_db):
+    # Equal sort values force the tie-break on the key, which contains the old separator
+    names = [f"user|{i:02d}" for i in range(23)] + ["plain", "a|b|c"]
+    _add_users(eval_db, names)
+
+    users, pages = _all_pages(db_utils.admin_list_users, 'users', limit=5)
+    assert [u['username'] for u in users] == sorted(names, reverse=True)
+    assert pages == 5
+
+    users, _ = _all_pages(db_utils.admin_list_users, 'users', limit=4, sort='username', order='asc')
+    assert [u['username'] for u in users] == sorted(names)
+
+
+def test_float_sort_pages_through_ties(eval_db):
+    _add_evaluations(eval_db, [50.0, 72.5, 72.5, 72.5, 90.0, 10.0, 72.5])
+    evaluations, _ = _all_pages(db_utils.admin_list_evaluations, 'evaluations', limit=2, sort='percentage')
+    assert [e['percentage'] for e in evaluations] == [90.0, 72.5, 72.5, 72.5, 72.5, 50.0, 10.0]
+    assert len({e['id'] for e in evaluations}) == 7
+
+
+def test_malformed_cursor_is_rejected(eval_db):
+    _add_users(eval_db, ["ada"])
+    for cursor in ("not-a-cursor!", "x|y", db_utils._encode_cursor("x", "y")[:-3],
+                   db_utils._encode_cursor("x", "y")[::-1]):
+        result = db_utils.admin_list_users(cursor=cursor)
+        assert result == {'success': False, 'error': 'Invalid cursor'}
+
+    # Well-formed but with a sort value that does not fit the column
+    bad_value = db_utils._encode_cursor("high", 3)
+    assert db_utils.admin_list_evaluations(cursor=bad_value, sort='percentage')['error'] == 'Invalid cursor'
+    assert db_utils.admin_search("python", cursor="abc")['error'] == 'Invalid cursor'
+
+
+def test_cursor_is_opaque_url_safe_text():
+    cursor = db_utils._encode_cursor("2024-01-01 10:00:00", "a|b/c+d")
+    assert set(cursor) <= set("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_")
+    assert db_utils._decode_cursor(cursor) == ("2024-01-01 10:00:00", "a|b/c+d")
+    assert json.loads(json.dumps(cursor)) == cursor
+
+
+def test_search_prefix_treats_wildcards_literally(eval_db):
+    _add_users(eval_db, ["a_b", "axb", "50%off", "500", "back\\slash", "backslash"])
+
+    def search(text):
+        return sorted(u['username'] for u in db_utils.admin_list_users(search=text)['users'])
+
+    assert search("a_") == ["a_b"]
+    assert search("50%") == ["50%off"]
+    assert search("back\\") == ["back\\slash"]
+    assert search("A") == ["a_b", "axb"]
@@ -0,0 +1,54 @@
+"""Code executor: per-run output capture and timeouts off the main thread"""
+
+import threading
+
+from code_executor import CodeExecutor
+
+
+def _in_threads(count, fn):
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def run(index):
+        barrier.wait()
+        results[index] = fn(index)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_runs_keep_their_own_output():
+    executor = CodeExecutor()
+
+    def run(index):
+        code = f"for _ in range(200):\n    print({index}, end='')\nprint()\n"
+        return executor.execute_with_tests(code, [{'input': '', 'expected': str(index) * 200}])
+
+    results = _in_threads(8, run)
+    for index, result in enumerate(results):
+        assert result['success'], result['error']
+        assert result['output'] == str(index) * 200 + "\n"
+        assert result['passed_tests'] == 1
+        assert result['pass_rate'] == 100
+
+
+def test_infinite_loop_times_out_in_a_worker_thread():
+    executor = CodeExecutor()
+    executor.max_execution_time = 0.2
+
+    result = _in_threads(1, lambda _: executor.execute_with_tests("while True:\n    pass\n",
+                                                                [{'input': '', 'expected': ''}]))[0]
+    assert not result['success']
+    assert result['error'] == "Execution timed out (>0.2s)"
+    assert result['pass_rate'] == 0
+
+
+def test_failed_test_case_is_reported_not_raised():
+    result = CodeExecutor().execute_with_tests("print(1 // 0)", [{'input': '', 'expected': '0'}])
+    assert not result['success']
+    assert result['error'].startswith("ZeroDivisionError")
+    assert result['score'] <= 20
@@ -0,0 +1,116 @@
+"""Email outbox: claiming, retry backoff, campaign dedup and rate spacing"""
+
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+import email_service
+
+RECIPIENT = {'to': 'Ada@Example.com', 'name': 'Ada'}
+
+
+def _rows(service, where="1 = 1", params=()):
+    conn = sqlite3.connect(service.db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        return conn.execute(f"SELECT * FROM email_outbox WHERE {where} ORDER BY id", params).fetchall()
+    finally:
+        conn.close()
+
+
+def _age(service, days):
+    conn = sqlite3.connect(service.db_path)
+    conn.execute("UPDATE email_outbox SET created_at = ?",
+                 ((datetime.now() - timedelta(days=days)).isoformat(),))
+    conn.commit()
+    conn.close()
+
+
+def test_concurrent_dispatchers_deliver_each_email_once(outbox):
+    for i in range(60):
+        outbox.enqueue(f"user{i}@example.com", "Subject", "Body", "welcome")
+
+    def worker():
+        while outbox.dispatch_pending(batch_size=7):
+            pass
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    delivered = [message['id'] for message in outbox.transport.sent]
+    assert sorted(delivered) == sorted(set(delivered))
+    assert len(delivered) == 60
+    assert {row['status'] for row in _rows(outbox)} == {'sent'}
+
+
+def test_failed_delivery_backs_off_then_gives_up(outbox, monkeypatch):
+    monkeypatch.setattr(email_service, 'MAX_ATTEMPTS', 2)
+    outbox.transport.fail = True
+    email_id = outbox.enqueue("ada@example.com", "Subject", "Body", "welcome")
+
+    assert outbox.dispatch_pending() == 1
+    row = _rows(outbox, "id = ?", (email_id,))[0]
+    assert row['status'] == 'queued'
+    assert row['attempts'] == 1
+    assert row['last_error'] == "transport down"
+    # Not due again until the backoff has passed
+    assert outbox.dispatch_pending() == 0
+
+    conn = sqlite3.connect(outbox.db_path)
+    conn.execute("UPDATE email_outbox SET next_attempt_at = 0")
+    conn.commit()
+    conn.close()
+    assert outbox.dispatch_pending() == 1
+    row = _rows(outbox, "id = ?", (email_id,))[0]
+    assert row['status'] == 'failed'
+    assert row['attempts'] == 2
+
+
+def test_dedup_looks_back_dedup_days(outbox):
+    first = outbox.send_bulk('welcome', [RECIPIENT], campaign_id=1, dedup_days=7)
+    assert first['enqueued'] == 1
+
+    # Same address in another case, within the window
+    again = outbox.send_bulk('welcome', [{**RECIPIENT, 'to': 'ada@example.com'}], campaign_id=2, dedup_days=7)
+    assert again == {'success': True, 'enqueued': 0, 'skipped_duplicates': 1, 'invalid': 0}
+
+    _age(outbox, 6)
+    assert outbox.send_bulk('welcome', [RECIPIENT], campaign_id=3, dedup_days=7)['skipped_duplicates'] == 1
+
+    _age(outbox, 8)
+    assert outbox.send_bulk('welcome', [RECIPIENT], campaign_id=4, dedup_days=7)['enqueued'] == 1
+
+
+def test_dedup_within_one_run_and_disabled(outbox):
+    result = outbox.send_bulk('welcome', [RECIPIENT, RECIPIENT, {'to': '', 'name': 'x'}], dedup_days=7)
+    assert (result['enqueued'], result['skipped_duplicates'], result['invalid']) == (1, 1, 1)
+
+    result = outbox.send_bulk('welcome', [RECIPIENT, RECIPIENT])
+    assert result['enqueued'] == 2
+
+
+def test_concurrent_campaigns_share_the_delivery_rate(outbox):
+    start = datetime.now().timestamp() + 3600
+    barrier = threading.Barrier(2)
+
+    def campaign(campaign_id):
+        recipients = [{'to': f"c{campaign_id}-{i}@example.com", 'name': 'x'} for i in range(25)]
+        barrier.wait()
+        outbox.send_bulk('welcome', recipients, campaign_id=campaign_id, rate_per_minute=60,
+                         start_at=start, batch_size=10)
+
+    threads = [threading.Thread(target=campaign, args=(n,)) for n in (1, 2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    slots = sorted(row['next_attempt_at'] for row in _rows(outbox))
+    assert len(slots) == 50
+    # 60 per minute across both campaigns: one slot per second, none shared
+    gaps = [later - earlier for earlier, later in zip(slots, slots[1:])]
+    assert min(gaps) >= 0.999
+    assert slots[-1] - slots[0] >= 49 * 0.999
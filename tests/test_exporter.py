@@ -0,0 +1,53 @@
+"""Evaluation export route: formats, and Parquet without pyarrow"""
+
+import io
+import json
+
+import pytest
+
+import db_utils
+import exporter
+
+
+@pytest.fixture
+def admin_client(eval_db):
+    from app import app
+
+    db_utils.save_evaluation_result('ada', {
+        'role': 'Python Developer', 'score': 15, 'max_score': 20, 'percentage': 75.0, 'time_taken': 60,
+        'qa_history': [{'question': 'What is a generator?', 'answer': 'A lazy iterator', 'score': 15,
+                        'feedback': 'Good'}],
+    })
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['admin_logged_in'] = True
+    return client
+
+
+def test_jsonl_export_streams_one_row_per_answer(admin_client):
+    response = admin_client.get('/api/admin/export/evaluations?format=jsonl')
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [(row['username'], row['question'], row['score']) for row in rows] == [
+        ('ada', 'What is a generator?', 15)]
+
+
+def test_unknown_format_is_a_bad_request(admin_client):
+    response = admin_client.get('/api/admin/export/evaluations?format=xlsx')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == "Unsupported export format: xlsx"
+
+
+def test_parquet_without_pyarrow_is_a_bad_request(admin_client, monkeypatch):
+    monkeypatch.setattr(exporter, '_load_pyarrow', lambda: False)
+    response = admin_client.get('/api/admin/export/evaluations?format=parquet')
+    assert response.status_code == 400
+    assert response.get_json() == {'success': False, 'error': exporter.PYARROW_MISSING}
+
+
+def test_parquet_export_round_trips(admin_client):
+    pq = pytest.importorskip('pyarrow.parquet')
+    response = admin_client.get('/api/admin/export/evaluations?format=parquet')
+    assert response.status_code == 200
+    table = pq.read_table(io.BytesIO(response.get_data()))
+    assert table.column('answer').to_pylist() == ['A lazy iterator']
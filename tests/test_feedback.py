@@ -0,0 +1,52 @@
+"""Feedback listings: every row reachable through the cursor, malformed cursors rejected"""
+
+import pytest
+
+import feedback_db
+
+
+@pytest.fixture
+def feedback_store(eval_db, monkeypatch):
+    monkeypatch.setattr(feedback_db, 'DB_PATH', eval_db)
+    monkeypatch.setattr(feedback_db, '_initialized', False)
+    return eval_db
+
+
+@pytest.fixture
+def user_client(feedback_store):
+    from app import app
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['username'] = 'ada'
+    return client
+
+
+def _submit(count, username='ada'):
+    for i in range(count):
+        assert feedback_db.save_feedback({'username': username, 'user_feedback': f"comment {i}"})['success']
+
+
+def test_user_feedback_pages_reach_every_row(user_client):
+    _submit(7)
+    _submit(2, username='bob')
+
+    seen, cursor = [], None
+    while True:
+        query = f"?limit=3&cursor={cursor}" if cursor else "?limit=3"
+        response = user_client.get(f"/api/get-feedback{query}")
+        assert response.status_code == 200
+        body = response.get_json()
+        seen.extend(item['user_feedback'] for item in body['feedback'])
+        cursor = body['next_cursor']
+        if cursor is None:
+            break
+    assert seen == [f"comment {i}" for i in reversed(range(7))]
+
+
+def test_malformed_feedback_cursor_is_a_bad_request(user_client):
+    _submit(1)
+    for cursor in ("garbage", "2024-01-01|3", feedback_db.encode_cursor("2024-01-01", "3")):
+        response = user_client.get(f"/api/get-feedback?cursor={cursor}")
+        assert response.status_code == 400
+        assert response.get_json() == {'success': False, 'error': 'Invalid cursor'}
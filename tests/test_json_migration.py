@@ -0,0 +1,129 @@
+"""JSON to SQLite import: checkpoints, resume, replace and the journal-off mode"""
+
+import json
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+import db_utils
+from plagiarism import answer_index
+
+ANSWER = "A generator yields values lazily one at a time so the whole sequence never sits in memory at once"
+
+
+def _write_json(tmp_path, users=3, evaluations_per_user=4):
+    names = [f"user{i}" for i in range(users)]
+    (tmp_path / "users.json").write_text(json.dumps({
+        name: {'name': name.title(), 'email': f"{name}@example.com", 'experience': 'Fresher', 'password': 'x'}
+        for name in names}))
+    (tmp_path / "evaluation_history.json").write_text(json.dumps({
+        name: [{'date': f"2024-01-0{n + 1} 10:00:00", 'role': 'Python Developer', 'score': n, 'max_score': 20,
+                'percentage': n * 5.0, 'time_taken': 60, 'qa_history': [{'question': 'Generators?', 'answer': ANSWER}]}
+               for n in range(evaluations_per_user)]
+        for name in names}))
+    return names
+
+
+def _count(path, table):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def _triggers(path):
+    conn = sqlite3.connect(path)
+    try:
+        return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    finally:
+        conn.close()
+
+
+def _fail_on(monkeypatch, table, username):
+    """Make the row builder for table raise when it reaches username"""
+    sources = []
+    for path, source_table, build_rows, insert_sql, replace in db_utils.JSON_MIGRATION_SOURCES:
+        if source_table == table:
+            def build_rows(key, value, build=build_rows):
+                if key == username:
+                    raise ValueError(f"bad record {key}")
+                return build(key, value)
+        sources.append((path, source_table, build_rows, insert_sql, replace))
+    monkeypatch.setattr(db_utils, 'JSON_MIGRATION_SOURCES', sources)
+
+
+@pytest.fixture
+def json_dir(eval_db, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_import_is_verified_and_a_rerun_skips_it(json_dir, eval_db):
+    _write_json(json_dir)
+    triggers = _triggers(eval_db)
+
+    result = db_utils.migrate_from_json(batch_size=5)
+    assert (result['users'], result['evaluations'], result['verified'], result['backup']) == (3, 12, True, None)
+    assert _triggers(eval_db) == triggers
+    assert len(db_utils.admin_search("generator", limit=50)['results']) == 12
+
+    again = db_utils.migrate_from_json(batch_size=5)
+    assert again['evaluations'] == 12
+    assert _count(eval_db, 'evaluations') == 12
+
+
+def test_failed_batch_rolls_back_and_rerun_resumes(json_dir, eval_db, monkeypatch):
+    _write_json(json_dir, users=6)
+    with monkeypatch.context() as patch:
+        _fail_on(patch, 'evaluations', 'user4')
+        result = db_utils.migrate_from_json(batch_size=4)
+    assert not result['verified']
+    # Batches before the failing one stay committed
+    assert _count(eval_db, 'evaluations') == 16
+
+    result = db_utils.migrate_from_json(batch_size=4)
+    assert result['verified']
+    assert _count(eval_db, 'evaluations') == 24
+    conn = sqlite3.connect(eval_db)
+    assert conn.execute("SELECT COUNT(DISTINCT username || date) FROM evaluations").fetchone()[0] == 24
+    conn.close()
+
+
+def test_replacing_evaluations_clears_their_answer_signatures(json_dir, eval_db):
+    old_id = db_utils.save_evaluation_result('old', {
+        'role': 'Python Developer', 'score': 1, 'max_score': 20, 'percentage': 5.0, 'time_taken': 60,
+        'qa_history': [{'question': 'Generators?', 'answer': ANSWER}]})
+    answer_index.index_evaluation(old_id, 'old', [{'answer': ANSWER}])
+    assert _count(eval_db, 'answer_signatures') == 1
+
+    _write_json(json_dir, users=2, evaluations_per_user=1)
+    assert db_utils.migrate_from_json()['verified']
+    assert _count(eval_db, 'answer_signatures') == 0
+    assert _count(eval_db, 'answer_lsh') == 0
+    assert 'trg_answer_signatures_evaluation_delete' in _triggers(eval_db)
+
+    # Re-indexing the imported evaluations finds the two candidates' identical answers
+    assert answer_index.rebuild() == 2
+    matches = answer_index.get_recent_matches()['matches']
+    assert [(m['username'], m['matched_username']) for m in matches] == [('user1', 'user0')]
+
+
+def test_fast_mode_backs_up_and_fails_hard(json_dir, eval_db, monkeypatch):
+    _write_json(json_dir, users=6)
+    with monkeypatch.context() as patch:
+        _fail_on(patch, 'evaluations', 'user4')
+        with pytest.raises(RuntimeError) as error:
+            db_utils.migrate_from_json(batch_size=4, fast=True)
+    backups = [name for name in os.listdir(json_dir) if name.endswith('.bak')]
+    assert len(backups) == 1
+    assert backups[0] in str(error.value)
+    assert _count(str(json_dir / backups[0]), 'evaluations') == 0
+
+    shutil.copy(json_dir / backups[0], eval_db)
+    result = db_utils.migrate_from_json(batch_size=4, fast=True)
+    assert result['verified']
+    assert _count(eval_db, 'evaluations') == 24
+    assert 'trg_answer_signatures_evaluation_delete' in _triggers(eval_db)
@@ -0,0 +1,85 @@
+"""Buffered LLM metrics: batching, pruning and the Prometheus output"""
+
+import atexit
+import sqlite3
+
+import pytest
+
+import llm_metrics as metrics_module
+from llm_metrics import LLMMetrics
+
+
+@pytest.fixture
+def metrics(eval_db):
+    """A fresh LLMMetrics writing to the test database, flushed before the database goes away"""
+    instance = LLMMetrics()
+    yield instance
+    instance.flush()
+    atexit.unregister(instance.flush)
+
+
+def _count(path, sql):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(sql).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_recording_is_buffered_until_flush(eval_db, metrics):
+    metrics.record_call('evaluate_answer', 0.3, prompt_tokens=10, completion_tokens=5)
+    metrics.record_cache('evaluate_answer', hit=True)
+    metrics.flush()
+    writes_before = _count(eval_db, "SELECT COUNT(*) FROM llm_call_samples")
+
+    for _ in range(50):
+        metrics.record_call('evaluate_answer', 0.3)
+        metrics.record_cache('evaluate_answer', hit=False)
+    # Nothing reached the database yet
+    assert _count(eval_db, "SELECT COUNT(*) FROM llm_call_samples") == writes_before
+
+    assert metrics.flush()
+    assert _count(eval_db, "SELECT COUNT(*) FROM llm_call_samples") == 51
+    assert _count(eval_db, """
+        SELECT value FROM llm_metric_counters
+        WHERE metric = 'llm_calls_total' AND prompt_type = 'evaluate_answer' AND label = 'ok'
+    """) == 51
+    assert _count(eval_db, """
+        SELECT value FROM llm_metric_counters WHERE metric = 'llm_cache_misses_total'
+    """) == 50
+
+
+def test_samples_are_pruned_per_prompt_type(eval_db, metrics, monkeypatch):
+    monkeypatch.setattr(metrics_module, 'SAMPLES_PER_PROMPT_TYPE', 20)
+    for i in range(3):
+        for _ in range(15):
+            metrics.record_call('gen_question', 0.1)
+        metrics.record_call('evaluate_coding', 0.1)
+        metrics.flush()
+    assert _count(eval_db, "SELECT COUNT(*) FROM llm_call_samples WHERE prompt_type = 'gen_question'") == 20
+    assert _count(eval_db, "SELECT COUNT(*) FROM llm_call_samples WHERE prompt_type = 'evaluate_coding'") == 3
+    # Counters keep the lifetime totals
+    assert "llm_calls_total{prompt_type=\"gen_question\",status=\"ok\"} 45" in metrics.render_prometheus()
+
+
+def test_failed_flush_keeps_the_buffer(eval_db, metrics):
+    metrics.record_call('evaluate_answer', 1.5, status='error')
+    metrics.set_gauge('llm_rate_limit_queue_depth', 'fast', 3)
+
+    def broken_write(*args):
+        raise sqlite3.OperationalError("database is locked")
+    metrics._write = broken_write
+    assert not metrics.flush()
+
+    del metrics._write
+    metrics.record_call('evaluate_answer', 0.2)
+    summary = metrics.latency_summary()
+    entry = next(e for e in summary['prompt_types'] if e['prompt_type'] == 'evaluate_answer')
+    assert (entry['count'], entry['errors']) == (2, 1)
+    assert 'llm_rate_limit_queue_depth{endpoint="fast"} 3' in metrics.render_prometheus()
+
+
+def test_gauges_write_the_latest_value(eval_db, metrics):
+    for depth in (1, 5, 2, 0):
+        metrics.set_gauge('llm_rate_limit_queue_depth', 'reasoning', depth)
+    assert 'llm_rate_limit_queue_depth{endpoint="reasoning"} 0' in metrics.render_prometheus()
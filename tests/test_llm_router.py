@@ -0,0 +1,157 @@
+"""LLM router: coalescing of identical calls, rate limiter ordering and 429 retries"""
+
+import threading
+import time
+
+import pytest
+
+import llm_ratelimit
+from llm_ratelimit import RateLimiter, RateLimitTimeout, SingleFlight
+from llm_router import Endpoint, LLMRouter
+
+
+class FakeChat:
+    """Chat model stand-in that counts calls and answers each with a distinct reply"""
+
+    def __init__(self, delay=0.3):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def bind(self, **kwargs):
+        return self
+
+    def invoke(self, messages, config=None):
+        with self._lock:
+            self.calls += 1
+            number = self.calls
+        time.sleep(self.delay)
+        return f"reply {number}"
+
+
+@pytest.fixture
+def router():
+    endpoint = Endpoint('only', 'http://127.0.0.1:9', 'fake-model', 'unused')
+    endpoint._chat = FakeChat()
+    return LLMRouter([endpoint], routes={'default': ['only']})
+
+
+def _concurrently(count, fn):
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def run(index):
+        barrier.wait()
+        results[index] = fn()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_sampled_calls_each_reach_the_model(router):
+    results = _concurrently(2, lambda: router.invoke('gen_question', "Ask a question", temperature=0.7))
+    assert router.endpoints['only'].chat.calls == 2
+    assert sorted(results) == ["reply 1", "reply 2"]
+
+
+def test_concurrent_deterministic_calls_are_coalesced(router):
+    results = _concurrently(3, lambda: router.invoke('evaluate_answer', "Score this"))
+    assert router.endpoints['only'].chat.calls == 1
+    assert results == ["reply 1"] * 3
+
+    results = _concurrently(2, lambda: router.invoke('evaluate_answer', "Score this", temperature=0))
+    assert router.endpoints['only'].chat.calls == 2
+    assert results == ["reply 2"] * 2
+
+
+def test_coalescing_can_be_chosen_explicitly(router):
+    _concurrently(2, lambda: router.invoke('gen_question', "Ask", temperature=0.7, coalesce=True))
+    assert router.endpoints['only'].chat.calls == 1
+    _concurrently(2, lambda: router.invoke('evaluate_answer', "Score", coalesce=False))
+    assert router.endpoints['only'].chat.calls == 3
+
+
+def test_single_flight_shares_errors_and_releases_the_key():
+    flights = SingleFlight()
+    started = threading.Event()
+    calls = []
+
+    def failing():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        raise ValueError("provider down")
+
+    errors = []
+
+    def follower():
+        started.wait()
+        try:
+            flights.do('key', failing)
+        except ValueError as e:
+            errors.append(str(e))
+
+    thread = threading.Thread(target=follower)
+    thread.start()
+    with pytest.raises(ValueError):
+        flights.do('key', failing)
+    thread.join()
+    assert errors == ["provider down"]
+    assert len(calls) == 1
+    # The failed flight is gone; the next call runs again
+    assert flights.do('key', lambda: "ok") == "ok"
+
+
+def test_rate_limiter_serves_higher_priority_first():
+    limiter = RateLimiter('test', rate=20, burst=1)
+    limiter.acquire()
+    order = []
+
+    def waiter(name, priority):
+        limiter.acquire(priority)
+        order.append(name)
+
+    low = threading.Thread(target=waiter, args=('gen_question', 2))
+    low.start()
+    time.sleep(0.01)
+    high = threading.Thread(target=waiter, args=('evaluate_answer', 0))
+    high.start()
+    low.join()
+    high.join()
+    assert order == ['evaluate_answer', 'gen_question']
+
+
+def test_rate_limiter_times_out():
+    limiter = RateLimiter('test', rate=0.1, burst=1, queue_timeout=0.1)
+    limiter.acquire()
+    with pytest.raises(RateLimitTimeout):
+        limiter.acquire()
+    assert limiter.queue_depth() == 0
+
+
+def test_rate_limited_calls_are_retried(monkeypatch):
+    monkeypatch.setattr(llm_ratelimit, 'BACKOFF_BASE_SECONDS', 0.01)
+
+    class TooManyRequests(Exception):
+        status_code = 429
+
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise TooManyRequests()
+        return "done"
+
+    limiter = RateLimiter('test', rate=100, burst=5)
+    assert limiter.run(flaky, 'evaluate_answer') == "done"
+    assert len(attempts) == 3
+
+    attempts.clear()
+    with pytest.raises(ValueError):
+        limiter.run(lambda: attempts.append(1) or (_ for _ in ()).throw(ValueError("bad request")))
+    assert len(attempts) == 1
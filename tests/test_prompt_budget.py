@@ -0,0 +1,13 @@
+"""Prompt compaction must not change what the evaluator sees of the candidate's code"""
+
+import prompt_budget
+
+
+def test_compact_code_keeps_line_content():
+    code = 'def f():\n\tx = "a  b\\t c"   \n\n\n\n    return  x  # two  spaces\n\n'
+    assert prompt_budget.compact_code(code) == 'def f():\n\tx = "a  b\\t c"\n\n    return  x  # two  spaces'
+
+
+def test_compact_answer_collapses_prose_only():
+    assert prompt_budget.compact_answer("  uses   a\n\n hash  map ") == "uses a hash map"
+    assert prompt_budget.compact_answer("s = 'a  b'  \n", is_coding=True) == "s = 'a  b'"
@@ -0,0 +1,42 @@
+"""Question selection: session near-duplicates and cross-session repeats"""
+
+from question_index import QuestionIndex, choose_question
+
+STOCK = "What is the difference between a list and a tuple in Python?"
+FRESH = "How would you profile a slow Django view that issues many queries?"
+
+
+def _generator(questions):
+    calls = []
+
+    def generate(rejected):
+        calls.append(list(rejected))
+        return questions[len(calls) - 1], False
+    generate.calls = calls
+    return generate
+
+
+def test_first_new_candidate_is_taken():
+    generate = _generator([STOCK, FRESH])
+    chosen = choose_question(generate, QuestionIndex([STOCK]), QuestionIndex(), attempts=3)
+    assert chosen == (FRESH, False)
+    assert generate.calls == [[], [STOCK]]
+
+
+def test_cross_session_repeat_is_never_the_fallback():
+    # The model keeps returning its stock question, which this scope was asked recently
+    rejected = []
+    generate = _generator([STOCK, STOCK + " ", STOCK.lower()])
+    chosen = choose_question(generate, QuestionIndex(), QuestionIndex([STOCK]), attempts=3,
+                             on_reject=rejected.append)
+    assert chosen is None
+    assert len(rejected) == 3
+
+
+def test_least_similar_session_duplicate_is_the_fallback():
+    asked = ["Explain Python decorators with an example.", "Explain Python generators with an example."]
+    candidates = ["Explain Python decorators with an example please.",
+                  "Explain Python context managers with an example.",
+                  "Explain Python decorators with an example."]
+    chosen = choose_question(_generator(candidates), QuestionIndex(asked), QuestionIndex(), attempts=3)
+    assert chosen == (candidates[1], False)
@@ -0,0 +1,46 @@
+"""Resume parsing reads every page within the limits and caches the full result"""
+
+import pytest
+
+import resume_parser
+from resume_cache import resume_cache
+
+PAGE_ONE = ("Ada Lovelace\nada@example.com\n+44 207 555 0123\n"
+            "6 years of experience with Python, Docker, SQL and React")
+PAGE_TWO = "Skills: Kubernetes, Selenium\nEducation: Master of Computer Science\nCertified AWS Solutions Architect"
+PDF_BYTES = b"%PDF-1.4 two page resume"
+
+
+@pytest.fixture
+def two_page_pdf(monkeypatch):
+    read = []
+
+    def pages(file_bytes, max_pages):
+        for text in [PAGE_ONE, PAGE_TWO][:max_pages]:
+            read.append(text)
+            yield text
+
+    monkeypatch.setattr(resume_parser, '_iter_pdf_pages', pages)
+    resume_cache.clear()
+    yield read
+    resume_cache.clear()
+
+
+def test_later_pages_are_parsed_even_when_page_one_has_the_key_fields(two_page_pdf):
+    result = resume_parser.EnhancedResumeParser().parse_file(PDF_BYTES, "cv.pdf")
+    assert two_page_pdf == [PAGE_ONE, PAGE_TWO]
+    assert result['email'] == "ada@example.com"
+    assert result['experience_years'] == 6
+    assert {'Kubernetes', 'Selenium'} <= set(result['skills'])
+    assert 'Master' in result['education']
+    assert result['certifications']
+
+    # The cached parse is the full one
+    again = resume_parser.EnhancedResumeParser().parse_file(PDF_BYTES, "cv.pdf")
+    assert again == result
+    assert len(two_page_pdf) == 2
+
+
+def test_extraction_respects_page_and_character_limits(two_page_pdf):
+    assert resume_parser.extract_text(PDF_BYTES, max_pages=1) == PAGE_ONE
+    assert resume_parser.extract_text(PDF_BYTES, max_chars=20) == PAGE_ONE[:20]
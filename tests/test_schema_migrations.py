@@ -0,0 +1,152 @@
+"""Versioned schema migrations and resumable backfills"""
+
+import sqlite3
+import threading
+
+import pytest
+
+import db_utils
+from schema_migrations import MigrationRunner
+
+
+def _version(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def _names(path, kind):
+    conn = sqlite3.connect(path)
+    try:
+        return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = ?", (kind,))}
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def runner():
+    runner = MigrationRunner('test')
+    applied = []
+    runner.applied = applied
+
+    @runner.migration(1, "items table")
+    def _items(conn):
+        applied.append(1)
+        conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT, upper_name TEXT)")
+
+    @runner.migration(2, "name index")
+    def _index(conn):
+        applied.append(2)
+        conn.execute("CREATE INDEX idx_items_name ON items(name)")
+
+    return runner
+
+
+def test_migrations_apply_in_order_once(runner, tmp_path):
+    path = str(tmp_path / "test.db")
+    assert runner.upgrade(path) == 2
+    assert runner.applied == [1, 2]
+    assert _version(path) == 2
+
+    assert runner.upgrade(path) == 2
+    assert runner.applied == [1, 2]
+
+
+def test_versions_must_increase(runner):
+    with pytest.raises(ValueError):
+        runner.migration(2, "again")(lambda conn: None)
+
+
+def test_failed_migration_rolls_back_and_keeps_version(runner, tmp_path):
+    path = str(tmp_path / "test.db")
+
+    @runner.migration(3, "broken")
+    def _broken(conn):
+        conn.execute("CREATE TABLE half_done (id INTEGER)")
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        runner.upgrade(path)
+    assert _version(path) == 2
+    assert 'half_done' not in _names(path, 'table')
+
+    # ensure() logs instead of raising and does not retry within the process
+    runner.ensure(path)
+    runner.ensure(path)
+    assert runner.applied == [1, 2]
+
+
+def test_concurrent_upgrades_apply_each_migration_once(runner, tmp_path):
+    path = str(tmp_path / "test.db")
+    barrier = threading.Barrier(4)
+
+    def upgrade():
+        barrier.wait()
+        runner.upgrade(path)
+
+    threads = [threading.Thread(target=upgrade) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert runner.applied == [1, 2]
+
+
+def test_backfill_resumes_after_interruption(runner, tmp_path):
+    path = str(tmp_path / "test.db")
+    runner.upgrade(path)
+    conn = sqlite3.connect(path)
+    conn.executemany("INSERT INTO items (id, name) VALUES (?, ?)", [(i, f"item {i}") for i in range(1, 26)])
+    conn.commit()
+    conn.close()
+
+    stop = threading.Event()
+    batches = []
+
+    @runner.backfill('upper_names', 'items')
+    def _upper(conn, low, high):
+        batches.append((low, high))
+        conn.execute("UPDATE items SET upper_name = upper(name) WHERE id BETWEEN ? AND ?", (low, high))
+        if len(batches) == 2:
+            stop.set()
+
+    @runner.migration(3, "upper names")
+    def _queue(conn):
+        runner.queue_backfill(conn, 'upper_names')
+
+    runner.upgrade(path)
+    assert runner.run_backfills(path, batch_size=10, pause=0, stop=stop) == {'upper_names': 2}
+    assert runner.status(path)['backfills'][0]['next_key'] == 21
+
+    assert runner.run_backfills(path, batch_size=10, pause=0) == {'upper_names': 1}
+    assert batches == [(1, 10), (11, 20), (21, 25)]
+    assert runner.status(path)['backfills'][0]['completed']
+    assert runner.run_backfills(path, batch_size=10, pause=0) == {}
+
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT COUNT(*) FROM items WHERE upper_name IS NULL").fetchone()[0] == 0
+    conn.close()
+
+
+def test_module_tables_are_part_of_the_schema(eval_db):
+    assert _version(eval_db) == db_utils.SCHEMA.latest
+    assert {'llm_metric_counters', 'llm_call_samples', 'llm_metric_gauges',
+            'answer_signatures', 'answer_lsh', 'answer_matches'} <= _names(eval_db, 'table')
+    assert 'trg_answer_signatures_evaluation_delete' in _names(eval_db, 'trigger')
+
+
+def test_tables_created_before_versioning_are_adopted(tmp_path):
+    # A database where plagiarism already created its tables and the schema stopped at 4
+    path = str(tmp_path / "evaluation_system.db")
+    runner = MigrationRunner('evaluation_system')
+    runner.migrations = [m for m in db_utils.SCHEMA.migrations if m[0] <= 4]
+    runner.upgrade(path)
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE answer_signatures (id INTEGER PRIMARY KEY AUTOINCREMENT, evaluation_id INTEGER)")
+    conn.commit()
+    conn.close()
+
+    assert db_utils.SCHEMA.upgrade(path) == db_utils.SCHEMA.latest
+    assert 'answer_lsh' in _names(path, 'table')
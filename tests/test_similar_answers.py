@@ -0,0 +1,54 @@
+"""Similar-answer listing: cursor pages over recorded matches, malformed cursors rejected"""
+
+import pytest
+
+import db_utils
+from plagiarism import answer_index
+
+ANSWER = "A generator yields values lazily one at a time so the whole sequence never sits in memory at once"
+
+
+@pytest.fixture
+def admin_client(eval_db):
+    from app import app
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['admin_logged_in'] = True
+    return client
+
+
+def _answer_as(username):
+    qa_history = [{'question': 'Generators?', 'answer': ANSWER, 'score': 5}]
+    evaluation_id = db_utils.save_evaluation_result(username, {
+        'role': 'Python Developer', 'score': 5, 'max_score': 20, 'percentage': 25.0, 'time_taken': 60,
+        'qa_history': qa_history})
+    answer_index.index_evaluation(evaluation_id, username, qa_history)
+
+
+def test_recent_matches_page_through_every_match(admin_client):
+    for username in ('ada', 'bob', 'cy'):
+        _answer_as(username)
+
+    pairs, cursor = [], None
+    while True:
+        query = f"?limit=1&cursor={cursor}" if cursor else "?limit=1"
+        response = admin_client.get(f"/api/admin/similar-answers{query}")
+        assert response.status_code == 200
+        body = response.get_json()
+        pairs.extend((m['username'], m['matched_username']) for m in body['matches'])
+        cursor = body['next_cursor']
+        if cursor is None:
+            break
+    assert sorted(pairs) == [('bob', 'ada'), ('cy', 'ada'), ('cy', 'bob')]
+
+
+def test_malformed_cursor_is_a_bad_request(admin_client):
+    _answer_as('ada')
+    for cursor in ("garbage", "a|b|c", "2024-01-01 10:00:00|1|2",
+                   db_utils._encode_cursor("2024-01-01", 3),
+                   db_utils._encode_cursor("2024-01-01", ["1", 2]),
+                   db_utils._encode_cursor("2024-01-01", [1, 2, 3])):
+        response = admin_client.get(f"/api/admin/similar-answers?cursor={cursor}")
+        assert response.status_code == 400, cursor
+        assert response.get_json() == {'success': False, 'error': 'Invalid cursor'}
@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""Fill evaluation_system.db (and optionally a legacy evaluation_feedback.db) with realistic synthetic data.
+
+Generates users, evaluations with a full qa_history, per-question feedback
+disputes and general feedback comments at any volume, so scaling problems
+(startup backfills, admin pages, analytics, migrations) can be reproduced
+locally. Rows are streamed into bulk executemany batches, one transaction
+per batch, and never held in memory all at once. Output is deterministic
+for a given --seed.
+
+Distributions:
+    --roles            weights per role, e.g. "Python Developer=5,Java Developer=2" (default: uniform)
+    --ability-dist     candidate ability in [0, 1] that drives question scores:
+                       beta:A,B | normal:MEAN,SD | uniform (default beta:2.5,2)
+    --date-dist        signups over the date range: uniform | growth (ramps up toward the end)
+    --user-skew        > 1 concentrates evaluations on fewer users (1 = uniform)
+
+Example:
+    python tools/generate_synthetic_data.py --db /tmp/scale.db --users 200000 --evaluations 2000000 \\
+        --feedback-rate 0.03 --date-range 2023-01-01:2025-12-31 --date-dist growth --seed 7
+    python tools/generate_synthetic_data.py --db /tmp/scale.db --users 0 --evaluations 0 \\
+        --legacy-feedback-db /tmp/evaluation_feedback.db --legacy-feedback 500000
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from array import array
+from datetime import datetime, timedelta
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, "benchmarks"))
+
+from synthetic import (ROLES, SKILLS, EXPERIENCE, FIRST_NAMES, LAST_NAMES,  # noqa: E402
+                       QUESTION_STEMS, TOPICS, FILLER)
+
+# db_utils creates its tables in the working directory on import; keep that away from the repo DB
+_cwd = os.getcwd()
+os.chdir(tempfile.mkdtemp(prefix="synthetic_"))
+try:
+    import db_utils  # noqa: E402
+finally:
+    os.chdir(_cwd)
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+MAX_QUESTION_SCORE = 20
+# Answers, feedback and questions are drawn from pre-built pools; building
+# text word by word for every row would dominate the run time
+TEXT_POOL_SIZE = 4096
+USER_FEEDBACK = [
+    "I think my answer covered the main points and deserves a higher score.",
+    "The evaluation missed the example I gave in the second paragraph.",
+    "The question was ambiguous; my interpretation should also be accepted.",
+    "The feedback mentions things that are not in my answer.",
+]
+GENERAL_FEEDBACK = [
+    "The timer was too short for the coding questions.",
+    "Great experience overall, the questions were relevant.",
+    "Please add more questions about system design.",
+    "Voice input stopped working halfway through.",
+]
+
+
+def parse_weights(spec, names):
+    """'Role A=3,Role B=1' -> (names, weights); an empty spec means uniform (weights None)"""
+    if not spec:
+        return list(names), None
+    chosen, weights = [], []
+    for part in spec.split(","):
+        name, _, weight = part.rpartition("=")
+        if not name:
+            name, weight = weight, "1"
+        chosen.append(name.strip())
+        weights.append(float(weight))
+    return chosen, weights
+
+
+def ability_sampler(spec, rng):
+    name, _, args = (spec or "uniform").partition(":")
+    values = [float(v) for v in args.split(",") if v.strip()]
+    if name == "beta":
+        return lambda: rng.betavariate(values[0], values[1])
+    if name == "normal":
+        return lambda: min(1.0, max(0.0, rng.gauss(values[0], values[1])))
+    if name == "uniform":
+        return rng.random
+    raise ValueError(f"Unknown ability distribution: {spec}")
+
+
+def date_sampler(dist, start, end, rng):
+    """Epoch seconds between start and end following dist"""
+    span = end - start
+    if dist == "uniform":
+        return lambda: start + rng.random() * span
+    if dist == "growth":
+        # Density grows linearly toward the end of the range
+        return lambda: start + math.sqrt(rng.random()) * span
+    raise ValueError(f"Unknown date distribution: {dist}")
+
+
+def parse_date_range(spec):
+    if spec:
+        first, _, last = spec.partition(":")
+        start = datetime.strptime(first, "%Y-%m-%d")
+        end = datetime.strptime(last, "%Y-%m-%d") + timedelta(days=1)
+    else:
+        end = datetime.now().replace(microsecond=0)
+        start = end - timedelta(days=365)
+    return start.timestamp(), end.timestamp()
+
+
+def _format(ts):
+    return datetime.fromtimestamp(ts).strftime(DATE_FORMAT)
+
+
+def _words(rng, count):
+    return " ".join(rng.choices(FILLER, k=count))
+
+
+class Generator:
+    """Streams synthetic rows into the databases in executemany batches"""
+
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.roles, self.role_weights = parse_weights(args.roles, ROLES)
+        self.ability = ability_sampler(args.ability_dist, self.rng)
+        self.start, self.end = parse_date_range(args.date_range)
+        self.signup = date_sampler(args.date_dist, self.start, self.end, self.rng)
+        self.created = array("d")
+        self.counts = {}
+        rng = self.rng
+        self.questions = [rng.choice(QUESTION_STEMS).format(a=rng.choice(TOPICS), b=rng.choice(TOPICS))
+                          for _ in range(TEXT_POOL_SIZE)]
+        self.answers = [_words(rng, args.answer_words) for _ in range(TEXT_POOL_SIZE)]
+        self.ai_feedback = [_words(rng, max(4, args.answer_words // 3)) for _ in range(TEXT_POOL_SIZE)]
+
+    def _role(self):
+        return self.rng.choices(self.roles, self.role_weights)[0]
+
+    def _batches(self, rows):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.args.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _load(self, conn, table, sql, rows, total):
+        """executemany rows in batches, one transaction each, with progress output"""
+        started = time.perf_counter()
+        done = 0
+        for batch in self._batches(rows):
+            conn.execute("BEGIN")
+            conn.executemany(sql, batch)
+            conn.execute("COMMIT")
+            done += len(batch)
+            elapsed = time.perf_counter() - started
+            print(f"\r{table}: {done:,}/{total:,} rows ({done / elapsed if elapsed else 0:,.0f}/s)",
+                  end="", flush=True)
+        if total:
+            print()
+        self.counts[table] = done
+
+    def user_rows(self):
+        rng = self.rng
+        prefix = self.args.prefix
+        for n in range(self.args.users):
+            created = self.signup()
+            self.created.append(created)
+            role = self._role()
+            yield (
+                f"{prefix}{n}", f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", f"{prefix}{n}@example.com",
+                rng.choice(EXPERIENCE), f"{rng.getrandbits(256):064x}", _format(created),
+                json.dumps({role: rng.randint(0, 10)}), json.dumps({role: rng.randint(0, 3)}),
+                json.dumps(rng.sample(SKILLS, rng.randint(2, 6))),
+            )
+
+    def _pick_user(self):
+        # u ** skew piles draws toward index 0, i.e. a few heavy repeat candidates
+        return min(len(self.created) - 1, int(len(self.created) * self.rng.random() ** self.args.user_skew))
+
+    def _qa_history(self, ability):
+        rng = self.rng
+        history = []
+        skip_chance = (1 - ability) * 0.25
+        mean = ability * MAX_QUESTION_SCORE
+        for _ in range(self.args.questions):
+            question = rng.choice(self.questions)
+            if rng.random() < skip_chance:
+                history.append({'q': question, 'a': "[Skipped - Don't know]", 'score': 0,
+                                'feedback': "The candidate did not answer the question."})
+                continue
+            score = min(MAX_QUESTION_SCORE, max(0, round(rng.gauss(mean, 3))))
+            history.append({'q': question, 'a': rng.choice(self.answers), 'score': score,
+                            'feedback': rng.choice(self.ai_feedback)})
+        return history
+
+    def evaluation_and_feedback_rows(self, first_id):
+        """Evaluation rows; per-question disputes are collected for a second pass"""
+        rng = self.rng
+        prefix = self.args.prefix
+        self.disputes = []
+        for offset in range(self.args.evaluations):
+            user = self._pick_user()
+            created = self.created[user]
+            when = created + rng.random() * (self.end - created)
+            qa_history = self._qa_history(self.ability())
+            score = sum(qa['score'] for qa in qa_history)
+            max_score = MAX_QUESTION_SCORE * len(qa_history)
+            evaluation_id = first_id + offset
+            if qa_history and rng.random() < self.args.feedback_rate:
+                index = rng.randrange(len(qa_history))
+                self.disputes.append((evaluation_id, f"{prefix}{user}", index, qa_history[index], when))
+            yield (
+                evaluation_id, f"{prefix}{user}", _format(when), self._role(), score, max_score,
+                round(score / max_score * 100, 2) if max_score else 0.0, round(rng.uniform(300, 3600), 3),
+                json.dumps(qa_history),
+            )
+
+    def dispute_rows(self):
+        rng = self.rng
+        for evaluation_id, username, index, qa, when in self.disputes:
+            submitted = min(self.end, when + rng.uniform(60, 7 * 86400))
+            status = rng.choices(['pending', 'reviewed', 'resolved'], [6, 2, 2])[0]
+            yield (
+                username, _format(submitted), None, '[]', rng.choice(USER_FEEDBACK),
+                1 if status == 'resolved' else 0, None, status, username, f"q{index + 1}",
+                qa['q'], qa['a'], qa['score'], qa['feedback'],
+                min(MAX_QUESTION_SCORE, qa['score'] + rng.randint(2, 8)), evaluation_id, index,
+            )
+
+    def general_feedback_rows(self):
+        rng = self.rng
+        for _ in range(self.args.general_feedback):
+            user = rng.randrange(len(self.created))
+            created = self.created[user]
+            yield (
+                f"{self.args.prefix}{user}", _format(created + rng.random() * (self.end - created)), self._role(),
+                json.dumps(rng.sample(SKILLS, 3)), rng.choice(GENERAL_FEEDBACK),
+                0, None, 'pending',
+            )
+
+    def legacy_feedback_rows(self):
+        rng = self.rng
+        for _ in range(self.args.legacy_feedback):
+            submitted = self.signup()
+            ai_score = rng.randint(0, MAX_QUESTION_SCORE)
+            username = f"{self.args.prefix}legacy_{rng.randrange(max(1, self.args.legacy_feedback // 5))}"
+            yield (
+                username, username, f"q{rng.randint(1, 10)}", rng.choice(self.questions),
+                rng.choice(self.answers), ai_score, rng.choice(self.ai_feedback), rng.choice(USER_FEEDBACK),
+                min(MAX_QUESTION_SCORE, ai_score + rng.randint(1, 6)),
+                datetime.fromtimestamp(submitted).isoformat(), rng.choice(['pending', 'reviewed', 'resolved']),
+            )
+
+
+def _open(path):
+    conn = sqlite3.connect(path, isolation_level=None)
+    # Synthetic data can be regenerated, so trade durability for load speed
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA journal_mode = MEMORY")
+    return conn
+
+
+def _drop_search_index(conn):
+    for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' "
+                                "AND name LIKE 'trg_search_%'").fetchall():
+        conn.execute(f"DROP TRIGGER {name}")
+    conn.execute("DROP TABLE IF EXISTS search_index")
+
+
+def fill_main_db(generator, args):
+    db_utils.DB_FILE = args.db
+    db_utils.init_database()
+    conn = _open(args.db)
+    try:
+        generator._load(conn, "users", """
+            INSERT OR REPLACE INTO users (username, name, email, experience, password, created_at,
+                                          eval_chances, eval_taken_counts, skills)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, generator.user_rows(), args.users)
+
+        if not generator.created:
+            print("No users generated; skipping evaluations and feedback")
+            return
+        # Keeping the FTS triggers would index row by row; one bulk rebuild at the end is much faster
+        _drop_search_index(conn)
+        try:
+            first_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM evaluations").fetchone()[0]
+            generator._load(conn, "evaluations", """
+                INSERT INTO evaluations (id, username, date, role, score, max_score, percentage, time_taken, qa_history)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, generator.evaluation_and_feedback_rows(first_id), args.evaluations)
+
+            generator._load(conn, "feedback (disputes)", """
+                INSERT INTO feedback (username, date, role, skills, message, resolved, admin_comment, status,
+                                      user_id, question_id, question_text, user_answer, ai_score, ai_feedback,
+                                      user_expected_score, evaluation_id, question_index)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, generator.dispute_rows(), len(generator.disputes))
+
+            generator._load(conn, "feedback (general)", """
+                INSERT INTO feedback (username, date, role, skills, message, resolved, admin_comment, status)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, generator.general_feedback_rows(), args.general_feedback)
+        except BaseException:
+            # Never leave the database without its index and triggers; the app backfills it on its next start
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            db_utils.reset_search_index()
+            raise
+    finally:
+        conn.close()
+
+    if args.no_search_index:
+        db_utils.reset_search_index()
+        print("Search index left empty; the app backfills it in the background on its next start")
+    else:
+        started = time.perf_counter()
+        print("Rebuilding search index...", end="", flush=True)
+        indexed = db_utils.rebuild_search_index()
+        print(f" {indexed:,} entries in {time.perf_counter() - started:.1f}s")
+
+
+def fill_legacy_db(generator, args):
+    conn = _open(args.legacy_feedback_db)
+    try:
+        # Schema of the standalone feedback database that feedback_db.migrate_legacy_feedback imports
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS feedback (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                username TEXT NOT NULL,
+                question_id TEXT NOT NULL,
+                question_text TEXT NOT NULL,
+                user_answer TEXT NOT NULL,
+                ai_score INTEGER NOT NULL,
+                ai_feedback TEXT NOT NULL,
+                user_feedback TEXT NOT NULL,
+                user_expected_score INTEGER,
+                submitted_at TEXT NOT NULL,
+                status TEXT DEFAULT 'pending'
+            )
+        """)
+        generator._load(conn, "legacy feedback", """
+            INSERT INTO feedback (user_id, username, question_id, question_text, user_answer, ai_score,
+                                  ai_feedback, user_feedback, user_expected_score, submitted_at, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, generator.legacy_feedback_rows(), args.legacy_feedback)
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter,
+                                     epilog=__doc__.split("\n\n", 1)[1])
+    parser.add_argument("--db", default=db_utils.DB_FILE, help="evaluation_system.db to fill (created if missing)")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--evaluations", type=int, default=50000)
+    parser.add_argument("--questions", type=int, default=10, help="qa_history entries per evaluation")
+    parser.add_argument("--answer-words", type=int, default=40, help="words per generated answer")
+    parser.add_argument("--feedback-rate", type=float, default=0.02,
+                        help="fraction of evaluations with a per-question dispute")
+    parser.add_argument("--general-feedback", type=int, default=1000, help="general feedback comments")
+    parser.add_argument("--roles", help="role weights, NAME=WEIGHT,... (default: uniform over known roles)")
+    parser.add_argument("--ability-dist", default="beta:2.5,2", metavar="SPEC")
+    parser.add_argument("--date-range", metavar="YYYY-MM-DD:YYYY-MM-DD", help="default: the last 365 days")
+    parser.add_argument("--date-dist", choices=["uniform", "growth"], default="uniform")
+    parser.add_argument("--user-skew", type=float, default=1.5)
+    parser.add_argument("--prefix", default="syn_", help="username prefix (keeps synthetic users apart)")
+    parser.add_argument("--legacy-feedback-db", metavar="FILE", help="also fill a legacy evaluation_feedback.db")
+    parser.add_argument("--legacy-feedback", type=int, default=0, help="rows for --legacy-feedback-db")
+    parser.add_argument("--no-search-index", action="store_true", help="skip the full-text index rebuild")
+    parser.add_argument("--batch-size", type=int, default=5000, help="rows per executemany transaction")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    args.db = os.path.abspath(args.db)
+
+    generator = Generator(args)
+    started = time.perf_counter()
+    # Evaluations and feedback belong to generated users, so without users there is nothing to add
+    if args.users:
+        fill_main_db(generator, args)
+    elif args.evaluations:
+        print("No users requested; skipping evaluations and feedback")
+    if args.legacy_feedback_db and args.legacy_feedback:
+        fill_legacy_db(generator, args)
+
+    elapsed = time.perf_counter() - started
+    summary = ", ".join(f"{count:,} {table}" for table, count in generator.counts.items())
+    print(f"Generated {summary or 'nothing'} in {elapsed:.1f}s")
+    for path in filter(None, [args.db, args.legacy_feedback_db]):
+        if os.path.exists(path):
+            print(f"  {path}: {os.path.getsize(path) / 1e6:,.1f} MB")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
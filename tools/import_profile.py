@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""Import-time profile: how long a fresh process needs to import the app, and who pays for it.
+
+Imports the target module (app by default) in fresh interpreters started
+in a throwaway directory, so no SQLite files or outbox in the repo are
+touched. Wall time is the best and median of several runs; one extra run
+with `python -X importtime` attributes the time to our own modules and to
+the libraries each of them pulls in. Results can be written to
+JSON together with the git commit, and compared with an earlier run.
+
+Example:
+    python tools/import_profile.py --output before.json
+    python tools/import_profile.py --compare before.json
+    python tools/import_profile.py feedback_db email_service --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "tools"))
+
+from load_test import git_revision
+
+RESULTS_VERSION = 1
+
+CHILD_SCRIPT = """
+import sys, time
+sys.path.insert(0, {root!r})
+started = time.perf_counter()
+import {module}
+print("IMPORT_SECONDS", time.perf_counter() - started)
+"""
+
+
+def first_party_modules():
+    return {name[:-3] for name in os.listdir(REPO_ROOT) if name.endswith(".py")}
+
+
+def run_import(module, workdir, importtime=False):
+    """Import module in a fresh interpreter; returns (seconds, stderr)"""
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    command += ["-c", CHILD_SCRIPT.format(root=REPO_ROOT, module=module)]
+    # No background email delivery or LLM client warm-up from a process that only imports. The
+    # throwaway cwd hides .env, and older revisions built LLM clients at import, which fails without a key
+    env = dict(os.environ, EMAIL_DISPATCHER="off", LLM_WARM_UP="off")
+    env.setdefault("DEEPSEEK_API_KEY", "import-profile")
+    proc = subprocess.run(command, cwd=workdir, env=env, capture_output=True, text=True)
+    seconds = None
+    for line in proc.stdout.splitlines():
+        if line.startswith("IMPORT_SECONDS "):
+            seconds = float(line.split()[1])
+    if proc.returncode != 0 or seconds is None:
+        error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit code {proc.returncode}"
+        raise RuntimeError(f"importing {module} failed: {error}")
+    return seconds, proc.stderr
+
+
+def parse_importtime(stderr):
+    """
+    Build the import tree from `-X importtime` output
+
+    Lines are printed when an import finishes, so a module's children are
+    the lines just before it that are one level deeper.
+
+    Returns:
+        list: Root nodes, each {'name', 'self_us', 'cumulative_us', 'children'}
+    """
+    pending = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, raw_name = line[len("import time:"):].split("|")
+        depth = (len(raw_name) - len(raw_name.lstrip()) - 1) // 2
+        node = {'name': raw_name.strip(), 'self_us': int(self_us), 'cumulative_us': int(cumulative_us),
+                'depth': depth, 'children': []}
+        while pending and pending[-1]['depth'] > depth:
+            node['children'].insert(0, pending.pop())
+        pending.append(node)
+    return pending
+
+
+def attribute(roots, own):
+    """
+    Split import time between our modules
+
+    Each first-party module is charged its own execution time plus the full
+    cost of the stdlib and third-party imports it triggered first (later
+    importers find them cached and pay nothing).
+
+    Returns:
+        dict: module -> {'self_ms', 'deps_ms', 'total_ms', 'imports': {package: ms}}
+    """
+    report = {}
+
+    def walk(node, owner):
+        top = node['name'].split('.')[0]
+        if top in own and node['name'] == top:
+            entry = report.setdefault(top, {'self_ms': 0.0, 'deps_ms': 0.0, 'imports': {}})
+            entry['self_ms'] += node['self_us'] / 1000
+            for child in node['children']:
+                walk(child, top)
+        elif owner is not None:
+            entry = report[owner]
+            entry['deps_ms'] += node['cumulative_us'] / 1000
+            entry['imports'][top] = entry['imports'].get(top, 0.0) + node['cumulative_us'] / 1000
+        else:
+            for child in node['children']:
+                walk(child, None)
+
+    for root in roots:
+        walk(root, None)
+    for entry in report.values():
+        entry['total_ms'] = entry['self_ms'] + entry['deps_ms']
+    return report
+
+
+def profile(module, runs):
+    with tempfile.TemporaryDirectory(prefix="import_profile_") as workdir:
+        # The first import compiles bytecode; measure warm starts like a restarted worker
+        run_import(module, workdir)
+        timings = [run_import(module, workdir)[0] for _ in range(runs)]
+        _, stderr = run_import(module, workdir, importtime=True)
+    roots = parse_importtime(stderr)
+    modules = attribute(roots, first_party_modules())
+    return {
+        'module': module,
+        'runs': runs,
+        'best_seconds': min(timings),
+        'median_seconds': statistics.median(timings),
+        'modules': {name: {key: round(value, 1) if isinstance(value, float) else
+                           {pkg: round(ms, 1) for pkg, ms in value.items()}
+                           for key, value in entry.items()}
+                    for name, entry in modules.items()},
+    }
+
+
+def print_report(result, top, baseline=None):
+    print(f"\nimport {result['module']}: best {result['best_seconds'] * 1000:.0f} ms, "
+          f"median {result['median_seconds'] * 1000:.0f} ms over {result['runs']} run(s)", end="")
+    if baseline:
+        change = result['best_seconds'] - baseline['best_seconds']
+        print(f"  (baseline best {baseline['best_seconds'] * 1000:.0f} ms, {change * 1000:+.0f} ms)", end="")
+    print()
+
+    base_modules = (baseline or {}).get('modules', {})
+    ranked = sorted(result['modules'].items(), key=lambda item: item[1]['total_ms'], reverse=True)[:top]
+    print(f"\n{'module':<22} {'total':>9} {'own':>8} {'deps':>10}  heaviest imports")
+    for name, entry in ranked:
+        heaviest = sorted(entry['imports'].items(), key=lambda item: item[1], reverse=True)[:3]
+        imports = ", ".join(f"{pkg} {ms:.0f}ms" for pkg, ms in heaviest if ms >= 1)
+        delta = ""
+        if name in base_modules:
+            delta = f" ({entry['total_ms'] - base_modules[name]['total_ms']:+.0f})"
+        print(f"{name:<22} {entry['total_ms']:>7.0f}ms {entry['self_ms']:>6.0f}ms {entry['deps_ms']:>8.0f}ms"
+              f"  {imports}{delta}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("modules", nargs="*", default=["app"], help="modules to import (default: app)")
+    parser.add_argument("--runs", type=int, default=5, help="timed imports per module")
+    parser.add_argument("--top", type=int, default=15, help="first-party modules to list")
+    parser.add_argument("--output", metavar="FILE", help="write results as JSON")
+    parser.add_argument("--compare", metavar="FILE", help="earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = {entry['module']: entry for entry in json.load(f)['results']}
+
+    commit, dirty = git_revision()
+    print(f"Import profile @ {commit or 'unknown'}{' (dirty)' if dirty else ''}")
+    results, failed = [], False
+    for module in args.modules:
+        try:
+            result = profile(module, args.runs)
+        except RuntimeError as e:
+            print(f"\n{e}")
+            failed = True
+            continue
+        results.append(result)
+        print_report(result, args.top, baseline.get(module))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({'version': RESULTS_VERSION, 'commit': commit, 'dirty': dirty,
+                       'started_at': datetime.now().isoformat(timespec="seconds"), 'results': results}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
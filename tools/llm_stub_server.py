@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""OpenAI-compatible stub chat server for exercising the LLM router without a real provider.
+
+Answers /v1/chat/completions (plain and streaming). Without --replay the
+replies are canned: an evaluation JSON object when the prompt asks for JSON,
+otherwise an interview question. With --replay the replies come from a JSONL
+file recorded with LLM_RECORD_FILE (see llm_replay). Latency follows a
+configurable distribution and failures a configurable rate, so load tests
+are repeatable without calling a paid API.
+
+Example:
+    LLM_RECORD_FILE=llm_recording.jsonl python run_streamlit.py   # capture real traffic once
+    python tools/llm_stub_server.py --replay llm_recording.jsonl --latency-dist lognormal:1.2,0.4 --seed 7
+    LLM_ENDPOINTS='[{"name": "fast", "base_url": "http://127.0.0.1:8399/v1", "model": "stub-fast"}]'
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from llm_replay import ReplayStore, latency_sampler  # noqa: E402
+
+QUESTION_REPLY = "Explain how you would design a rate limiter for a public REST API and which trade-offs you would consider."
+EVALUATION_REPLY = {
+    "score": 14,
+    "reason": "The answer covers the main idea but skips edge cases.",
+    "suggestions": "Discuss failure handling and give a concrete example.",
+}
+
+
+def build_reply(messages, replay=None):
+    """Reply text and the replayed record (None for canned replies)"""
+    if replay is not None:
+        record, _exact = replay.lookup(messages)
+        if record is not None:
+            return record['content'], record
+    prompt = ""
+    for message in messages:
+        if message.get("role") == "user":
+            content = message.get("content")
+            prompt = content if isinstance(content, str) else json.dumps(content)
+    if "json" in prompt.lower():
+        return json.dumps(EVALUATION_REPLY), None
+    return QUESTION_REPLY, None
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    config = None  # argparse namespace, set in main()
+
+    def log_message(self, fmt, *args):
+        if self.config.verbose:
+            super().log_message(fmt, *args)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            models = sorted(set(self.config.model_latency) | {"stub"})
+            self._send_json(200, {"object": "list", "data": [{"id": m, "object": "model"} for m in models]})
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        model = request.get("model", "stub")
+
+        reply, record = build_reply(request.get("messages", []), self.config.replay)
+        if model in self.config.model_latency:
+            delay = self.config.model_latency[model]
+        else:
+            delay = self.config.sample_latency(record)
+        time.sleep(delay)
+        with self.config.rng_lock:
+            failed = self.config.rng.random() < self.config.fail_rate
+        if failed:
+            self._send_json(500, {"error": {"message": "stub failure", "type": "server_error"}})
+            return
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        usage = (record or {}).get("usage") or {
+            "prompt_tokens": 50, "completion_tokens": len(reply.split()), "total_tokens": 50 + len(reply.split())
+        }
+
+        if not request.get("stream"):
+            self._send_json(200, {
+                "id": completion_id, "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        words = reply.split(" ")
+        for i, word in enumerate(words):
+            chunk = {
+                "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}, "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+        final = {
+            "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+        }
+        self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+
+
+def parse_model_latency(values):
+    latency = {}
+    for value in values or []:
+        name, _, seconds = value.partition("=")
+        latency[name] = float(seconds)
+    return latency
+
+
+def make_server(host="127.0.0.1", port=8399, latency=0.0, jitter=0.0, fail_rate=0.0, model_latency=None,
+                verbose=False, replay=None, latency_dist=None, seed=None):
+    """
+    Create (but do not start) a stub server; port 0 picks a free port
+
+    latency_dist takes an llm_replay.latency_sampler spec and replaces
+    latency/jitter; replay is a path to a recorded JSONL file.
+    """
+    if not latency_dist:
+        latency_dist = f"normal:{latency},{jitter}" if jitter else f"fixed:{latency}"
+    config = argparse.Namespace(fail_rate=fail_rate, model_latency=model_latency or {}, verbose=verbose,
+                                replay=ReplayStore(replay) if replay else None,
+                                sample_latency=latency_sampler(latency_dist, seed),
+                                rng=random.Random(seed), rng_lock=threading.Lock())
+    handler = type("ConfiguredStubHandler", (StubHandler,), {"config": config})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8399)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before each reply")
+    parser.add_argument("--jitter", type=float, default=0.0, help="standard deviation added to the latency")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests answered with HTTP 500")
+    parser.add_argument("--model-latency", action="append", metavar="MODEL=SECONDS",
+                        help="per-model latency override (repeatable)")
+    parser.add_argument("--latency-dist", metavar="SPEC",
+                        help="fixed:S | uniform:LO,HI | normal:MEAN,SD | lognormal:MEDIAN,SIGMA | recorded[:SCALE]")
+    parser.add_argument("--replay", metavar="FILE", help="JSONL recording to answer from")
+    parser.add_argument("--seed", type=int, help="seed for latency and failure draws")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.latency, args.jitter, args.fail_rate,
+                         parse_model_latency(args.model_latency), args.verbose,
+                         replay=args.replay, latency_dist=args.latency_dist, seed=args.seed)
+    if server.RequestHandlerClass.config.replay is not None:
+        print(f"Replaying {len(server.RequestHandlerClass.config.replay)} recorded completions from {args.replay}")
+    print(f"LLM stub listening on http://{args.host}:{server.server_address[1]}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""End-to-end load test: N concurrent candidates run the full interview flow against a stubbed LLM.
+
+Each simulated candidate registers, logs in, uploads a resume, fetches
+questions, answers five of them, runs code, sends proctoring events and saves
+the evaluation. By default the Flask app is started in-process in a throwaway
+directory (fresh SQLite files) with every LLM endpoint pointed at
+tools/llm_stub_server.py, so runs are repeatable and cost nothing. Results
+(throughput, latency percentiles and error rates per endpoint) are printed
+and can be written to JSON together with the git commit, and compared with
+an earlier run.
+
+Example:
+    python tools/load_test.py --candidates 20 --llm-latency-dist lognormal:0.8,0.4 --seed 7 --output before.json
+    python tools/load_test.py --candidates 20 --llm-latency-dist lognormal:0.8,0.4 --seed 7 --compare before.json
+    python tools/load_test.py --base-url http://127.0.0.1:5000 --candidates 5   # an already running app
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import httpx
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, "tools"))
+
+RESULTS_VERSION = 1
+ANSWERS_PER_CANDIDATE = 5
+
+RESUME_TEMPLATE = """{name}
+{email} | +1 555 010 {index:04d}
+
+SUMMARY
+Python developer with {years} years of experience building web services.
+
+SKILLS
+Python, Flask, SQL, Docker, REST APIs, Git
+
+EXPERIENCE
+Software Engineer, Example Corp (2019 - Present)
+- Built and maintained Flask services handling {years}00 requests per second
+- Migrated reporting jobs from cron scripts to a task queue
+
+EDUCATION
+B.Sc. Computer Science, State University
+"""
+
+CODE_SUBMISSION = """def sum_even(numbers):
+    return sum(n for n in numbers if n % 2 == 0)
+
+print(sum_even([1, 2, 3, 4, 5, 6]))
+"""
+CODE_TEST_CASES = [{'input': '', 'expected': '12'}]
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+class Recorder:
+    """Latency and outcome of every request, grouped by endpoint"""
+
+    def __init__(self):
+        self.samples = {}
+        self._lock = threading.Lock()
+
+    def add(self, endpoint, seconds, ok, status, error=None):
+        with self._lock:
+            self.samples.setdefault(endpoint, []).append((seconds, ok, status, error))
+
+    def request(self, client, method, path, check=None, **kwargs):
+        """
+        Send one request and record it; returns the JSON body or None on error
+
+        A request fails on transport errors, HTTP >= 400, a non-JSON body
+        (e.g. the login redirect), 'success': false, or a failed check(body).
+        """
+        endpoint = f"{method} {path}"
+        started = time.perf_counter()
+        status = None
+        try:
+            response = client.request(method, path, **kwargs)
+            status = response.status_code
+            body = response.json() if status < 300 else None
+            if body is None:
+                error = f"HTTP {status}"
+            elif body.get('success') is False:
+                error = body.get('message') or body.get('error') or 'success: false'
+            else:
+                error = check(body) if check else None
+        except Exception as e:
+            body, error = None, f"{type(e).__name__}: {e}"
+        self.add(endpoint, time.perf_counter() - started, error is None, status, error)
+        return body if error is None else None
+
+
+def _check_execution(body):
+    result = body.get('result') or {}
+    if not result.get('success'):
+        return f"execution failed: {(result.get('error') or '').splitlines()[0] if result.get('error') else 'unknown'}"
+    return None
+
+
+def _check_questions(body):
+    return None if len(body.get('questions') or []) >= ANSWERS_PER_CANDIDATE else "too few questions"
+
+
+def candidate_flow(base_url, index, run_id, recorder, think_time, rng):
+    """One candidate's session from registration to saved evaluation; True if every step succeeded"""
+    username = f"load_{run_id}_{index}"
+    password = f"pw-{run_id}-{index}"
+    email = f"{username}@example.com"
+
+    def pause():
+        if think_time:
+            time.sleep(rng.uniform(0, 2 * think_time))
+
+    with httpx.Client(base_url=base_url, timeout=120) as client:
+        resume = RESUME_TEMPLATE.format(name=f"Candidate {index}", email=email, index=index, years=2 + index % 8)
+        parsed = recorder.request(client, "POST", "/api/parse-resume",
+                                  files={'resume': (f"{username}.txt", resume.encode("utf-8"), "text/plain")})
+        registered = recorder.request(client, "POST", "/register", json={
+            'username': username, 'fullname': f"Candidate {index}", 'password': password, 'email': email,
+            'resume_data': (parsed or {}).get('data'),
+        })
+        if registered is None:
+            return False
+        if recorder.request(client, "POST", "/login", json={'username': username, 'password': password}) is None:
+            return False
+        pause()
+
+        role = 'Python Developer'
+        questions = recorder.request(client, "POST", "/api/generate-questions", check=_check_questions,
+                                     json={'role': role, 'skills': ['Python', 'Flask'], 'language': 'English'})
+        if questions is None:
+            return False
+        evaluation_id = f"eval_{run_id}_{index}"
+        proctoring = recorder.request(client, "POST", "/api/proctoring/start", json={'evaluation_id': evaluation_id})
+        session_id = (proctoring or {}).get('session_id')
+
+        ok = proctoring is not None
+        qa_history = []
+        for number, item in enumerate(questions['questions'][:ANSWERS_PER_CANDIDATE], 1):
+            pause()
+            if item.get('type') == 'coding':
+                answer = CODE_SUBMISSION
+            else:
+                answer = (f"Candidate {index} answer {number}: {item['question'][:60]} depends on the use case; "
+                          f"I would explain the trade-offs and give a short example from my last project.")
+            result = recorder.request(client, "POST", "/api/evaluate-answer",
+                                      json={'question': item['question'], 'answer': answer, 'type': item.get('type')})
+            ok = ok and result is not None
+            score = (result or {}).get('result', {}).get('score', 0)
+            qa_history.append({'question': item['question'], 'answer': answer, 'score': score,
+                               'type': item.get('type')})
+            if number == 2 and session_id:
+                ok = recorder.request(client, "POST", "/api/proctoring/log-violation", json={
+                    'session_id': session_id, 'type': 'tab_switch', 'details': 'load test'}) is not None and ok
+
+        ok = recorder.request(client, "POST", "/api/execute-code", check=_check_execution,
+                              json={'code': CODE_SUBMISSION, 'test_cases': CODE_TEST_CASES}) is not None and ok
+        if session_id:
+            ok = recorder.request(client, "POST", "/api/proctoring/end",
+                                  json={'session_id': session_id}) is not None and ok
+
+        score = sum(qa['score'] or 0 for qa in qa_history)
+        max_score = 20 * len(qa_history)
+        ok = recorder.request(client, "POST", "/api/save-evaluation-enhanced", json={
+            'role': role, 'score': score, 'max_score': max_score,
+            'percentage': round(score / max_score * 100, 1) if max_score else 0,
+            'time_taken': 600, 'qa_history': qa_history,
+        }) is not None and ok
+        return ok
+
+
+def summarize(recorder, wall_seconds, flows_ok, flows_total):
+    endpoints = {}
+    total_requests = 0
+    total_errors = 0
+    for endpoint, samples in sorted(recorder.samples.items()):
+        latencies = sorted(seconds * 1000 for seconds, ok, _, _ in samples if ok)
+        errors = [error for _, ok, _, error in samples if not ok]
+        total_requests += len(samples)
+        total_errors += len(errors)
+        top_errors = {}
+        for error in errors:
+            key = str(error)[:120]
+            top_errors[key] = top_errors.get(key, 0) + 1
+        endpoints[endpoint] = {
+            'requests': len(samples),
+            'errors': len(errors),
+            'error_rate': round(len(errors) / len(samples), 4),
+            'throughput_rps': round(len(samples) / wall_seconds, 2) if wall_seconds else None,
+            'mean_ms': round(sum(latencies) / len(latencies), 1) if latencies else None,
+            'p50_ms': _round(percentile(latencies, 50)),
+            'p90_ms': _round(percentile(latencies, 90)),
+            'p95_ms': _round(percentile(latencies, 95)),
+            'p99_ms': _round(percentile(latencies, 99)),
+            'max_ms': _round(latencies[-1] if latencies else None),
+            'top_errors': dict(sorted(top_errors.items(), key=lambda item: -item[1])[:3]),
+        }
+    totals = {
+        'requests': total_requests,
+        'errors': total_errors,
+        'error_rate': round(total_errors / total_requests, 4) if total_requests else 0,
+        'wall_seconds': round(wall_seconds, 2),
+        'throughput_rps': round(total_requests / wall_seconds, 2) if wall_seconds else None,
+        'flows': flows_total,
+        'flows_completed': flows_ok,
+        'flows_per_minute': round(flows_ok / wall_seconds * 60, 2) if wall_seconds else None,
+    }
+    return totals, endpoints
+
+
+def _round(value):
+    return None if value is None else round(value, 1)
+
+
+def git_revision():
+    """(commit, dirty) of the working tree, or (None, None) outside git"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_ROOT,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def start_llm_stub(args):
+    from llm_stub_server import make_server
+    server = make_server(port=0, fail_rate=args.llm_fail_rate, replay=args.replay,
+                         latency_dist=args.llm_latency_dist, seed=args.seed)
+    threading.Thread(target=server.serve_forever, daemon=True, name="llm-stub").start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def start_app(llm_url, workdir):
+    """Import app.py with every LLM endpoint on the stub and its SQLite files in workdir; serve it on a thread"""
+    os.environ["LLM_ENDPOINTS"] = json.dumps([
+        {'name': 'fast', 'base_url': llm_url, 'model': 'stub-fast'},
+        {'name': 'reasoning', 'base_url': llm_url, 'model': 'stub-reasoning'},
+    ])
+    os.environ.setdefault("DEEPSEEK_API_KEY", "load-test")
+    # Emails are still queued (that write is part of the request); only the console delivery is skipped
+    os.environ.setdefault("EMAIL_DISPATCHER", "off")
+    os.chdir(workdir)
+
+    import logging
+    from werkzeug.serving import make_server
+    from app import app, router
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    # Like a readiness check: measure served traffic, not the LLM client imports of a cold worker
+    warm_up = router.warm_up()
+    if warm_up:
+        warm_up.join()
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True, name="flask-app").start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def print_report(results, baseline=None):
+    totals = results['totals']
+    revision = results['commit'] or 'unknown'
+    if results['dirty']:
+        revision += ' (dirty)'
+    print(f"\nLoad test @ {revision}: {results['config']['candidates']} candidates, "
+          f"{totals['flows_completed']}/{totals['flows']} flows completed in {totals['wall_seconds']}s")
+    print(f"{totals['requests']} requests, {totals['throughput_rps']} req/s, "
+          f"{totals['flows_per_minute']} flows/min, error rate {totals['error_rate']:.1%}")
+
+    base_endpoints = (baseline or {}).get('endpoints', {})
+    header = f"{'endpoint':<38} {'reqs':>5} {'err%':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}"
+    if baseline:
+        header += f" {'p95 vs base':>12}"
+    print("\n" + header)
+    for endpoint, stats in results['endpoints'].items():
+        line = (f"{endpoint:<38} {stats['requests']:>5} {stats['error_rate']:>6.1%} "
+                f"{_ms(stats['p50_ms'])} {_ms(stats['p95_ms'])} {_ms(stats['p99_ms'])} {_ms(stats['max_ms'])}")
+        base = base_endpoints.get(endpoint, {})
+        if baseline and base.get('p95_ms') and stats['p95_ms']:
+            line += f" {(stats['p95_ms'] - base['p95_ms']) / base['p95_ms']:>+12.1%}"
+        print(line)
+        for error, count in stats['top_errors'].items():
+            print(f"{'':<4}{count} x {error}")
+
+    if baseline:
+        base_totals = baseline.get('totals', {})
+        print(f"\nBaseline @ {baseline.get('commit') or 'unknown'}: {base_totals.get('throughput_rps')} req/s, "
+              f"error rate {base_totals.get('error_rate', 0):.1%}")
+        if baseline.get('config') != results['config']:
+            print("Note: baseline was run with a different configuration; compare with care")
+
+
+def _ms(value):
+    return f"{value:>6.0f}ms" if value is not None else f"{'-':>8}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--candidates", type=int, default=10, help="concurrent simulated candidates")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="seconds over which candidates start")
+    parser.add_argument("--think-time", type=float, default=0.0, help="mean pause between a candidate's steps")
+    parser.add_argument("--base-url", help="test a running app instead of starting one (its LLM is up to you)")
+    parser.add_argument("--llm-latency-dist", default="fixed:0.2", metavar="SPEC",
+                        help="stub LLM latency, as for llm_stub_server --latency-dist")
+    parser.add_argument("--llm-fail-rate", type=float, default=0.0, help="fraction of stub LLM calls that fail")
+    parser.add_argument("--replay", metavar="FILE", help="answer LLM calls from a recording (LLM_RECORD_FILE)")
+    parser.add_argument("--seed", type=int, default=1, help="seed for stub latency/failures and think times")
+    parser.add_argument("--output", metavar="FILE", help="write results as JSON")
+    parser.add_argument("--compare", metavar="FILE", help="earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    output = os.path.abspath(args.output) if args.output else None
+
+    config = {
+        'candidates': args.candidates, 'ramp_up': args.ramp_up, 'think_time': args.think_time,
+        'llm_latency_dist': None if args.base_url else args.llm_latency_dist,
+        'llm_fail_rate': None if args.base_url else args.llm_fail_rate,
+        'replay': os.path.basename(args.replay) if args.replay and not args.base_url else None,
+        'seed': args.seed, 'target': 'external' if args.base_url else 'in-process',
+        'llm_rate_per_second': None,
+    }
+
+    servers = []
+    base_url = args.base_url
+    if not base_url:
+        llm_server, llm_url = start_llm_stub(args)
+        workdir = tempfile.mkdtemp(prefix="load_test_")
+        app_server, base_url = start_app(llm_url, workdir)
+        servers = [app_server, llm_server]
+        # The app's own LLM rate limit shapes evaluate-answer latency, so keep it with the results
+        import llm_ratelimit
+        config['llm_rate_per_second'] = llm_ratelimit.RATE_PER_SECOND
+        print(f"App on {base_url} (data in {workdir}), LLM stub on {llm_url}")
+
+    commit, dirty = git_revision()
+    run_id = uuid.uuid4().hex[:6]
+    recorder = Recorder()
+    rng = random.Random(args.seed)
+    delays = [args.ramp_up * i / args.candidates for i in range(args.candidates)]
+    candidate_rngs = [random.Random(rng.random()) for _ in range(args.candidates)]
+
+    def run(index):
+        time.sleep(delays[index])
+        try:
+            return candidate_flow(base_url, index, run_id, recorder, args.think_time, candidate_rngs[index])
+        except Exception as e:
+            recorder.add("flow", 0.0, False, None, f"{type(e).__name__}: {e}")
+            return False
+
+    started_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.candidates) as pool:
+        outcomes = list(pool.map(run, range(args.candidates)))
+    wall_seconds = time.perf_counter() - started
+
+    totals, endpoints = summarize(recorder, wall_seconds, sum(outcomes), len(outcomes))
+    results = {
+        'version': RESULTS_VERSION, 'commit': commit, 'dirty': dirty, 'started_at': started_at,
+        'config': config, 'totals': totals, 'endpoints': endpoints,
+    }
+    print_report(results, baseline)
+
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {output}")
+
+    for server in servers:
+        server.shutdown()
+    return 0 if totals['errors'] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
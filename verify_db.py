@@ -30,6 +30,15 @@ print(f"Total feedback entries: {total_feedback}")
 for username, entries in feedback.items():
     print(f"  - {username}: {len(entries)} feedback entry(ies)")
 
+print()
+
+# Check schema version and background backfills
+schema = db_utils.SCHEMA.status(db_utils.DB_FILE)
+print(f"Schema version: {schema['version']} (latest {schema['latest']})")
+for backfill in schema['backfills']:
+    state = 'done' if backfill['completed'] else f"at key {backfill['next_key']} of {backfill['end_key']}"
+    print(f"  - backfill {backfill['name']}: {state}")
+
 print()
 print("=" * 50)
 print("Database verification complete!")